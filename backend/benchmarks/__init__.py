@@ -0,0 +1,13 @@
+"""Load benchmarks for the API.
+
+``dataset`` builds a synthetic database of partners, items, claims and
+badges at any scale, and ``runner`` drives the app against it, either
+in-process through ASGI or over HTTP against a local uvicorn, recording
+throughput and latency percentiles per route. Results are written as JSON
+so runs on different commits can be compared:
+
+    cd backend
+    python -m benchmarks --items 100000 --out before.json
+    python -m benchmarks --items 100000 --out after.json
+    python -m benchmarks compare before.json after.json
+"""
@@ -0,0 +1,210 @@
+"""Command line entry point: ``python -m benchmarks --help``"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timezone
+from benchmarks import dataset, runner
+
+BENCHMARK_ENV = {
+    "RECIRCLE_SKIP_SEED": "1",
+    # Keep scheduled jobs from running in the middle of a measurement
+    "RECIRCLE_FORECAST_RETRAIN_SECONDS": "0",
+    "RECIRCLE_KPI_RECONCILE_SECONDS": "0",
+}
+
+MODES = ("inprocess", "uvicorn")
+
+
+def _git(*args) -> str:
+    try:
+        return subprocess.run(["git", *args], cwd=os.path.dirname(os.path.abspath(__file__)),
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def _print_table(run: dict):
+    print(f"  {'route':<24} {'requests':>8} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}  status")
+    rows = [*run["routes"].items()]
+    if "contention" in run:
+        rows.append(("claim (contention)", run["contention"]))
+    for name, result in rows:
+        latency = result.get("latency_ms", {})
+        status = " ".join(f"{code}x{count}" for code, count in result["status"].items())
+        if result["errors"]:
+            status += f" errors x{result['errors']}"
+        print(f"  {name:<24} {result['requests']:>8} {result['throughput_rps']:>9.1f} "
+              f"{latency.get('p50', 0):>9.2f} {latency.get('p95', 0):>9.2f} {latency.get('p99', 0):>9.2f}  {status}")
+
+
+async def _run_mode(mode: str, args, context: dict, routes) -> dict:
+    if mode == "inprocess":
+        client_context = runner.in_process_client()
+    else:
+        client_context = runner.uvicorn_client(args.concurrency, args.port, args.workers)
+
+    run = {"routes": {}}
+    async with client_context as client:
+        for name in routes:
+            run["routes"][name] = await runner.run_route(client, name, context, args.requests,
+                                                         args.concurrency, args.warmup, args.seed)
+        if args.contention_items:
+            run["contention"] = await runner.run_contention(client, context, args.contention_items,
+                                                            args.claimers, args.concurrency, args.seed)
+        run["health"] = (await client.get("/api/health")).json()
+    return run
+
+
+def run(args) -> int:
+    spec = dataset.make_spec(args.items, args.partners, seed=args.seed)
+    cache_path = args.db or dataset.default_path(spec)
+    run_path = os.path.join(tempfile.mkdtemp(prefix="recircle-bench-"), "recircle.db")
+
+    # Every pooled connection, including uvicorn's, opens the scratch copy
+    os.environ.update(BENCHMARK_ENV, RECIRCLE_DB_PATH=run_path)
+    if args.no_response_cache:
+        os.environ["RECIRCLE_RESPONSE_CACHE_ENTRIES"] = "0"
+
+    generated = None
+    if args.regenerate or dataset.dataset_spec(cache_path) != spec:
+        print(f"Generating {spec['items']:,} items and {spec['partners']:,} partners into {cache_path}")
+        generated = dataset.generate(spec)
+        dataset.copy_dataset(run_path, cache_path)
+    else:
+        print(f"Reusing {cache_path}")
+
+    words = dataset.vocabulary()
+    with open(os.path.join(dataset.DATA_DIR, "intent_examples.json"), "r") as f:
+        chat_messages = [example["message"] for example in json.load(f)]
+    context = {
+        "partners": spec["partners"],
+        "categories": words["categories"],
+        "locations": words["locations"],
+        "keywords": sorted({keyword for keywords in words["keywords"].values() for keyword in keywords}),
+        "chat_messages": chat_messages,
+    }
+
+    routes = args.routes.split(",") if args.routes else list(runner.SCENARIOS)
+    unknown = [name for name in routes if name not in runner.SCENARIOS]
+    if unknown:
+        print(f"Unknown routes: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+
+    results = {
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": _git("rev-parse", "HEAD"),
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "environment": {
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "dataset": {"spec": spec, "path": cache_path, "rows": dataset.row_counts(cache_path),
+                    "generated": generated},
+        "settings": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "warmup": args.warmup,
+            "response_cache": not args.no_response_cache,
+            "contention_items": args.contention_items,
+            "claimers": args.claimers,
+            "workers": args.workers,
+        },
+        "runs": {},
+    }
+
+    modes = MODES if args.mode == "both" else (args.mode,)
+    for mode in modes:
+        # Each mode starts from the same data; claims and donations only touch the copy
+        dataset.copy_dataset(cache_path, run_path)
+        print(f"\n{mode}: {args.requests} requests per route, {args.concurrency} in flight")
+        results["runs"][mode] = asyncio.run(_run_mode(mode, args, context, routes))
+        _print_table(results["runs"][mode])
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.out}")
+    return 0
+
+
+def _change(old: float, new: float) -> str:
+    return f"{(new - old) / old:+.1%}" if old else "n/a"
+
+
+def compare(old_path: str, new_path: str) -> int:
+    """Print the change in throughput and latency per route between two result files"""
+    with open(old_path, "r") as f:
+        old = json.load(f)
+    with open(new_path, "r") as f:
+        new = json.load(f)
+
+    print(f"old: {old['commit'][:12] or 'unknown'}{' (dirty)' if old['dirty'] else ''}  {old_path}")
+    print(f"new: {new['commit'][:12] or 'unknown'}{' (dirty)' if new['dirty'] else ''}  {new_path}")
+    if old["dataset"]["spec"] != new["dataset"]["spec"]:
+        print("warning: the runs used different datasets")
+    if old["settings"] != new["settings"]:
+        print("warning: the runs used different settings")
+
+    for mode in [mode for mode in old["runs"] if mode in new["runs"]]:
+        print(f"\n{mode}")
+        print(f"  {'route':<24} {'req/s (old, new)':>25} {'p50 ms (old, new)':>25} {'p99 ms (old, new)':>25}")
+        old_run, new_run = old["runs"][mode], new["runs"][mode]
+        pairs = [(name, old_run["routes"][name], new_run["routes"][name])
+                 for name in old_run["routes"] if name in new_run["routes"]]
+        if "contention" in old_run and "contention" in new_run:
+            pairs.append(("claim (contention)", old_run["contention"], new_run["contention"]))
+        for name, before, after in pairs:
+            line = f"  {name:<24}"
+            for a, b in (
+                (before["throughput_rps"], after["throughput_rps"]),
+                (before.get("latency_ms", {}).get("p50", 0), after.get("latency_ms", {}).get("p50", 0)),
+                (before.get("latency_ms", {}).get("p99", 0), after.get("latency_ms", {}).get("p99", 0)),
+            ):
+                line += f" {a:>9.2f} {b:>9.2f} {_change(a, b):>6}"
+            print(line)
+    return 0
+
+
+def main(argv=None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["compare"]:
+        parser = argparse.ArgumentParser(prog="python -m benchmarks compare",
+                                         description="Compare two benchmark result files")
+        parser.add_argument("old")
+        parser.add_argument("new")
+        args = parser.parse_args(argv[1:])
+        return compare(args.old, args.new)
+
+    parser = argparse.ArgumentParser(prog="python -m benchmarks",
+                                     description="Benchmark the API on a synthetic dataset")
+    parser.add_argument("--items", type=int, default=100000, help="items in the dataset (default 100000)")
+    parser.add_argument("--partners", type=int, help="partners in the dataset (default items / 100)")
+    parser.add_argument("--seed", type=int, default=1, help="seed for the dataset and the request mix")
+    parser.add_argument("--db", help="generated dataset to reuse or create (default: a file in the temp dir)")
+    parser.add_argument("--regenerate", action="store_true", help="rebuild the dataset even if it is cached")
+    parser.add_argument("--mode", choices=(*MODES, "both"), default="inprocess")
+    parser.add_argument("--routes", help="comma-separated scenarios to run (default: all)")
+    parser.add_argument("--requests", type=int, default=500, help="measured requests per route")
+    parser.add_argument("--warmup", type=int, default=20, help="unmeasured requests per route first")
+    parser.add_argument("--concurrency", type=int, default=16, help="requests in flight")
+    parser.add_argument("--contention-items", type=int, default=100,
+                        help="items raced for in the claim contention scenario (0 skips it)")
+    parser.add_argument("--claimers", type=int, default=8, help="partners racing for each item")
+    parser.add_argument("--no-response-cache", action="store_true",
+                        help="disable the read endpoint response cache to measure the query paths")
+    parser.add_argument("--port", type=int, default=8765, help="port for --mode uvicorn")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--out", help="write the results as JSON to this file")
+    return run(parser.parse_args(argv))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,225 @@
+"""Synthetic benchmark database.
+
+Partners, items and claims are drawn from a seeded RNG, so the same spec
+always produces the same rows. Categories and description words come from
+the categorizer taxonomy and locations from the gazetteer, with a skew
+towards the first few of each. That way filters, search, geocoding and the
+chatbot see realistic data.
+
+Rows are loaded with every trigger and secondary index dropped. The indexes
+and triggers are put back afterwards, and the derived tables are rebuilt
+by the ``rebuild_*`` steps of the migrations, as happens when a migration
+backfills an existing database. Badges are awarded by the badge rules the
+same way. Loading stays one sequential pass at any scale.
+
+The finished database is kept and reused for any later run with the same
+spec. Each run works on a copy, so runs that write start from identical data.
+"""
+import json
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+from typing import Dict, List
+
+DATASET_META_KEY = "benchmark_dataset"
+# Bump when the generator changes so cached datasets are rebuilt
+DATASET_VERSION = 1
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
+
+# Rows generated and inserted per executemany call
+CHUNK_SIZE = 50000
+
+CLAIM_POINTS = 10
+CONDITIONS = ("new", "like new", "good condition", "gently used", "refurbished", "assorted", "bulk", "boxed")
+
+
+def make_spec(items: int, partners: int = None, claimed: float = 0.3, donated: float = 0.2,
+              days: int = 365, seed: int = 1) -> dict:
+    """Dataset parameters; by default there is one partner per 100 items"""
+    return {
+        "version": DATASET_VERSION,
+        "items": items,
+        "partners": partners or max(10, items // 100),
+        "claimed": claimed,
+        "donated": donated,
+        "days": days,
+        "seed": seed,
+    }
+
+
+def default_path(spec: dict) -> str:
+    name = "recircle-bench-{items}-{partners}-{seed}-v{version}.db".format(**spec)
+    return os.path.join(tempfile.gettempdir(), name)
+
+
+def _skewed(values: List, skew: float = 1.1) -> List[float]:
+    """Cumulative Zipf-like weights, so the first values are the most common"""
+    total, weights = 0.0, []
+    for rank in range(1, len(values) + 1):
+        total += 1 / rank ** skew
+        weights.append(total)
+    return weights
+
+
+def vocabulary() -> Dict[str, List[str]]:
+    """Category names, their keywords and the location strings used in generated rows"""
+    with open(os.path.join(DATA_DIR, "taxonomy.json"), "r") as f:
+        taxonomy = json.load(f)
+    with open(os.path.join(DATA_DIR, "gazetteer.json"), "r") as f:
+        places = json.load(f)["places"]
+    return {
+        "categories": [category["name"] for category in taxonomy["categories"]],
+        "keywords": {
+            category["name"]: [keyword for keyword in category["keywords"] if keyword.isalpha()]
+            for category in taxonomy["categories"]
+        },
+        "locations": [f"{place['name']}, {place['state']}" for place in places],
+    }
+
+
+def _timestamp(epoch: float) -> str:
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(epoch))
+
+
+def _partner_rows(spec: dict, rng: random.Random, words: dict):
+    locations = words["locations"]
+    weights = _skewed(locations)
+    places = rng.choices(locations, cum_weights=weights, k=spec["partners"])
+    start = time.time() - spec["days"] * 86400
+    for partner_id, location in enumerate(places, 1):
+        yield partner_id, f"Partner {partner_id}", location, 0, _timestamp(start + rng.random() * 86400)
+
+
+def item_chunks(spec: dict, rng: random.Random, words: dict):
+    """``(items, claims)`` row lists per chunk; items are created in id order over ``days``"""
+    categories, locations, keywords = words["categories"], words["locations"], words["keywords"]
+    category_weights, location_weights = _skewed(categories, 0.8), _skewed(locations)
+    partners = spec["partners"]
+    start = time.time() - spec["days"] * 86400
+    step = spec["days"] * 86400 / spec["items"]
+
+    for first in range(1, spec["items"] + 1, CHUNK_SIZE):
+        size = min(CHUNK_SIZE, spec["items"] + 1 - first)
+        picked_categories = rng.choices(categories, cum_weights=category_weights, k=size)
+        picked_locations = rng.choices(locations, cum_weights=location_weights, k=size)
+        items, claims = [], []
+        for offset in range(size):
+            item_id = first + offset
+            category = picked_categories[offset]
+            created = start + item_id * step
+            description = (f"{' '.join(rng.sample(keywords[category], 2)).capitalize()} - "
+                           f"{rng.choice(CONDITIONS)}, lot {item_id}")
+            # Donors and claimers are skewed towards low partner ids, so some partners are busy
+            donor = int(partners * rng.random() ** 2) + 1 if rng.random() < spec["donated"] else None
+            status = "available"
+            if rng.random() < spec["claimed"]:
+                status = "claimed"
+                claimer = int(partners * rng.random() ** 2) + 1
+                claims.append((item_id, claimer, _timestamp(created + rng.random() * 3 * 86400)))
+            items.append((item_id, category, description, picked_locations[offset],
+                          rng.randint(1, 200), status, _timestamp(created), donor))
+        yield items, claims
+
+
+def _drop_secondary_objects(conn) -> List[str]:
+    """Drop every trigger and index with a definition and return the statements that recreate them"""
+    rows = conn.execute("""
+        SELECT type, name, sql FROM sqlite_master
+        WHERE type IN ('trigger', 'index') AND sql IS NOT NULL
+        ORDER BY type = 'trigger'
+    """).fetchall()
+    for kind, name, _ in rows:
+        conn.execute(f"DROP {kind.upper()} {name}")
+    return [row[2] for row in rows]
+
+
+def generate(spec: dict, log=print) -> dict:
+    """Build the dataset in the (new, empty) database at ``RECIRCLE_DB_PATH`` and return the load timings"""
+    # Imported here so the caller can point RECIRCLE_DB_PATH at the benchmark database first
+    from database import init_db, pool, transaction
+    from migrations import MIGRATIONS
+    from seed import SEED_MARKER_KEY, SEED_VERSION
+
+    started = time.perf_counter()
+    init_db()
+    rng = random.Random(spec["seed"])
+    words = vocabulary()
+
+    with pool.connection() as conn:
+        with transaction(conn):
+            recreate = _drop_secondary_objects(conn)
+
+            conn.executemany("INSERT INTO partners (id, name, location, points, created_at) VALUES (?, ?, ?, ?, ?)",
+                             _partner_rows(spec, rng, words))
+            for items, claims in item_chunks(spec, rng, words):
+                conn.executemany("""
+                    INSERT INTO items (id, category, description, location, quantity, status, created_at, donor_id)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """, items)
+                conn.executemany("INSERT INTO claims (item_id, partner_id, timestamp) VALUES (?, ?, ?)", claims)
+                if items[-1][0] % (CHUNK_SIZE * 20) < CHUNK_SIZE:
+                    log(f"  {items[-1][0]:,} / {spec['items']:,} items")
+            conn.execute(f"""
+                UPDATE partners SET points = {CLAIM_POINTS} * c.claims
+                FROM (SELECT partner_id, COUNT(*) AS claims FROM claims GROUP BY partner_id) AS c
+                WHERE c.partner_id = partners.id
+            """)
+            loaded = time.perf_counter()
+
+            log("  rebuilding indexes and derived tables")
+            for statement in recreate:
+                conn.execute(statement)
+            # The same backfills a migration runs over an existing database
+            for _, _, steps in MIGRATIONS:
+                for step in steps:
+                    if callable(step) and step.__name__.startswith("rebuild_"):
+                        step(conn)
+
+            conn.execute("INSERT OR REPLACE INTO app_meta (key, value) VALUES (?, ?)",
+                         (SEED_MARKER_KEY, str(SEED_VERSION)))
+            conn.execute("INSERT OR REPLACE INTO app_meta (key, value) VALUES (?, ?)",
+                         (DATASET_META_KEY, json.dumps(spec, sort_keys=True)))
+        conn.execute("ANALYZE")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    pool.close_all()
+
+    finished = time.perf_counter()
+    return {"load_seconds": round(loaded - started, 3), "rebuild_seconds": round(finished - loaded, 3)}
+
+
+def row_counts(path: str) -> Dict[str, int]:
+    """Rows per base table of a generated database"""
+    conn = sqlite3.connect(path)
+    try:
+        return {
+            table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ("partners", "items", "claims", "badges")
+        }
+    finally:
+        conn.close()
+
+
+def dataset_spec(path: str):
+    """The spec recorded in a generated database, or None"""
+    if not os.path.exists(path):
+        return None
+    conn = sqlite3.connect(path)
+    try:
+        row = conn.execute("SELECT value FROM app_meta WHERE key = ?", (DATASET_META_KEY,)).fetchone()
+    except sqlite3.Error:
+        return None
+    finally:
+        conn.close()
+    return json.loads(row[0]) if row else None
+
+
+def copy_dataset(source: str, target: str):
+    """Copy a generated database; it is checkpointed, so the main file is complete"""
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(target + suffix):
+            os.remove(target + suffix)
+    shutil.copyfile(source, target)
@@ -0,0 +1,250 @@
+"""Route scenarios and the load loop.
+
+A scenario builds one request at a time from a seeded RNG and the dataset
+vocabulary, so every run sends the same mix of partners, filters, search
+terms and chatbot messages. ``run_route`` sends ``requests`` of them with
+``concurrency`` requests in flight and summarizes throughput, status codes
+and latency percentiles.
+
+The app is reached either in-process (an ASGI transport with the app's
+lifespan running in the benchmark's event loop, which leaves out the
+network and server) or over HTTP against a uvicorn started on the copy of
+the dataset.
+"""
+import asyncio
+import os
+import random
+import signal
+import subprocess
+import sys
+import time
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+import httpx
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+REQUEST_TIMEOUT = 120.0
+SERVER_START_TIMEOUT = 300.0
+
+# (method, url, JSON body)
+BenchRequest = Tuple[str, str, Optional[dict]]
+
+
+def _partner(rng: random.Random, context: dict) -> int:
+    return rng.randint(1, context["partners"])
+
+
+def _query(path: str, **params) -> str:
+    return f"{path}?{urlencode({key: value for key, value in params.items() if value is not None})}"
+
+
+def _chat_message(rng: random.Random, context: dict) -> str:
+    if rng.random() < 0.5:
+        return rng.choice(context["chat_messages"])
+    city = rng.choice(context["locations"]).split(",")[0]
+    return f"How many {rng.choice(context['categories']).lower()} items are available in {city}?"
+
+
+SCENARIOS: Dict[str, Callable[[random.Random, dict], BenchRequest]] = {
+    "listings": lambda rng, context: ("GET", _query("/api/listings", limit=50), None),
+    "listings_filtered": lambda rng, context: ("GET", _query(
+        "/api/listings",
+        category=rng.choice(context["categories"]),
+        location=rng.choice(context["locations"]) if rng.random() < 0.5 else None,
+        status="available",
+        limit=50,
+    ), None),
+    "listings_search": lambda rng, context: ("GET", _query(
+        "/api/listings", q=rng.choice(context["keywords"]), limit=20
+    ), None),
+    "donations": lambda rng, context: ("GET", _query("/api/donations", limit=50), None),
+    # Full pages, where response encoding rather than the query dominates
+    "listings_large": lambda rng, context: ("GET", _query(
+        "/api/listings", category=rng.choice(context["categories"]), limit=1000
+    ), None),
+    "listings_large_columnar": lambda rng, context: ("GET", _query(
+        "/api/listings", category=rng.choice(context["categories"]), limit=1000, format="columnar"
+    ), None),
+    "donations_large": lambda rng, context: ("GET", _query("/api/donations", limit=1000), None),
+    "donations_large_columnar": lambda rng, context: ("GET", _query(
+        "/api/donations", limit=1000, format="columnar"
+    ), None),
+    "categories": lambda rng, context: ("GET", "/api/categories", None),
+    "partner_rank": lambda rng, context: ("GET", f"/api/partners/{_partner(rng, context)}/rank", None),
+    "badges": lambda rng, context: ("GET", f"/api/badges/{_partner(rng, context)}", None),
+    "challenges": lambda rng, context: ("GET", f"/api/badges/{_partner(rng, context)}/challenges", None),
+    "impact": lambda rng, context: ("GET", f"/api/impact/{_partner(rng, context)}", None),
+    "partner_insights": lambda rng, context: ("GET", f"/api/partner-insights/{_partner(rng, context)}", None),
+    "recommendations": lambda rng, context: ("GET", f"/api/recommendations/{_partner(rng, context)}", None),
+    "admin_kpis": lambda rng, context: ("GET", "/api/admin-kpis", None),
+    "donation_trends": lambda rng, context: ("GET", "/api/donation-trends", None),
+    "admin_map_data": lambda rng, context: ("GET", "/api/admin-map-data", None),
+    "chatbot": lambda rng, context: ("POST", "/api/chatbot", {"message": _chat_message(rng, context)}),
+    "categorize": lambda rng, context: ("POST", "/api/categorize-description", {
+        "description": " ".join(rng.sample(context["keywords"], 3))
+    }),
+    "create_donation": lambda rng, context: ("POST", "/api/donations", {
+        "category": rng.choice(context["categories"]),
+        "description": f"{rng.choice(context['keywords']).capitalize()} - benchmark donation",
+        "location": rng.choice(context["locations"]),
+        "quantity": rng.randint(1, 50),
+        "partner_id": _partner(rng, context),
+    }),
+}
+
+
+def summarize(latencies: List[float], statuses: Dict[str, int], errors: int, seconds: float) -> dict:
+    """Throughput, status counts and latency percentiles (ms) for one scenario"""
+    completed = len(latencies)
+    summary = {
+        "requests": completed + errors,
+        "errors": errors,
+        "status": dict(sorted(statuses.items())),
+        "seconds": round(seconds, 4),
+        "throughput_rps": round(completed / seconds, 2) if seconds > 0 else 0.0,
+    }
+    if latencies:
+        milliseconds = np.array(latencies) * 1000
+        p50, p95, p99 = np.percentile(milliseconds, [50, 95, 99])
+        summary["latency_ms"] = {
+            "p50": round(float(p50), 3),
+            "p95": round(float(p95), 3),
+            "p99": round(float(p99), 3),
+            "mean": round(float(milliseconds.mean()), 3),
+            "max": round(float(milliseconds.max()), 3),
+        }
+    return summary
+
+
+async def _send(client: httpx.AsyncClient, request: BenchRequest):
+    """``(status, seconds)`` for one request; status is None if it failed outright"""
+    method, url, body = request
+    started = time.perf_counter()
+    try:
+        response = await client.request(method, url, json=body)
+    except httpx.HTTPError:
+        return None, time.perf_counter() - started
+    return response.status_code, time.perf_counter() - started
+
+
+async def _drive(client: httpx.AsyncClient, requests: List[BenchRequest], concurrency: int):
+    """Send every request with ``concurrency`` in flight; returns ``(results, seconds)`` in request order"""
+    results = [None] * len(requests)
+    pending = iter(range(len(requests)))
+
+    async def worker():
+        for position in pending:
+            results[position] = await _send(client, requests[position])
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return results, time.perf_counter() - started
+
+
+def _tally(results) -> Tuple[List[float], Dict[str, int], int]:
+    latencies, statuses, errors = [], {}, 0
+    for status, seconds in results:
+        if status is None:
+            errors += 1
+            continue
+        latencies.append(seconds)
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    return latencies, statuses, errors
+
+
+async def run_route(client: httpx.AsyncClient, name: str, context: dict, requests: int,
+                    concurrency: int, warmup: int, seed: int) -> dict:
+    rng = random.Random(f"{seed}:{name}")
+    build = SCENARIOS[name]
+    if warmup:
+        await _drive(client, [build(rng, context) for _ in range(warmup)], concurrency)
+    results, seconds = await _drive(client, [build(rng, context) for _ in range(requests)], concurrency)
+    return summarize(*_tally(results), seconds)
+
+
+async def run_contention(client: httpx.AsyncClient, context: dict, items: int, claimers: int,
+                         concurrency: int, seed: int) -> dict:
+    """Race ``claimers`` partners for each of ``items`` available items through ``POST /api/claim``.
+
+    The attempts for one item are sent back to back, so with ``concurrency``
+    at least ``claimers`` they are in flight together. Exactly one attempt
+    per item must win; the rest get 400.
+    """
+    rng = random.Random(f"{seed}:contention")
+    response = await client.get(_query("/api/listings", status="available", limit=items))
+    response.raise_for_status()
+    item_ids = [item["id"] for item in response.json()]
+
+    partners = range(1, context["partners"] + 1)
+    attempts = [
+        (item_id, partner_id)
+        for item_id in item_ids
+        for partner_id in rng.sample(partners, min(claimers, len(partners)))
+    ]
+    results, seconds = await _drive(client, [
+        ("POST", "/api/claim", {"item_id": item_id, "partner_id": partner_id})
+        for item_id, partner_id in attempts
+    ], concurrency)
+
+    winners: Dict[int, int] = {item_id: 0 for item_id in item_ids}
+    for (item_id, _), (status, _) in zip(attempts, results):
+        if status == 200:
+            winners[item_id] += 1
+    return {
+        **summarize(*_tally(results), seconds),
+        "items": len(item_ids),
+        "claimers_per_item": min(claimers, len(partners)),
+        "won_once": sum(1 for count in winners.values() if count == 1),
+        "won_twice_or_more": sum(1 for count in winners.values() if count > 1),
+        "never_won": sum(1 for count in winners.values() if count == 0),
+    }
+
+
+@asynccontextmanager
+async def in_process_client():
+    """Client calling the app through ASGI, with its lifespan running"""
+    # Imported here so RECIRCLE_* settings for the benchmark are in place first
+    import main
+
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark",
+                                     timeout=REQUEST_TIMEOUT) as client:
+            yield client
+
+
+@asynccontextmanager
+async def uvicorn_client(concurrency: int, port: int, workers: int = 1):
+    """Client calling a uvicorn started on ``port`` with the current environment"""
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        cwd=BACKEND_DIR,
+    )
+    try:
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=REQUEST_TIMEOUT,
+                                     limits=limits) as client:
+            deadline = time.monotonic() + SERVER_START_TIMEOUT
+            while True:
+                if server.poll() is not None:
+                    raise RuntimeError(f"uvicorn exited with code {server.returncode}")
+                try:
+                    if (await client.get("/api/health")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"uvicorn did not start within {SERVER_START_TIMEOUT:.0f}s")
+                await asyncio.sleep(0.2)
+            yield client
+    finally:
+        server.send_signal(signal.SIGINT)
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+            server.wait()
@@ -0,0 +1,135 @@
+"""Serialization benchmark for the list endpoints' response bodies.
+
+Encodes one page of listings and donations three ways:
+
+- ``validated``: the previous path, a pydantic ``ItemResponse`` per listing
+  (a dict per donation), walked by ``jsonable_encoder`` and rendered by
+  ``JSONResponse``
+- ``rows``: ``RowEncoder`` straight from the rows to bytes (same output)
+- ``columnar``: ``format=columnar``, one array per field
+
+It reports the encode time, body size and ``json.loads`` time of each, on
+rows fetched as ``sqlite3.Row`` like the routes get them:
+
+    python -m benchmarks.serialization --rows 50000
+"""
+import argparse
+import json
+import random
+import sqlite3
+import sys
+import time
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from benchmarks.dataset import make_spec, vocabulary, item_chunks
+from models import ItemResponse
+from routes.donations import donation_encoder
+from routes.listings import listing_encoder
+
+
+def _rows(count: int, seed: int):
+    """``(listing_rows, donation_rows)`` as ``sqlite3.Row`` with the routes' column order"""
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    conn.execute("""
+        CREATE TABLE items (id INTEGER PRIMARY KEY, category TEXT, description TEXT, location TEXT,
+                            quantity INTEGER, status TEXT, created_at TEXT, donor_id INTEGER)
+    """)
+    spec = make_spec(count, seed=seed)
+    for items, _ in item_chunks(spec, random.Random(seed), vocabulary()):
+        conn.executemany("INSERT INTO items VALUES (?, ?, ?, ?, ?, ?, ?, ?)", items)
+    listings = conn.execute(
+        "SELECT id, category, description, location, quantity, status FROM items ORDER BY id DESC"
+    ).fetchall()
+    donations = conn.execute(
+        "SELECT id, category, description, location, quantity, status, created_at FROM items "
+        "ORDER BY created_at DESC, id DESC"
+    ).fetchall()
+    conn.close()
+    return listings, donations
+
+
+def _validated_listings(rows) -> bytes:
+    payload = [
+        ItemResponse(id=item[0], category=item[1], description=item[2], location=item[3],
+                     quantity=item[4], status=item[5])
+        for item in rows
+    ]
+    return JSONResponse(jsonable_encoder(payload)).body
+
+
+def _validated_donations(rows) -> bytes:
+    payload = [
+        {"id": d[0], "category": d[1], "description": d[2], "location": d[3],
+         "quantity": d[4], "status": d[5], "created_at": d[6]}
+        for d in rows
+    ]
+    return JSONResponse(jsonable_encoder(payload)).body
+
+
+def _best(fn, repeat: int):
+    """Fastest of ``repeat`` runs, in seconds, and the last result"""
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def measure(rows: int = 50000, repeat: int = 5, seed: int = 1) -> dict:
+    listings, donations = _rows(rows, seed)
+    endpoints = {
+        "listings": (listings, _validated_listings, listing_encoder),
+        "donations": (donations, _validated_donations, donation_encoder),
+    }
+
+    results = {}
+    for endpoint, (page, validated, encoder) in endpoints.items():
+        paths = {
+            "validated": lambda: validated(page),
+            "rows": lambda: encoder.encode(page),
+            "columnar": lambda: encoder.encode(page, "columnar"),
+        }
+        results[endpoint] = {}
+        baseline = None
+        for path, encode in paths.items():
+            seconds, body = _best(encode, repeat)
+            parse_seconds, _ = _best(lambda: json.loads(body), repeat)
+            baseline = baseline or seconds
+            results[endpoint][path] = {
+                "encode_ms": round(seconds * 1000, 3),
+                "rows_per_second": round(len(page) / seconds),
+                "speedup": round(baseline / seconds, 2),
+                "bytes": len(body),
+                "parse_ms": round(parse_seconds * 1000, 3),
+            }
+        if paths["rows"]() != paths["validated"]():
+            raise AssertionError(f"{endpoint}: fast path output differs from the validated path")
+    return {"rows": rows, "repeat": repeat, "results": results}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.serialization",
+                                     description="Compare response encoding paths for the list endpoints")
+    parser.add_argument("--rows", type=int, default=50000, help="rows per page")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per path; the fastest counts")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="write the results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    report = measure(args.rows, args.repeat, args.seed)
+    print(f"{args.rows:,} rows per page, best of {args.repeat}")
+    print(f"  {'endpoint':<10} {'path':<10} {'encode ms':>10} {'speedup':>8} {'bytes':>11} {'parse ms':>9}")
+    for endpoint, paths in report["results"].items():
+        for path, result in paths.items():
+            print(f"  {endpoint:<10} {path:<10} {result['encode_ms']:>10.1f} {result['speedup']:>7.2f}x "
+                  f"{result['bytes']:>11,} {result['parse_ms']:>9.1f}")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+"""In-process LRU caches.
+
+Readers that fill the cache from the database take ``generation`` before
+their query and pass it to ``put``. Every invalidation bumps the generation,
+so a result read before a write committed is never stored after the write
+invalidated it.
+
+Caches built with ``max_bytes`` also bound the total ``sizeof`` of their
+values; a value larger than the whole budget is not stored.
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+class LRUCache:
+    """Thread-safe LRU with hit/miss counters"""
+
+    def __init__(self, max_size: int, max_bytes: Optional[int] = None, sizeof: Callable[[Any], int] = len):
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.bytes = 0
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _pop(self, key: Hashable):
+        value = self._entries.pop(key)
+        if self.max_bytes is not None:
+            self.bytes -= self.sizeof(value)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any, generation: Optional[int] = None):
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            if key in self._entries:
+                self._pop(key)
+            if self.max_bytes is not None:
+                size = self.sizeof(value)
+                if size > self.max_bytes:
+                    return
+                self.bytes += size
+            self._entries[key] = value
+            while len(self._entries) > self.max_size or (self.max_bytes is not None and self.bytes > self.max_bytes):
+                self._pop(next(iter(self._entries)))
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self.generation += 1
+            if key in self._entries:
+                self._pop(key)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self.bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        stats = {"hits": self.hits, "misses": self.misses, "size": len(self._entries), "max_size": self.max_size}
+        if self.max_bytes is not None:
+            stats.update(bytes=self.bytes, max_bytes=self.max_bytes)
+        return stats
@@ -1,19 +1,389 @@
 import sqlite3
+import asyncio
 import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from metrics import SQL_TIMING, sql_metrics
+from migrations import run_migrations
 
-DATABASE_PATH = os.path.join(os.path.dirname(__file__), "recircle.db")
+DATABASE_PATH = os.getenv("RECIRCLE_DB_PATH", os.path.join(os.path.dirname(__file__), "recircle.db"))
+
+# Connection pool settings
+POOL_SIZE = int(os.getenv("RECIRCLE_DB_POOL_SIZE", "8"))
+POOL_TIMEOUT = float(os.getenv("RECIRCLE_DB_POOL_TIMEOUT", "10"))
+
+# Dedicated executor settings for running queries off the event loop
+DB_WORKERS = int(os.getenv("RECIRCLE_DB_WORKERS", "4"))
+DB_MAX_QUEUE = int(os.getenv("RECIRCLE_DB_MAX_QUEUE", "256"))
+
+# Pragmas applied to every pooled connection
+BUSY_TIMEOUT_MS = int(os.getenv("RECIRCLE_DB_BUSY_TIMEOUT_MS", "5000"))
+CONNECTION_PRAGMAS = (
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("cache_size", os.getenv("RECIRCLE_DB_CACHE_SIZE", "-65536")),  # negative = KiB, i.e. 64 MiB
+    ("mmap_size", os.getenv("RECIRCLE_DB_MMAP_SIZE", "268435456")),  # 256 MiB
+    ("temp_store", "MEMORY"),
+    ("busy_timeout", str(BUSY_TIMEOUT_MS)),
+)
+
+
+class DatabaseBusy(Exception):
+    """Raised when the database cannot take on more work right now"""
+
+
+class PoolTimeout(DatabaseBusy):
+    """Raised when no pooled connection becomes available in time"""
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor reporting each statement's time and rows fetched to ``sql_metrics``.
+
+    A statement's time is its ``execute`` plus every fetch of its rows, so a
+    query that is quick to start but slow to step through still shows up. It
+    is flagged slow once that total passes ``sql_metrics.slow_seconds``.
+    """
+
+    _stats = None
+    _seconds = 0.0
+    _rows = 0
+
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            _execute(self, sql, parameters)
+        except Exception:
+            sql_metrics.failed(sql, time.perf_counter() - started)
+            raise
+        self._begin(sql, time.perf_counter() - started)
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        try:
+            _executemany(self, sql, seq_of_parameters)
+        except Exception:
+            sql_metrics.failed(sql, time.perf_counter() - started)
+            raise
+        self._begin(sql, time.perf_counter() - started)
+        return self
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = _fetchone(self)
+        self._fetched(time.perf_counter() - started, 0 if row is None else 1)
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = _fetchmany(self, self.arraysize if size is None else size)
+        self._fetched(time.perf_counter() - started, len(rows))
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = _fetchall(self)
+        self._fetched(time.perf_counter() - started, len(rows))
+        return rows
+
+    def _begin(self, sql, seconds):
+        self._stats = sql_metrics.executed(sql, seconds)
+        self._seconds = seconds
+        self._rows = 0
+        if seconds >= sql_metrics.slow_seconds:
+            sql_metrics.slow(self._stats, seconds, 0)
+
+    def _fetched(self, seconds, rows):
+        stats = self._stats
+        if stats is None:
+            return
+        sql_metrics.fetched(stats, seconds, rows)
+        before = self._seconds
+        self._seconds = before + seconds
+        self._rows += rows
+        if before < sql_metrics.slow_seconds <= self._seconds:
+            sql_metrics.slow(stats, self._seconds, self._rows)
+
+
+# The base implementations, looked up once instead of through super() per call
+_execute = sqlite3.Cursor.execute
+_executemany = sqlite3.Cursor.executemany
+_fetchone = sqlite3.Cursor.fetchone
+_fetchmany = sqlite3.Cursor.fetchmany
+_fetchall = sqlite3.Cursor.fetchall
+
+
+class TimedConnection(sqlite3.Connection):
+    """Connection whose statements, commits and rollbacks are timed by ``sql_metrics``"""
+
+    def cursor(self, factory=TimedCursor):
+        return sqlite3.Connection.cursor(self, factory)
+
+    # sqlite3's shortcuts bypass cursor(), so route them through it
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        self._timed("COMMIT", super().commit)
+
+    def rollback(self):
+        self._timed("ROLLBACK", super().rollback)
+
+    def _timed(self, name, fn):
+        started = time.perf_counter()
+        try:
+            fn()
+        except Exception:
+            sql_metrics.failed(name, time.perf_counter() - started)
+            raise
+        sql_metrics.executed(name, time.perf_counter() - started)
+
+
+class ConnectionPool:
+    """Bounded pool of SQLite connections with per-thread reuse.
+
+    Connections are opened lazily up to ``max_size`` and kept open between
+    requests. A thread that already holds a connection gets the same one back
+    when it asks again, so nested helpers never need a second connection.
+    """
+
+    def __init__(self, path, max_size=POOL_SIZE, timeout=POOL_TIMEOUT):
+        self.path = path
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._all = []
+        self._stats = {
+            "created": 0,
+            "acquired": 0,
+            "reused": 0,
+            "waited": 0,
+            "timeouts": 0,
+            "in_use": 0,
+            "max_in_use": 0,
+            "wait_seconds": 0.0,
+        }
+
+    def _connect(self):
+        """Open a new connection and apply the tuning pragmas"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False,
+                               factory=TimedConnection if SQL_TIMING else sqlite3.Connection)
+        conn.row_factory = sqlite3.Row
+        for name, value in CONNECTION_PRAGMAS:
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    def acquire(self):
+        """Check a connection out of the pool, opening one if there is room"""
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = None
+            with self._lock:
+                if len(self._all) < self.max_size:
+                    conn = self._connect()
+                    self._all.append(conn)
+                    self._stats["created"] += 1
+            if conn is None:
+                started = time.perf_counter()
+                try:
+                    conn = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    with self._lock:
+                        self._stats["timeouts"] += 1
+                    raise PoolTimeout(f"No database connection available after {self.timeout}s")
+                with self._lock:
+                    self._stats["waited"] += 1
+                    self._stats["wait_seconds"] += time.perf_counter() - started
+
+        with self._lock:
+            self._stats["acquired"] += 1
+            self._stats["in_use"] += 1
+            self._stats["max_in_use"] = max(self._stats["max_in_use"], self._stats["in_use"])
+        return conn
+
+    def release(self, conn):
+        """Return a connection to the pool, discarding any open transaction"""
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            self._stats["in_use"] -= 1
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """Yield a connection, reusing the one this thread already holds"""
+        held = getattr(self._local, "conn", None)
+        if held is not None:
+            with self._lock:
+                self._stats["reused"] += 1
+            yield held
+            return
+
+        conn = self.acquire()
+        self._local.conn = conn
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            self.release(conn)
+
+    def close_all(self):
+        """Close every connection the pool has opened"""
+        with self._lock:
+            connections, self._all = self._all, []
+        while True:
+            try:
+                self._idle.get_nowait()
+            except queue.Empty:
+                break
+        for conn in connections:
+            conn.close()
+
+    def stats(self):
+        """Snapshot of pool counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._all)
+        stats["max_size"] = self.max_size
+        stats["idle"] = self._idle.qsize()
+        stats["wait_seconds"] = round(stats["wait_seconds"], 6)
+        return stats
+
+
+class DatabaseExecutor:
+    """Runs blocking database work on a bounded set of worker threads.
+
+    Each call receives a pooled connection as its first argument. At most
+    ``workers`` calls run at once; up to ``max_queue`` more may wait for a
+    worker, beyond that callers get ``DatabaseBusy`` instead of piling up.
+    """
+
+    def __init__(self, workers=DB_WORKERS, max_queue=DB_MAX_QUEUE):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = None
+        self._lock = threading.Lock()
+        self._stats = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "rejected": 0,
+            "queued": 0,
+            "running": 0,
+            "max_queued": 0,
+            "wait_seconds": 0.0,
+            "run_seconds": 0.0,
+        }
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="recircle-db")
+            return self._executor
+
+    def _call(self, submitted_at, fn, args, kwargs):
+        started = time.perf_counter()
+        with self._lock:
+            self._stats["queued"] -= 1
+            self._stats["running"] += 1
+            self._stats["wait_seconds"] += started - submitted_at
+        try:
+            with pool.connection() as conn:
+                return fn(conn, *args, **kwargs)
+        finally:
+            with self._lock:
+                self._stats["running"] -= 1
+                self._stats["run_seconds"] += time.perf_counter() - started
+
+    def _done(self, future):
+        # A job cancelled while still queued (its caller went away, or the
+        # executor shut down) never reaches _call to leave the queue
+        if future.cancelled():
+            with self._lock:
+                self._stats["queued"] -= 1
+
+    async def run(self, fn, *args, **kwargs):
+        """Run ``fn(conn, *args, **kwargs)`` on a database worker and await the result"""
+        executor = self._get_executor()
+        with self._lock:
+            if self.max_queue and self._stats["queued"] >= self.max_queue:
+                self._stats["rejected"] += 1
+                raise DatabaseBusy(f"Database queue is full ({self.max_queue} pending queries)")
+            self._stats["submitted"] += 1
+            self._stats["queued"] += 1
+            self._stats["max_queued"] = max(self._stats["max_queued"], self._stats["queued"])
+
+        future = executor.submit(self._call, time.perf_counter(), fn, args, kwargs)
+        future.add_done_callback(self._done)
+        try:
+            result = await asyncio.wrap_future(future)
+        except BaseException:
+            with self._lock:
+                self._stats["failed"] += 1
+            raise
+        with self._lock:
+            self._stats["completed"] += 1
+        return result
+
+    def shutdown(self):
+        """Wait for running work to finish and stop the worker threads"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def stats(self):
+        """Snapshot of executor counters"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["workers"] = self.workers
+        stats["max_queue"] = self.max_queue
+        stats["wait_seconds"] = round(stats["wait_seconds"], 6)
+        stats["run_seconds"] = round(stats["run_seconds"], 6)
+        return stats
+
+
+pool = ConnectionPool(DATABASE_PATH)
+db_executor = DatabaseExecutor()
+
+
+async def run_db(fn, *args, **kwargs):
+    """Await ``fn(conn, *args, **kwargs)`` on the database executor"""
+    return await db_executor.run(fn, *args, **kwargs)
+
+
+@contextmanager
+def transaction(conn):
+    """Run a block as one write transaction, taking the write lock up front.
+
+    ``BEGIN IMMEDIATE`` makes concurrent writers queue on ``busy_timeout``
+    instead of failing mid-transaction when two deferred readers both try
+    to upgrade to a write lock.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
 
-def get_db_connection():
-    """Get database connection"""
-    # Ensure the directory exists
-    os.makedirs(os.path.dirname(DATABASE_PATH), exist_ok=True)
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
 
 def init_db():
     """Initialize the database with required tables"""
-    conn = get_db_connection()
+    conn = pool.acquire()
     cursor = conn.cursor()
     
     # Create items table
@@ -67,11 +437,16 @@ def init_db():
     """)
     
     conn.commit()
-    conn.close()
+
+    # Bring the schema up to date (indexes, derived tables, triggers)
+    run_migrations(conn)
+    pool.release(conn)
     print("Database initialized successfully")
 
 def reset_db():
     """Reset the database (for testing purposes)"""
-    if os.path.exists(DATABASE_PATH):
-        os.remove(DATABASE_PATH)
+    pool.close_all()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(DATABASE_PATH + suffix):
+            os.remove(DATABASE_PATH + suffix)
     init_db()
\ No newline at end of file
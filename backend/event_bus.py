@@ -0,0 +1,133 @@
+"""In-process pub/sub for listing, donation and claim events.
+
+Write routes publish after their transaction commits; ``/api/events``
+streams the events to subscribers as server-sent events. Publishing runs on
+the event loop and never touches the database, so connected clients cost
+nothing until something changes.
+
+Subscribers filter by category and/or location. They are indexed by their
+filter, so an event is matched with four dictionary lookups however many
+clients are connected. Each subscriber has a bounded queue; a client that
+falls behind has its backlog replaced by a single ``resync`` event telling it
+to reload, instead of holding memory for it or slowing down publishers.
+"""
+import asyncio
+import itertools
+import os
+from typing import Dict, Optional, Set, Tuple
+
+QUEUE_SIZE = int(os.getenv("RECIRCLE_EVENTS_QUEUE_SIZE", "100"))
+MAX_SUBSCRIBERS = int(os.getenv("RECIRCLE_EVENTS_MAX_SUBSCRIBERS", "10000"))
+HEARTBEAT_SECONDS = float(os.getenv("RECIRCLE_EVENTS_HEARTBEAT_SECONDS", "15"))
+
+FilterKey = Tuple[Optional[str], Optional[str]]
+
+
+class TooManySubscribers(Exception):
+    """Raised when the bus already has ``MAX_SUBSCRIBERS`` subscribers"""
+
+
+class Event:
+    __slots__ = ("id", "type", "data")
+
+    def __init__(self, id: int, type: str, data: dict):
+        self.id = id
+        self.type = type
+        self.data = data
+
+
+class Subscription:
+    """One subscriber's filter and bounded event queue"""
+
+    def __init__(self, category: Optional[str], location: Optional[str], queue_size: int):
+        self.key: FilterKey = (category, location)
+        self.queue: "asyncio.Queue[Optional[Event]]" = asyncio.Queue(queue_size)
+        self.dropped = 0
+
+    def offer(self, event: Event) -> bool:
+        """Queue an event without waiting; on overflow swap the backlog for a resync"""
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            pass
+        while not self.queue.empty():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.dropped += 1
+        self.queue.put_nowait(Event(event.id, "resync", {"dropped": self.dropped}))
+        return False
+
+    async def next(self, timeout: float) -> Optional[Event]:
+        """The next event, or None after ``timeout`` seconds without one; raises on close"""
+        try:
+            event = await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        if event is None:
+            raise EOFError("Event bus closed")
+        return event
+
+
+class EventBus:
+    def __init__(self, queue_size: int = QUEUE_SIZE, max_subscribers: int = MAX_SUBSCRIBERS):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self._subscribers: Dict[FilterKey, Set[Subscription]] = {}
+        self._count = 0
+        self._ids = itertools.count(1)
+        self._stats = {"published": 0, "delivered": 0, "dropped": 0, "rejected": 0}
+
+    def subscribe(self, category: Optional[str] = None, location: Optional[str] = None) -> Subscription:
+        if self._count >= self.max_subscribers:
+            self._stats["rejected"] += 1
+            raise TooManySubscribers(f"Event stream is full ({self.max_subscribers} subscribers)")
+        subscription = Subscription(category or None, location or None, self.queue_size)
+        self._subscribers.setdefault(subscription.key, set()).add(subscription)
+        self._count += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscribers = self._subscribers.get(subscription.key)
+        if subscribers is None or subscription not in subscribers:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._subscribers[subscription.key]
+        self._count -= 1
+
+    def publish(self, type: str, data: dict, category: Optional[str] = None, location: Optional[str] = None):
+        """Deliver an event to every subscriber whose filter it matches"""
+        keys = {(None, None), (category, None), (None, location), (category, location)}
+        self._deliver(type, data, (self._subscribers.get(key, ()) for key in keys))
+
+    def broadcast(self, type: str, data: dict):
+        """Deliver an event to every subscriber regardless of filter"""
+        self._deliver(type, data, self._subscribers.values())
+
+    def _deliver(self, type: str, data: dict, groups):
+        event = Event(next(self._ids), type, data)
+        self._stats["published"] += 1
+        for subscribers in groups:
+            for subscription in subscribers:
+                if subscription.offer(event):
+                    self._stats["delivered"] += 1
+                else:
+                    self._stats["dropped"] += 1
+
+    def close(self):
+        """End every subscription, e.g. at shutdown"""
+        for subscribers in self._subscribers.values():
+            for subscription in subscribers:
+                while not subscription.queue.empty():
+                    subscription.queue.get_nowait()
+                subscription.queue.put_nowait(None)
+        self._subscribers.clear()
+        self._count = 0
+
+    def stats(self) -> dict:
+        return {**self._stats, "subscribers": self._count, "filters": len(self._subscribers),
+                "queue_size": self.queue_size, "max_subscribers": self.max_subscribers}
+
+
+bus = EventBus()
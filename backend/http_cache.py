@@ -0,0 +1,110 @@
+"""Cached JSON responses for read endpoints, with ETag revalidation.
+
+Responses are cached under the request path and query together with the
+current version of each table they are built from. Write routes call
+``table_versions.bump`` after they commit, so the next read of an affected
+endpoint misses and rebuilds while entries for other tables stay valid;
+superseded entries age out of the LRU.
+
+Responses carry a strong ETag (a hash of the body) and ``Cache-Control:
+no-cache``, so polling clients revalidate with ``If-None-Match`` and get an
+empty 304 while nothing has changed.
+
+Versions live in this process: writes made by CLI tools or other processes
+show up once the entry is evicted or the API restarts.
+"""
+import hashlib
+import os
+import threading
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Tuple
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from cache import LRUCache
+
+MAX_ENTRIES = int(os.getenv("RECIRCLE_RESPONSE_CACHE_ENTRIES", "1024"))
+MAX_BYTES = int(os.getenv("RECIRCLE_RESPONSE_CACHE_BYTES", str(32 * 1024 * 1024)))
+
+
+class TableVersions:
+    """Per-table write counters"""
+
+    def __init__(self):
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def bump(self, *tables: str):
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+
+    def snapshot(self, tables: Iterable[str]) -> Tuple[int, ...]:
+        with self._lock:
+            return tuple(self._versions.get(table, 0) for table in tables)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._versions)
+
+
+class _Entry:
+    __slots__ = ("body", "etag", "headers")
+
+    def __init__(self, body: bytes, etag: str, headers: Dict[str, str]):
+        self.body = body
+        self.etag = etag
+        self.headers = headers
+
+
+def _etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an ``If-None-Match`` header against ``etag``"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def _request_key(request: Request, tables: Tuple[str, ...]) -> tuple:
+    return request.url.path, tuple(sorted(request.query_params.multi_items())), table_versions.snapshot(tables)
+
+
+def _respond(request: Request, entry: _Entry) -> Response:
+    headers = {**entry.headers, "ETag": entry.etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+async def cached_json(request: Request, tables: Tuple[str, ...],
+                      build: Callable[[Response], Awaitable[object]]) -> Response:
+    """Serve ``build``'s JSON payload from the cache while ``tables`` are unchanged.
+
+    ``build(response)`` returns the payload, or its already encoded JSON
+    bytes, and may set headers on ``response``; they are cached with the body.
+    """
+    # Versions are read before building, so a response built while a write
+    # commits is stored under the old versions and never served after it.
+    # Writers must update in-memory sources (leaderboard, caches) before
+    # they bump, or a build in between reads stale state under new versions.
+    key = _request_key(request, tables)
+    entry = response_cache.get(key)
+    if entry is not None:
+        return _respond(request, entry)
+
+    headers = Response()
+    payload = await build(headers)
+    body = payload if isinstance(payload, bytes) else JSONResponse(jsonable_encoder(payload)).body
+    entry = _Entry(body, _etag(body), {
+        name: value for name, value in headers.headers.items() if name.lower() != "content-length"
+    })
+    response_cache.put(key, entry)
+    return _respond(request, entry)
+
+
+table_versions = TableVersions()
+response_cache = LRUCache(MAX_ENTRIES, MAX_BYTES, sizeof=lambda entry: len(entry.body))
@@ -0,0 +1,118 @@
+import json
+import os
+from typing import Callable, List, Optional, Tuple
+from fastapi import HTTPException, Request
+from pydantic import BaseModel, ValidationError
+from database import run_db, transaction
+from event_bus import bus
+from http_cache import table_versions
+from models import BulkIngestResult, BulkIngestResponse
+
+# Rows validated and inserted per transaction
+INGEST_CHUNK_SIZE = int(os.getenv("RECIRCLE_INGEST_CHUNK_SIZE", "1000"))
+
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/jsonl", "application/json-lines")
+
+INSERT_ITEM_SQL = """
+    INSERT INTO items (category, description, location, quantity, status)
+    VALUES (?, ?, ?, ?, 'available')
+"""
+
+
+async def iter_rows(request: Request):
+    """Yield ``(index, row, error)`` for every row of a bulk upload.
+
+    NDJSON bodies are parsed line by line as they arrive; anything else must
+    be a JSON array.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+
+    if content_type in NDJSON_CONTENT_TYPES:
+        index = 0
+        pending = b""
+        async for chunk in request.stream():
+            pending += chunk
+            *lines, pending = pending.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield (index, *_parse_line(line))
+                    index += 1
+        if pending.strip():
+            yield (index, *_parse_line(pending))
+        return
+
+    try:
+        rows = json.loads(await request.body())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+    if not isinstance(rows, list):
+        raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+    for index, row in enumerate(rows):
+        yield index, row, None
+
+
+def _parse_line(line: bytes):
+    try:
+        return json.loads(line), None
+    except ValueError as e:
+        return None, f"Invalid JSON: {e}"
+
+
+def _format_errors(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in detail['loc']) or 'row'}: {detail['msg']}"
+        for detail in error.errors()
+    )
+
+
+def _insert_chunk(conn, sql: str, params: List[tuple]) -> List[int]:
+    """Insert one chunk with executemany and return the new row ids in order"""
+    with transaction(conn):
+        cursor = conn.cursor()
+        cursor.executemany(sql, params)
+        # The write lock is held for the whole transaction, so AUTOINCREMENT
+        # hands this chunk a consecutive block of ids ending at the last one
+        last_id = cursor.execute("SELECT last_insert_rowid()").fetchone()[0]
+    return list(range(last_id - len(params) + 1, last_id + 1))
+
+
+async def ingest(request: Request, model: type, to_params: Callable[[BaseModel], tuple],
+                 check: Optional[Callable[[BaseModel], Optional[str]]] = None,
+                 sql: str = INSERT_ITEM_SQL, tables: tuple = ("items",)) -> BulkIngestResponse:
+    """Validate uploaded rows against ``model`` and insert them in bounded chunks.
+
+    ``tables`` lists the tables the insert writes to, triggers included, so
+    cached responses built from them are invalidated.
+    """
+    results: List[BulkIngestResult] = []
+    chunk: List[Tuple[int, tuple]] = []
+
+    async def flush():
+        ids = await run_db(_insert_chunk, sql, [params for _, params in chunk])
+        table_versions.bump(*tables)
+        bus.broadcast("bulk", {"inserted": len(ids)})
+        results.extend(BulkIngestResult(index=index, id=row_id) for (index, _), row_id in zip(chunk, ids))
+        chunk.clear()
+
+    async for index, raw, error in iter_rows(request):
+        if error is None:
+            try:
+                row = model.model_validate(raw)
+                error = check(row) if check else None
+            except ValidationError as e:
+                error = _format_errors(e)
+
+        if error is not None:
+            results.append(BulkIngestResult(index=index, error=error))
+            continue
+
+        chunk.append((index, to_params(row)))
+        if len(chunk) >= INGEST_CHUNK_SIZE:
+            await flush()
+
+    if chunk:
+        await flush()
+
+    results.sort(key=lambda result: result.index)
+    inserted = sum(1 for result in results if result.id is not None)
+    return BulkIngestResponse(inserted=inserted, failed=len(results) - inserted, results=results)
@@ -0,0 +1,43 @@
+"""Periodic background jobs.
+
+Jobs are plain ``fn(conn)`` helpers run on the database executor every
+``interval`` seconds for the lifetime of the app. A failing run is logged
+and retried on the next tick; it never takes the job down.
+"""
+import asyncio
+import logging
+from typing import Callable, List
+from database import run_db
+
+logger = logging.getLogger(__name__)
+
+_tasks: List[asyncio.Task] = []
+
+
+async def _run_periodically(name: str, interval: float, fn: Callable, run_at_start: bool):
+    if not run_at_start:
+        await asyncio.sleep(interval)
+    while True:
+        try:
+            result = await run_db(fn)
+            logger.info(f"Job {name} finished: {result}")
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception(f"Job {name} failed")
+        await asyncio.sleep(interval)
+
+
+def start_job(name: str, interval: float, fn: Callable, run_at_start: bool = False):
+    """Schedule ``fn(conn)`` every ``interval`` seconds; a non-positive interval disables it"""
+    if interval <= 0:
+        return
+    _tasks.append(asyncio.create_task(_run_periodically(name, interval, fn, run_at_start), name=name))
+
+
+async def stop_jobs():
+    """Cancel every scheduled job and wait for them to exit"""
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
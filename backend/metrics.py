@@ -0,0 +1,379 @@
+"""Request, SQL and profiling metrics, rendered in Prometheus text format.
+
+``MetricsMiddleware`` counts every HTTP request by method, route template
+and status and adds its duration to a per-route histogram. The connections
+``database.py`` opens report every SQL statement to ``sql_metrics``, which
+keeps the calls, seconds and rows per normalized query text (literals and
+whitespace folded, so ``LIMIT 50`` and ``LIMIT 100`` are one query). It also
+counts and logs statements slower than ``RECIRCLE_SLOW_QUERY_MS``.
+
+Recording a request or a statement is a lock, a dict lookup and a few
+additions, cheap enough to leave on. ``SamplingProfiler`` is off until
+started; while running it snapshots every thread's Python stack at a fixed
+interval from a background thread, and the request path does not change.
+"""
+import bisect
+import collections
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from typing import Callable, Collection, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SQL_TIMING = os.getenv("RECIRCLE_SQL_TIMING", "1").lower() not in ("0", "false", "no")
+SLOW_QUERY_SECONDS = float(os.getenv("RECIRCLE_SLOW_QUERY_MS", "100")) / 1000
+PROFILER_INTERVAL = float(os.getenv("RECIRCLE_PROFILER_INTERVAL_MS", "10")) / 1000
+PROFILER_AT_STARTUP = os.getenv("RECIRCLE_PROFILER", "").lower() in ("1", "true", "yes")
+
+# Request duration buckets in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Distinct query texts tracked before the rest are counted under OTHER_QUERY
+MAX_QUERIES = 1000
+OTHER_QUERY = "(other)"
+# Raw statement texts remembered to skip normalizing them again
+MAX_SQL_TEXTS = 4096
+RECENT_SLOW_QUERIES = 50
+
+# Requests that matched no route share one label instead of one per path
+UNMATCHED_ROUTE = "(unmatched)"
+
+# Starlette appends "; charset=utf-8" to text/ media types
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"
+
+
+def _header(lines: List[str], name: str, kind: str, help: str):
+    lines.append(f"# HELP {name} {help}")
+    lines.append(f"# TYPE {name} {kind}")
+
+
+class Histogram:
+    """Bucketed observation counts; render them cumulatively"""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        # bisect_left puts a value equal to a bound in that bound's bucket (le)
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, lines: List[str], name: str, **labels):
+        cumulative = 0
+        for bound, count in zip((*self.buckets, "+Inf"), self.counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{_labels(**labels, le=bound)} {cumulative}")
+        lines.append(f"{name}_sum{_labels(**labels)} {self.sum:.6f}")
+        lines.append(f"{name}_count{_labels(**labels)} {self.count}")
+
+
+class RequestMetrics:
+    """Request counts per ``(method, route, status)`` and a duration histogram per ``(method, route)``"""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.in_flight = 0
+        self._counts: Dict[Tuple[str, str, int], int] = {}
+        self._durations: Dict[Tuple[str, str], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, method: str, route: str, status: int, seconds: float):
+        with self._lock:
+            key = (method, route, status)
+            self._counts[key] = self._counts.get(key, 0) + 1
+            histogram = self._durations.get((method, route))
+            if histogram is None:
+                histogram = self._durations[(method, route)] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def render(self, lines: List[str]):
+        with self._lock:
+            _header(lines, "recircle_http_requests_total", "counter", "HTTP requests by method, route and status")
+            for (method, route, status), count in sorted(self._counts.items()):
+                lines.append(f"recircle_http_requests_total{_labels(method=method, route=route, status=status)} {count}")
+            _header(lines, "recircle_http_request_duration_seconds", "histogram",
+                    "HTTP request duration by method and route")
+            for (method, route), histogram in sorted(self._durations.items()):
+                histogram.render(lines, "recircle_http_request_duration_seconds", method=method, route=route)
+        _header(lines, "recircle_http_requests_in_flight", "gauge", "HTTP requests being handled")
+        lines.append(f"recircle_http_requests_in_flight {self.in_flight}")
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording every HTTP request in ``request_metrics``.
+
+    Requests are labelled with the matched route's path template
+    (``/api/badges/{partner_id}``), so the number of series stays bounded.
+    """
+
+    def __init__(self, app, metrics: Optional[RequestMetrics] = None):
+        self.app = app
+        self.metrics = metrics or request_metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        self.metrics.in_flight += 1
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            self.metrics.in_flight -= 1
+            # The router stores the matched route in the (shared) scope
+            route = getattr(scope.get("route"), "path", UNMATCHED_ROUTE)
+            self.metrics.observe(scope["method"], route, status, time.perf_counter() - started)
+
+
+_WHITESPACE = re.compile(r"\s+")
+# String and numeric literals, but not the digits of identifiers or ?NNN placeholders
+_LITERALS = re.compile(r"'(?:[^']|'')*'|(?<![\w?:$@.])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LISTS = re.compile(r"\(\?(?:, \?)+\)")
+
+
+def normalize_sql(sql: str) -> str:
+    """Query text with whitespace collapsed and literals replaced by ``?``"""
+    text = _WHITESPACE.sub(" ", sql).strip()
+    text = _LITERALS.sub("?", text)
+    return _PLACEHOLDER_LISTS.sub("(?, ...)", text)
+
+
+class QueryStats:
+    __slots__ = ("query", "calls", "seconds", "rows", "slow", "errors")
+
+    def __init__(self, query: str):
+        self.query = query
+        self.calls = 0
+        self.seconds = 0.0
+        self.rows = 0
+        self.slow = 0
+        self.errors = 0
+
+
+class QueryMetrics:
+    """Calls, time, rows returned and slow executions per normalized statement"""
+
+    def __init__(self, slow_seconds: float = SLOW_QUERY_SECONDS, max_queries: int = MAX_QUERIES,
+                 keep_slow: int = RECENT_SLOW_QUERIES):
+        self.slow_seconds = slow_seconds
+        self.max_queries = max_queries
+        self._queries: Dict[str, QueryStats] = {}
+        self._by_sql: Dict[str, QueryStats] = {}
+        self._recent_slow = collections.deque(maxlen=keep_slow)
+        self._lock = threading.Lock()
+
+    def _stats(self, sql: str) -> QueryStats:
+        # Most statements are constant strings, so look the raw text up first
+        stats = self._by_sql.get(sql)
+        if stats is not None:
+            return stats
+        query = normalize_sql(sql)
+        stats = self._queries.get(query)
+        if stats is None:
+            if len(self._queries) >= self.max_queries:
+                query = OTHER_QUERY
+                stats = self._queries.get(query)
+            if stats is None:
+                stats = self._queries[query] = QueryStats(query)
+        if len(self._by_sql) < MAX_SQL_TEXTS:
+            self._by_sql[sql] = stats
+        return stats
+
+    def executed(self, sql: str, seconds: float) -> QueryStats:
+        """Record one execution of ``sql``; returns the stats that its fetches add to"""
+        with self._lock:
+            stats = self._stats(sql)
+            stats.calls += 1
+            stats.seconds += seconds
+        return stats
+
+    def fetched(self, stats: QueryStats, seconds: float, rows: int):
+        with self._lock:
+            stats.seconds += seconds
+            stats.rows += rows
+
+    def failed(self, sql: str, seconds: float):
+        with self._lock:
+            stats = self._stats(sql)
+            stats.calls += 1
+            stats.errors += 1
+            stats.seconds += seconds
+
+    def slow(self, stats: QueryStats, seconds: float, rows: int):
+        """Record that one execution has taken longer than ``slow_seconds`` so far"""
+        with self._lock:
+            stats.slow += 1
+            self._recent_slow.append({
+                "query": stats.query,
+                "ms": round(seconds * 1000, 3),
+                "rows": rows,
+                "at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            })
+        logger.warning(f"Slow query ({seconds * 1000:.1f} ms, {rows} rows so far): {stats.query}")
+
+    def recent_slow(self) -> List[dict]:
+        with self._lock:
+            return list(self._recent_slow)
+
+    def render(self, lines: List[str]):
+        with self._lock:
+            queries = sorted(self._queries.values(), key=lambda stats: stats.query)
+            series = [
+                ("recircle_sql_queries_total", "SQL statements executed by normalized query", "calls"),
+                ("recircle_sql_query_seconds_total", "Seconds spent executing and fetching by normalized query",
+                 "seconds"),
+                ("recircle_sql_rows_total", "Rows fetched by normalized query", "rows"),
+                ("recircle_sql_slow_queries_total",
+                 f"Executions slower than {self.slow_seconds * 1000:g} ms by normalized query", "slow"),
+                ("recircle_sql_errors_total", "Failed executions by normalized query", "errors"),
+            ]
+            for name, help, field in series:
+                _header(lines, name, "counter", help)
+                for stats in queries:
+                    value = getattr(stats, field)
+                    lines.append(f"{name}{_labels(query=stats.query)} {value:.6f}" if field == "seconds"
+                                 else f"{name}{_labels(query=stats.query)} {value}")
+
+
+# Frames in these modules mean the thread is parked, not working
+_IDLE_MODULES = ("threading.py", "selectors.py", "queue.py", os.path.join("concurrent", "futures", "thread.py"))
+
+
+class SamplingProfiler:
+    """Counts the Python stack of every busy thread at a fixed interval.
+
+    Stacks are kept in collapsed form (``outer;...;inner``), so ``folded()``
+    can go straight into flame graph tools such as ``flamegraph.pl`` or
+    speedscope. Threads parked on a lock, queue or selector are skipped.
+    """
+
+    def __init__(self, interval: float = PROFILER_INTERVAL, max_stacks: int = 10000):
+        self.interval = interval
+        self.max_stacks = max_stacks
+        self.samples = 0
+        self.started_at: Optional[float] = None
+        self._stacks: Dict[str, int] = collections.Counter()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self, interval: Optional[float] = None):
+        with self._lock:
+            if interval is not None:
+                self.interval = interval
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self.started_at = time.time()
+            self._thread = threading.Thread(target=self._run, name="recircle-profiler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+
+    def reset(self):
+        with self._lock:
+            self._stacks.clear()
+            self.samples = 0
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            stacks = []
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own or frame.f_code.co_filename.endswith(_IDLE_MODULES):
+                    continue
+                names = []
+                while frame is not None:
+                    code = frame.f_code
+                    names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stacks.append(";".join(reversed(names)))
+            with self._lock:
+                self.samples += 1
+                for stack in stacks:
+                    if stack in self._stacks or len(self._stacks) < self.max_stacks:
+                        self._stacks[stack] += 1
+
+    def folded(self) -> str:
+        """One ``stack count`` line per sampled stack, most frequent first"""
+        with self._lock:
+            return "".join(f"{stack} {count}\n" for stack, count in self._stacks.most_common())
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"running": self.running, "interval_ms": self.interval * 1000, "samples": self.samples,
+                    "stacks": len(self._stacks), "started_at": self.started_at}
+
+    def render(self, lines: List[str]):
+        _header(lines, "recircle_profiler_running", "gauge", "Whether the sampling profiler is running")
+        lines.append(f"recircle_profiler_running {int(self.running)}")
+        _header(lines, "recircle_profiler_samples_total", "counter", "Stack samples taken by the profiler")
+        lines.append(f"recircle_profiler_samples_total {self.samples}")
+
+
+def render_stats(lines: List[str], prefix: str, stats: dict, counters: Collection[str] = ()):
+    """Numeric values of a ``stats()`` snapshot as ``<prefix>_<key>`` metrics.
+
+    Keys in ``counters`` only ever grow and are exported as
+    ``<prefix>_<key>_total`` counters, so ``rate()`` works on them; the
+    rest are gauges.
+    """
+    for key, value in stats.items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            if key in counters:
+                name, kind = f"{prefix}_{key}_total", "counter"
+            else:
+                name, kind = f"{prefix}_{key}", "gauge"
+            _header(lines, name, kind, f"{key.replace('_', ' ')} ({prefix})")
+            lines.append(f"{name} {value}")
+
+
+def render(sources: Iterable[Tuple[str, Callable[[], dict], Collection[str]]] = ()) -> str:
+    """Every metric in Prometheus text format, plus ``(prefix, stats, counters)`` sources"""
+    lines: List[str] = []
+    request_metrics.render(lines)
+    sql_metrics.render(lines)
+    profiler.render(lines)
+    for prefix, stats, counters in sources:
+        render_stats(lines, prefix, stats(), counters)
+    return "\n".join(lines) + "\n"
+
+
+request_metrics = RequestMetrics()
+sql_metrics = QueryMetrics()
+profiler = SamplingProfiler()
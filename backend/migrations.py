@@ -0,0 +1,144 @@
+"""Versioned schema migrations.
+
+Each migration is a ``(version, description, steps)`` tuple. Steps are SQL
+statements or callables taking the connection, and a migration runs in a
+single ``BEGIN IMMEDIATE`` transaction together with the ``schema_version``
+row that records it, so a half-applied migration is never left behind.
+Append new migrations to the end of ``MIGRATIONS``; never edit applied ones.
+"""
+import logging
+from services import badges, challenges, forecasting, geo, impact, insights, kpis, search, trends
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS = [
+    (1, "Indexes for listing filters, leaderboard, badges and claims", [
+        # /listings filters by category, location and/or status, newest first;
+        # the leading columns also serve DISTINCT category / location
+        "CREATE INDEX IF NOT EXISTS idx_items_category ON items (category, id)",
+        "CREATE INDEX IF NOT EXISTS idx_items_location ON items (location, id)",
+        "CREATE INDEX IF NOT EXISTS idx_items_category_location ON items (category, location, id)",
+        "CREATE INDEX IF NOT EXISTS idx_items_status ON items (status, id)",
+        # /donations keyset pagination on (created_at, id)
+        "CREATE INDEX IF NOT EXISTS idx_items_created_at ON items (created_at, id)",
+        # Leaderboard ORDER BY points DESC, covering the selected columns
+        "CREATE INDEX IF NOT EXISTS idx_partners_points ON partners (points DESC, id, name, location)",
+        # Badge lookups by partner, covering the selected columns and sort order
+        "CREATE INDEX IF NOT EXISTS idx_badges_partner ON badges (partner_id, earned DESC, name, description)",
+        # Claims aggregations per partner and joins back to items
+        "CREATE INDEX IF NOT EXISTS idx_claims_partner ON claims (partner_id, item_id, timestamp)",
+        "CREATE INDEX IF NOT EXISTS idx_claims_item ON claims (item_id)",
+    ]),
+    (2, "App metadata table and one claim per item", [
+        # Key/value store for one-time operations such as sample data seeding
+        """
+        CREATE TABLE IF NOT EXISTS app_meta (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        )
+        """,
+        # Earlier boots re-inserted the sample claims every time; keep the first
+        "DELETE FROM claims WHERE id NOT IN (SELECT MIN(id) FROM claims GROUP BY item_id)",
+        "DROP INDEX IF EXISTS idx_claims_item",
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_claims_item ON claims (item_id)",
+    ]),
+    (3, "Daily per-category donation rollup", [
+        trends.CREATE_DONATION_DAILY,
+        *trends.DONATION_DAILY_TRIGGERS,
+        # Backfill from the items already in the database
+        trends.rebuild_donation_daily,
+    ]),
+    (4, "Materialized admin KPIs", [
+        *kpis.CREATE_KPI_TABLES,
+        *kpis.KPI_TRIGGERS,
+        kpis.rebuild_kpis,
+    ]),
+    (5, "Geocoded items and partners with grid cells for map clustering", [
+        *geo.CREATE_GEO_TABLES,
+        geo.load_gazetteer,
+        *geo.GEO_TRIGGERS,
+        geo.rebuild_geo,
+    ]),
+    (6, "Stored demand forecasts", [
+        *forecasting.CREATE_FORECAST_TABLES,
+    ]),
+    (7, "Impact factors per category", [
+        *impact.CREATE_IMPACT_TABLES,
+        impact.load_factors,
+    ]),
+    (8, "Stored partner insights", [
+        *insights.CREATE_INSIGHT_TABLES,
+        *insights.INSIGHT_TRIGGERS,
+        insights.rebuild_insights,
+    ]),
+    (9, "Full-text index over item descriptions and categories", [
+        *search.CREATE_SEARCH_TABLES,
+        *search.SEARCH_TRIGGERS,
+        search.rebuild_search,
+    ]),
+    (10, "Rule-driven badges with per-partner counters", [
+        *badges.CREATE_BADGE_TABLES,
+        badges.load_rules,
+        *badges.BADGE_TRIGGERS,
+        badges.rebuild_badges,
+    ]),
+    (11, "Challenge definitions and per-partner monthly counters", [
+        *challenges.CREATE_CHALLENGE_TABLES,
+        challenges.load_challenges,
+        *challenges.CHALLENGE_TRIGGERS,
+        challenges.rebuild_monthly_counters,
+    ]),
+    (12, "Claimed weight in the admin KPIs from the impact factors", [
+        *kpis.CLAIMED_WEIGHT_COLUMNS,
+        kpis.CLAIMED_WEIGHT_TRIGGER,
+        kpis.rebuild_claimed_weight,
+    ]),
+]
+
+
+def current_version(conn) -> int:
+    """Return the highest applied migration version"""
+    row = conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()
+    return row[0]
+
+
+def run_migrations(conn, migrations=MIGRATIONS) -> int:
+    """Apply pending migrations in order and return the resulting version"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.commit()
+
+    version = current_version(conn)
+    for number, description, steps in migrations:
+        if number <= version:
+            continue
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Another worker may have applied it while we waited for the lock
+            if current_version(conn) >= number:
+                conn.rollback()
+                continue
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+            conn.execute(
+                "INSERT INTO schema_version (version, description) VALUES (?, ?)",
+                (number, description)
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        logger.info(f"Applied migration {number}: {description}")
+
+    # Refresh planner statistics for any new indexes
+    conn.execute("PRAGMA optimize")
+    return current_version(conn)
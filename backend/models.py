@@ -18,6 +18,25 @@ class ItemResponse(BaseModel):
     status: str = "available"
     created_at: Optional[datetime] = None
 
+class Recommendation(ItemResponse):
+    score: float
+    distance_km: Optional[float] = None
+
+class SearchResult(ItemResponse):
+    score: float
+    snippet: str
+
+# Bulk ingestion models
+class BulkIngestResult(BaseModel):
+    index: int
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+class BulkIngestResponse(BaseModel):
+    inserted: int
+    failed: int
+    results: List[BulkIngestResult]
+
 # Claim models
 class ClaimRequest(BaseModel):
     item_id: int = Field(..., description="ID of the item to claim")
@@ -29,12 +48,29 @@ class ClaimResponse(BaseModel):
     status: str
     message: str
 
+class BatchClaimRequest(BaseModel):
+    partner_id: int = Field(..., description="ID of the partner making the claims")
+    item_ids: List[int] = Field(..., min_length=1, max_length=500, description="IDs of the items to claim")
+
+class BatchClaimResult(BaseModel):
+    item_id: int
+    status: str  # "claimed", "not_found" or "unavailable"
+    message: str
+
+class BatchClaimResponse(BaseModel):
+    partner_id: int
+    claimed: int
+    failed: int
+    points_awarded: int
+    results: List[BatchClaimResult]
+
 # Impact models
 class ImpactResponse(BaseModel):
     partner_id: int
     partner_name: str
     items_claimed: int
     waste_diverted_kg: float
+    co2_reduced_kg: float = 0.0
     people_helped: int
     points: int
 
@@ -45,6 +81,10 @@ class Partner(BaseModel):
     location: str
     points: int
 
+class PartnerRank(Partner):
+    rank: int
+    total: int
+
 # Authentication models
 class LoginRequest(BaseModel):
     username: str
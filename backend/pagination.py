@@ -0,0 +1,54 @@
+import base64
+import json
+import os
+from fastapi import HTTPException
+from database import run_db
+
+# Page size limits for keyset-paginated list endpoints
+MAX_PAGE_SIZE = int(os.getenv("RECIRCLE_MAX_PAGE_SIZE", "1000"))
+STREAM_PAGE_SIZE = int(os.getenv("RECIRCLE_STREAM_PAGE_SIZE", "1000"))
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def encode_cursor(*values) -> str:
+    """Encode the sort key of the last row into an opaque cursor"""
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    """Decode a cursor produced by encode_cursor, rejecting malformed input"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+    return values
+
+
+async def stream_ndjson(fetch_page, encode_row, cursor_of, after=None, limit=None, page_size=STREAM_PAGE_SIZE):
+    """Yield rows as NDJSON lines, one keyset page per database round trip.
+
+    ``fetch_page(conn, after, size)`` returns at most ``size`` rows following
+    the ``after`` sort key, and ``cursor_of(row)`` gives the key of a row.
+    Only one page is held in memory at a time and no read transaction stays
+    open between pages, so exports of any size run in constant memory.
+    """
+    remaining = limit
+    while True:
+        size = page_size if remaining is None else min(page_size, remaining)
+        rows = await run_db(fetch_page, after, size)
+        for row in rows:
+            yield encode_row(row) + "\n"
+
+        if remaining is not None:
+            remaining -= len(rows)
+            if remaining <= 0:
+                return
+        if len(rows) < size:
+            return
+        after = cursor_of(rows[-1])
@@ -0,0 +1,165 @@
+"""Print EXPLAIN QUERY PLAN for the queries behind each API route.
+
+Every check runs the route's real query helper against a recording
+connection, so the plans shown are for the exact SQL the handlers issue.
+Plans that fall back to a full table or index scan or a temporary sort are
+flagged, and the script exits non-zero if any check regresses or its helper
+raises:
+
+    python query_plans.py
+"""
+import re
+import sys
+from database import init_db, pool
+from routes import listings, donations, badges, admin_map_data
+from services import badges as badge_rules, challenges, chatbot, forecasting, impact, insights, kpis, trends
+from services.leaderboard import Leaderboard
+from services.matching import Matcher
+
+# Plan details that mean the query no longer uses an index: a full scan of a
+# table or of one of its indexes, or a sort that the index order should have
+# made unnecessary. Virtual tables (FTS5 MATCH, json_each over a parameter)
+# only visit the rows they are asked for, so their SCANs are not flagged.
+REGRESSION_PATTERN = re.compile(r"^SCAN (?!\S+ VIRTUAL TABLE)|USE TEMP B-TREE")
+
+
+class _PlanCursor:
+    def __init__(self, recorder):
+        self.recorder = recorder
+        self.lastrowid = None
+        self.rowcount = 0
+
+    def execute(self, sql, params=()):
+        self.recorder.explain(sql, params)
+        return self
+
+    def executemany(self, sql, rows):
+        rows = list(rows)
+        if rows:
+            self.recorder.explain(sql, rows[0])
+        return self
+
+    def fetchone(self):
+        return None
+
+    def fetchall(self):
+        return []
+
+    def fetchmany(self, size=None):
+        return []
+
+
+class PlanRecorder:
+    """Stand-in connection that explains statements instead of running them"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.plans = []
+
+    def explain(self, sql, params=()):
+        statement = sql.strip()
+        if statement.upper().startswith(("BEGIN", "COMMIT", "ROLLBACK", "PRAGMA")):
+            return
+        rows = self.conn.execute(f"EXPLAIN QUERY PLAN {statement}", params).fetchall()
+        self.plans.append((" ".join(statement.split()), [row[3] for row in rows]))
+
+    def cursor(self):
+        return _PlanCursor(self)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, rows):
+        return self.cursor().executemany(sql, rows)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    @property
+    def in_transaction(self):
+        return False
+
+
+def _refresh_matcher(conn):
+    matcher = Matcher()
+    matcher.loaded = True
+    matcher.refresh(conn)
+
+
+# (route, query helper, helper arguments, plan details that are expected)
+CHECKS = [
+    ("GET /api/listings", listings._fetch_listings, (None, None, None), ("SCAN i",)),
+    ("GET /api/listings?category=", listings._fetch_listings, ("Food", None, None), ()),
+    ("GET /api/listings?location=", listings._fetch_listings, (None, "Chicago", None), ()),
+    ("GET /api/listings?status=", listings._fetch_listings, (None, None, "available"), ()),
+    ("GET /api/listings?category=&location=", listings._fetch_listings, ("Food", "Chicago", None), ()),
+    ("GET /api/listings?status=&after=&limit=", listings._fetch_listings, (None, None, "available", 100, 50), ()),
+    # FTS5 ranks every match before the LIMIT; the filters apply per matched row
+    ("GET /api/listings?q=", listings._search_listings, ('"winter"* "jacket"*', None, None, None, None, 50),
+     ("USE TEMP B-TREE FOR ORDER BY",)),
+    ("GET /api/listings?q=&status=&after=", listings._search_listings,
+     ('"winter"*', None, None, "available", [-1.5, 100], 50), ("USE TEMP B-TREE FOR ORDER BY",)),
+    # Without a limit every donation is listed, in index order
+    ("GET /api/donations", donations._fetch_donations, (), ("SCAN items USING INDEX idx_items_created_at",)),
+    ("GET /api/donations?after=", donations._fetch_donations, (["2025-01-01 00:00:00", 100], 50), ()),
+    # DISTINCT walks the covering index once; the response is cached until items change
+    ("GET /api/categories", listings._fetch_distinct, ("category",), ("SCAN items USING COVERING INDEX idx_items_category",)),
+    ("GET /api/locations", listings._fetch_distinct, ("location",), ("SCAN items USING COVERING INDEX idx_items_location",)),
+    # The leaderboard reads every partner once at startup and on a consistency check
+    ("GET /api/leaderboard/check", Leaderboard().load, (), ("SCAN partners USING COVERING INDEX idx_partners_points",)),
+    # The rule list is small; sorting it with the partner's badges stays cheap
+    ("GET /api/badges/{partner_id}", badges._fetch_badges, (1,), ("SCAN r", "USE TEMP B-TREE FOR ORDER BY")),
+    ("GET /api/badges/{partner_id}/challenges", challenges.fetch_challenges, (1, "2025-07"), ("SCAN ch",)),
+    # Re-evaluation checks every partner against every rule after the rules change
+    ("badge re-evaluation", badge_rules.reevaluate, (), ("SCAN p USING COVERING INDEX idx_partners_points", "SCAN r")),
+    ("POST /api/claims/batch", listings._claim_items, (1, [1, 2, 3]), ()),
+    ("GET /api/donation-trends?days=", trends.fetch_daily_counts, (30,), ()),
+    ("GET /api/donation-trends?days=&category=", trends.fetch_daily_counts, (365, "Food"), ()),
+    ("GET /api/admin-kpis", kpis.fetch_kpis, (), ()),
+    ("GET /api/admin-kpis?days=", kpis.fetch_kpis, (30,), ("USE TEMP B-TREE FOR count(DISTINCT)",)),
+    ("GET /api/recommendations/{partner_id}", _refresh_matcher, (), ()),
+    ("GET /api/impact?partner_ids=", impact._compute, ([1, 2, 3],), ()),
+    ("GET /api/partner-insights/{partner_id}", insights.fetch_insight, (1,), ()),
+    ("GET /api/partner-insights", insights.fetch_all_insights, (), ("SCAN p",)),
+    # Refreshed at most once per RECIRCLE_CHATBOT_LIVE_TTL_SECONDS, whatever the chat traffic
+    ("POST /api/chatbot (live answers)", chatbot.fetch_availability, (), ("USE TEMP B-TREE FOR GROUP BY",)),
+    ("GET /api/forecast/{partner_id}", forecasting.fetch_forecast, (1,), ("USE TEMP B-TREE FOR ORDER BY",)),
+    ("forecast retrain job", forecasting._read_history, ("2025-01-01",), ("USE TEMP B-TREE FOR GROUP BY",)),
+    # Clusters group the small per-cell and partner tables, so the sorts stay cheap
+    ("GET /api/admin-map-data?bbox=&zoom=", admin_map_data._fetch_map_data, ((-125.0, 24.0, -66.0, 50.0), 4),
+     ("USE TEMP B-TREE FOR GROUP BY", "USE TEMP B-TREE FOR ORDER BY", "USE TEMP B-TREE FOR count(DISTINCT)")),
+]
+
+
+def run_checks(conn, checks=CHECKS, out=sys.stdout) -> int:
+    """Print the plan of every check and return the number of regressions and failed checks"""
+    regressions = failures = 0
+    for route, helper, args, expected in checks:
+        recorder = PlanRecorder(conn)
+        try:
+            helper(recorder, *args)
+        except Exception as e:
+            print(f"== {route}\n   !! {type(e).__name__}: {e}", file=out)
+            failures += 1
+            continue
+
+        print(f"== {route}", file=out)
+        for sql, details in recorder.plans:
+            print(f"   {sql}", file=out)
+            for detail in details:
+                flagged = bool(REGRESSION_PATTERN.search(detail)) and detail not in expected
+                if flagged:
+                    regressions += 1
+                print(f"     {'!!' if flagged else '->'} {detail}", file=out)
+    return regressions + failures
+
+
+if __name__ == "__main__":
+    init_db()
+    with pool.connection() as conn:
+        regressions = run_checks(conn)
+    print(f"{regressions} plan regression(s) or failed check(s) found")
+    sys.exit(1 if regressions else 0)
@@ -1,5 +1,8 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
+from typing import Optional
+from database import run_db, DatabaseBusy
+from services.kpis import fetch_kpis
 
 router = APIRouter()
 
@@ -10,12 +13,19 @@ class AdminKPIs(BaseModel):
     avgClaimTime: float
 
 @router.get("/admin-kpis", response_model=AdminKPIs)
-async def get_admin_kpis():
-    """Get admin dashboard key performance indicators"""
-    # Mock KPI data
+async def get_admin_kpis(days: Optional[int] = Query(None, ge=1, le=365)):
+    """Get admin dashboard key performance indicators, all time or for the last ``days`` days"""
+    try:
+        kpis = await run_db(fetch_kpis, days)
+    except DatabaseBusy:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+    timed_claims = kpis.get("timed_claims", 0)
     return AdminKPIs(
-        totalDonations=1247,
-        wasteDiverted=623.5,  # kg
-        activePartners=12,
-        avgClaimTime=2.3  # hours
-    ) 
\ No newline at end of file
+        totalDonations=kpis.get("donations", 0),
+        wasteDiverted=round(kpis.get("claimed_weight_kg", 0), 1),  # kg
+        activePartners=kpis.get("active_partners", 0),
+        avgClaimTime=round(kpis["claim_seconds"] / timed_claims / 3600, 1) if timed_claims else 0.0  # hours
+    )
\ No newline at end of file
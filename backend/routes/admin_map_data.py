@@ -1,6 +1,8 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
+from fastapi import APIRouter, HTTPException, Query
+from typing import List, Optional
 from pydantic import BaseModel
+from database import run_db, DatabaseBusy
+from services.geo import parse_bbox, fetch_donation_clusters, fetch_partner_clusters
 
 router = APIRouter()
 
@@ -10,23 +12,29 @@ class MapData(BaseModel):
     type: str  # "partner" or "donation"
     name: str
     location: str
+    count: int = 1
 
-@router.get("/admin-map-data", response_model=List[MapData])
-async def get_admin_map_data():
-    """Get geospatial data for admin map visualization"""
-    # Mock map data with partners and donations
-    mock_data = [
-        # Partners
-        {"lat": 40.7128, "lng": -74.0060, "type": "partner", "name": "Community Aid", "location": "New York"},
-        {"lat": 34.0522, "lng": -118.2437, "type": "partner", "name": "Green Cycle", "location": "Los Angeles"},
-        {"lat": 41.8781, "lng": -87.6298, "type": "partner", "name": "Eco Warriors", "location": "Chicago"},
-        {"lat": 29.7604, "lng": -95.3698, "type": "partner", "name": "Food Bank Central", "location": "Houston"},
-        
-        # Donations
-        {"lat": 40.7589, "lng": -73.9851, "type": "donation", "name": "Donation Center", "location": "Manhattan"},
-        {"lat": 40.7505, "lng": -73.9934, "type": "donation", "name": "Clothing Drive", "location": "Brooklyn"},
-        {"lat": 34.0736, "lng": -118.2400, "type": "donation", "name": "Electronics Hub", "location": "Hollywood"},
-        {"lat": 34.1016, "lng": -118.3267, "type": "donation", "name": "Furniture Collection", "location": "Beverly Hills"},
+def _fetch_map_data(conn, bbox, zoom):
+    partners = fetch_partner_clusters(conn, bbox, zoom)
+    donations = fetch_donation_clusters(conn, bbox, zoom)
+    return [
+        *({**cluster, "type": "partner"} for cluster in partners),
+        *({**cluster, "type": "donation"} for cluster in donations),
     ]
-    
-    return [MapData(**item) for item in mock_data] 
\ No newline at end of file
+
+@router.get("/admin-map-data", response_model=List[MapData])
+async def get_admin_map_data(bbox: Optional[str] = None, zoom: Optional[int] = Query(None, ge=0, le=22)):
+    """Get partner and donation markers for the admin map, clustered for the given ``bbox`` and ``zoom``"""
+    try:
+        area = parse_bbox(bbox)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid bbox: {e}")
+
+    try:
+        markers = await run_db(_fetch_map_data, area, zoom)
+    except DatabaseBusy:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+    return [MapData(**marker) for marker in markers]
\ No newline at end of file
@@ -1,6 +1,8 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import JSONResponse
-from database import get_db_connection
+from database import run_db, DatabaseBusy
+from http_cache import cached_json
+from services.challenges import fetch_challenges
 from typing import List, Dict, Any
 
 router = APIRouter()
@@ -17,21 +19,32 @@ async def badges_options(partner_id: int):
         }
     )
 
+def _fetch_badges(conn, partner_id: int):
+    cursor = conn.cursor()
+    # Every current rule, earned or not, plus badges earned under retired rules
+    cursor.execute("""
+        SELECT r.name, r.description, COALESCE(b.earned, 0) AS earned
+        FROM badge_rules r
+        LEFT JOIN badges b ON b.partner_id = ? AND b.name = r.name
+        UNION ALL
+        SELECT b.name, b.description, b.earned
+        FROM badges b
+        WHERE b.partner_id = ? AND b.name NOT IN (SELECT name FROM badge_rules)
+        ORDER BY earned DESC, name ASC
+    """, (partner_id, partner_id))
+    return cursor.fetchall()
+
 @router.get("/badges/{partner_id}")
-async def get_badges(partner_id: int) -> List[Dict[str, Any]]:
+async def get_badges(request: Request, partner_id: int) -> List[Dict[str, Any]]:
     """Get badges for a specific partner"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    try:
-        cursor.execute("""
-            SELECT name, description, earned 
-            FROM badges 
-            WHERE partner_id = ?
-            ORDER BY earned DESC, name ASC
-        """, (partner_id,))
-        badges = cursor.fetchall()
-        
+    async def build(response):
+        try:
+            badges = await run_db(_fetch_badges, partner_id)
+        except DatabaseBusy:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
         return [
             {
                 "name": badge[0],
@@ -40,34 +53,15 @@ async def get_badges(partner_id: int) -> List[Dict[str, Any]]:
             }
             for badge in badges
         ]
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
-    finally:
-        conn.close()
+
+    return await cached_json(request, ("badges",), build)
 
 @router.get("/badges/{partner_id}/challenges")
 async def get_challenges(partner_id: int) -> List[Dict[str, Any]]:
     """Get active challenges for a partner"""
-    # Mock challenges data - in real app, this would come from database
-    challenges = [
-        {
-            "name": "Claim Champion",
-            "target": 10,
-            "progress": 5,
-            "description": "Claim 10 items this month"
-        },
-        {
-            "name": "Monthly Donor",
-            "target": 5,
-            "progress": 3,
-            "description": "Donate 5 items this month"
-        },
-        {
-            "name": "Eco Warrior",
-            "target": 1000,
-            "progress": 750,
-            "description": "Earn 1000 points"
-        }
-    ]
-    
-    return challenges 
\ No newline at end of file
+    try:
+        return await run_db(fetch_challenges, partner_id)
+    except DatabaseBusy:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
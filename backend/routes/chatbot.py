@@ -1,5 +1,9 @@
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from database import run_db, DatabaseBusy
+from services.chatbot import engine
+import time
 
 router = APIRouter()
 
@@ -8,34 +12,42 @@ class ChatbotRequest(BaseModel):
 
 class ChatbotResponse(BaseModel):
     response: str
+    intent: Optional[str] = None
+
+class IntentExample(BaseModel):
+    message: str
+    intent: Optional[str] = None
+
+class IntentEvaluationRequest(BaseModel):
+    examples: List[IntentExample] = Field(..., max_length=10000)
 
 @router.post("/chatbot", response_model=ChatbotResponse)
 async def chatbot_response(request: ChatbotRequest):
     """Get chatbot response based on user message"""
-    message = request.message.lower()
-    
-    # Simple rule-based responses
-    if any(word in message for word in ["donate", "how to donate", "donation"]):
-        return ChatbotResponse(
-            response="To donate items, go to the Donation page and fill out the form with your item details. We'll help you categorize and schedule pickup."
-        )
-    elif any(word in message for word in ["claim", "how to claim", "claiming"]):
-        return ChatbotResponse(
-            response="Partners can claim items from the ItemMatch section on their dashboard. Items are recommended based on your location and needs."
-        )
-    elif any(word in message for word in ["badge", "challenge", "achievement"]):
-        return ChatbotResponse(
-            response="Complete challenges to earn badges! Try claiming 10 items this month for the 'Community Star' badge."
-        )
-    elif any(word in message for word in ["impact", "environmental", "sustainability"]):
-        return ChatbotResponse(
-            response="Every item donated helps reduce waste and CO2 emissions. Check your Impact Calculator to see your environmental contribution."
-        )
-    elif any(word in message for word in ["help", "support", "assistance"]):
-        return ChatbotResponse(
-            response="I can help you with donations, claims, badges, and impact tracking. Just ask me anything about ReCircle!"
-        )
-    else:
-        return ChatbotResponse(
-            response="I'm here to help with ReCircle questions! Try asking about donations, claims, badges, or environmental impact."
-        ) 
\ No newline at end of file
+    started = time.perf_counter()
+    intent, tokens = engine.match(request.message)
+
+    availability = None
+    if intent.live is not None:
+        availability = engine.cached_availability()
+        if availability is None:
+            try:
+                availability = await run_db(engine.refresh_availability)
+            except DatabaseBusy:
+                raise
+            except Exception as e:
+                raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+    response = engine.answer(intent, tokens, availability)
+    engine.record(intent, time.perf_counter() - started)
+    return ChatbotResponse(response=response, intent=intent.name)
+
+@router.post("/chatbot/evaluate")
+async def evaluate_intents(request: IntentEvaluationRequest):
+    """Match labelled messages and report intent accuracy"""
+    return engine.evaluate([example.model_dump() for example in request.examples])
+
+@router.get("/chatbot/stats")
+async def chatbot_stats():
+    """Hits and answer latency per intent"""
+    return engine.stats()
\ No newline at end of file
@@ -1,6 +1,8 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
+from fastapi import APIRouter, HTTPException, Query
+from typing import List, Optional
 from pydantic import BaseModel
+from database import run_db, DatabaseBusy
+from services.geo import parse_bbox, fetch_donation_clusters
 
 router = APIRouter()
 
@@ -9,20 +11,21 @@ class DonationLocation(BaseModel):
     lng: float
     location: str
     quantity: int
+    count: int = 1
 
 @router.get("/donation-locations", response_model=List[DonationLocation])
-async def get_donation_locations():
-    """Get donation locations for heatmap visualization"""
-    # Mock data for demonstration
-    mock_locations = [
-        {"lat": 40.7128, "lng": -74.0060, "location": "New York", "quantity": 50},
-        {"lat": 34.0522, "lng": -118.2437, "location": "Los Angeles", "quantity": 30},
-        {"lat": 41.8781, "lng": -87.6298, "location": "Chicago", "quantity": 25},
-        {"lat": 29.7604, "lng": -95.3698, "location": "Houston", "quantity": 20},
-        {"lat": 33.7490, "lng": -84.3880, "location": "Atlanta", "quantity": 35},
-        {"lat": 25.7617, "lng": -80.1918, "location": "Miami", "quantity": 15},
-        {"lat": 39.9526, "lng": -75.1652, "location": "Philadelphia", "quantity": 40},
-        {"lat": 32.7767, "lng": -96.7970, "location": "Dallas", "quantity": 28},
-    ]
-    
-    return [DonationLocation(**location) for location in mock_locations] 
\ No newline at end of file
+async def get_donation_locations(bbox: Optional[str] = None, zoom: Optional[int] = Query(None, ge=0, le=22)):
+    """Get donation locations for heatmap visualization, clustered for the given ``bbox`` and ``zoom``"""
+    try:
+        area = parse_bbox(bbox)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid bbox: {e}")
+
+    try:
+        clusters = await run_db(fetch_donation_clusters, area, zoom)
+    except DatabaseBusy:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+    return [DonationLocation(**cluster) for cluster in clusters]
\ No newline at end of file
@@ -1,44 +1,32 @@
-from fastapi import APIRouter, HTTPException
-from typing import List, Dict
+from fastapi import APIRouter, HTTPException, Query
+from typing import List, Optional
 from pydantic import BaseModel
-from datetime import datetime, timedelta
+from database import run_db, DatabaseBusy
+from services.trends import fetch_daily_counts
 
 router = APIRouter()
 
 class CategoryData(BaseModel):
-    Clothing: int
-    Electronics: int
-    Food: int
-    Furniture: int
+    Clothing: int = 0
+    Electronics: int = 0
+    Food: int = 0
+    Furniture: int = 0
 
 class DonationTrend(BaseModel):
     date: str
     categories: CategoryData
 
 @router.get("/donation-trends", response_model=List[DonationTrend])
-async def get_donation_trends():
-    """Get donation trends for the last 7 days"""
-    # Generate mock data for the last 7 days
-    trends = []
-    base_date = datetime.now() - timedelta(days=6)
-    
-    # Mock trend data with realistic variations
-    mock_data = [
-        {"Clothing": 25, "Electronics": 15, "Food": 30, "Furniture": 10},
-        {"Clothing": 30, "Electronics": 20, "Food": 35, "Furniture": 12},
-        {"Clothing": 28, "Electronics": 18, "Food": 32, "Furniture": 15},
-        {"Clothing": 35, "Electronics": 22, "Food": 40, "Furniture": 18},
-        {"Clothing": 32, "Electronics": 25, "Food": 38, "Furniture": 20},
-        {"Clothing": 40, "Electronics": 28, "Food": 45, "Furniture": 22},
-        {"Clothing": 38, "Electronics": 30, "Food": 42, "Furniture": 25},
+async def get_donation_trends(days: int = Query(7, ge=1, le=365), category: Optional[str] = None):
+    """Get daily donation counts per category for the last ``days`` days (7, 30, 365, ...)"""
+    try:
+        trends = await run_db(fetch_daily_counts, days, category)
+    except DatabaseBusy:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+    return [
+        DonationTrend(date=trend["date"], categories=CategoryData(**trend["categories"]))
+        for trend in trends
     ]
-    
-    for i, data in enumerate(mock_data):
-        date = base_date + timedelta(days=i)
-        trend = DonationTrend(
-            date=date.strftime("%Y-%m-%d"),
-            categories=CategoryData(**data)
-        )
-        trends.append(trend)
-    
-    return trends 
\ No newline at end of file
@@ -1,17 +1,30 @@
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
-from database import get_db_connection
-from typing import Optional
+from database import run_db, DatabaseBusy
+from event_bus import bus
+from http_cache import table_versions
+from ingest import ingest
+from models import BulkIngestResponse
+from pagination import MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, NDJSON_MEDIA_TYPE, encode_cursor, decode_cursor, stream_ndjson
+from serialization import RowEncoder
+from typing import Literal, Optional
 
 router = APIRouter()
 
+INSERT_DONATION_SQL = """
+    INSERT INTO items (category, description, location, quantity, status, donor_id)
+    VALUES (?, ?, ?, ?, 'available', ?)
+"""
+
 class DonationRequest(BaseModel):
     category: str
     description: str
     location: str
     quantity: int
     source: Optional[str] = "customer"
+    # Donating partner, counted towards its donation badges and challenges
+    partner_id: Optional[int] = None
 
 class DonationResponse(BaseModel):
     success: bool
@@ -30,74 +43,135 @@ async def donations_options():
         }
     )
 
-@router.post("/donations", response_model=DonationResponse)
-async def create_donation(donation: DonationRequest):
-    """Create a new donation"""
-    conn = get_db_connection()
+def _insert_donation(conn, donation: DonationRequest):
     cursor = conn.cursor()
-    
+
     try:
-        # Validate input
-        if not donation.category or not donation.description or not donation.location:
-            raise HTTPException(status_code=400, detail="Category, description, and location are required")
-        
-        if donation.quantity <= 0:
-            raise HTTPException(status_code=400, detail="Quantity must be greater than 0")
-        
-        cursor.execute("""
-            INSERT INTO items (category, description, location, quantity, status)
-            VALUES (?, ?, ?, ?, ?)
-        """, (
+        cursor.execute(INSERT_DONATION_SQL, (
             donation.category,
             donation.description,
             donation.location,
             donation.quantity,
-            "available"
+            donation.partner_id
         ))
-        
+
         donation_id = cursor.lastrowid
         conn.commit()
-        
-        return DonationResponse(
-            success=True,
-            message="Donation created successfully",
-            donation_id=donation_id
-        )
-    except HTTPException:
+        return donation_id
+    except Exception:
+        conn.rollback()
+        raise
+
+def _check_donation(donation: DonationRequest) -> Optional[str]:
+    if not donation.category or not donation.description or not donation.location:
+        return "Category, description, and location are required"
+
+    if donation.quantity <= 0:
+        return "Quantity must be greater than 0"
+
+    return None
+
+@router.post("/donations", response_model=DonationResponse)
+async def create_donation(donation: DonationRequest):
+    """Create a new donation"""
+    # Validate input
+    error = _check_donation(donation)
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+    
+    try:
+        donation_id = await run_db(_insert_donation, donation)
+    except DatabaseBusy:
         raise
     except Exception as e:
-        conn.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
-    finally:
-        conn.close()
 
-@router.get("/donations")
-async def get_donations():
-    """Get all donations"""
-    conn = get_db_connection()
+    table_versions.bump("items", "badges")
+    bus.publish("listing", {
+        "id": donation_id,
+        "category": donation.category,
+        "description": donation.description,
+        "location": donation.location,
+        "quantity": donation.quantity,
+        "status": "available"
+    }, donation.category, donation.location)
+
+    return DonationResponse(
+        success=True,
+        message="Donation created successfully",
+        donation_id=donation_id
+    )
+
+@router.post("/donations/bulk", response_model=BulkIngestResponse)
+async def create_donations_bulk(request: Request):
+    """Create many donations from a JSON array or NDJSON body, reporting per-row ids and errors"""
+    return await ingest(
+        request, DonationRequest,
+        lambda donation: (donation.category, donation.description, donation.location, donation.quantity,
+                          donation.partner_id),
+        check=_check_donation,
+        sql=INSERT_DONATION_SQL,
+        tables=("items", "badges")
+    )
+
+def _fetch_donations(conn, after: Optional[list] = None, limit: Optional[int] = None):
     cursor = conn.cursor()
-    
+
+    query = """
+        SELECT id, category, description, location, quantity, status, created_at
+        FROM items
+    """
+    params = []
+
+    # Keyset pagination on (created_at, id), newest first
+    if after is not None:
+        query += " WHERE (created_at, id) < (?, ?)"
+        params.extend(after)
+
+    query += " ORDER BY created_at DESC, id DESC"
+
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+
+    cursor.execute(query, params)
+    return cursor.fetchall()
+
+# Columns of _fetch_donations, in order
+donation_encoder = RowEncoder(("id", "category", "description", "location", "quantity", "status", "created_at"))
+
+@router.get("/donations")
+async def get_donations(limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+                        after: Optional[str] = None, stream: bool = False,
+                        format: Literal["rows", "columnar"] = "rows"):
+    """Get donations, newest first.
+
+    Supports the same ``limit``/``after`` keyset paging and ``stream=true``
+    NDJSON export, and ``format=columnar``, as ``/listings``.
+    """
+    if stream and format == "columnar":
+        raise HTTPException(status_code=400, detail="format=columnar cannot be combined with stream=true")
+
+    after_key = decode_cursor(after, 2) if after else None
+
+    if stream:
+        return StreamingResponse(
+            stream_ndjson(_fetch_donations, donation_encoder.encode_row, lambda d: [d[6], d[0]],
+                          after=after_key, limit=limit),
+            media_type=NDJSON_MEDIA_TYPE
+        )
+
     try:
-        cursor.execute("""
-            SELECT id, category, description, location, quantity, status, created_at
-            FROM items
-            ORDER BY created_at DESC
-        """)
-        donations = cursor.fetchall()
-        
-        return [
-            {
-                "id": d[0],
-                "category": d[1],
-                "description": d[2],
-                "location": d[3],
-                "quantity": d[4],
-                "status": d[5],
-                "created_at": d[6]
-            }
-            for d in donations
-        ]
+        donations = await run_db(_fetch_donations, after_key, limit)
+    except DatabaseBusy:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
-    finally:
-        conn.close() 
\ No newline at end of file
+
+    headers = {}
+    if limit is not None and len(donations) == limit:
+        last = donations[-1]
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(last[6], last[0])
+
+    return Response(content=donation_encoder.encode(donations, format), media_type="application/json",
+                    headers=headers)
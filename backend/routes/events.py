@@ -0,0 +1,46 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from event_bus import bus, HEARTBEAT_SECONDS, TooManySubscribers
+import json
+
+router = APIRouter()
+
+# Milliseconds browsers wait before reconnecting a dropped stream
+RECONNECT_MS = 3000
+
+def _format(event) -> str:
+    return f"id: {event.id}\nevent: {event.type}\ndata: {json.dumps(event.data, separators=(',', ':'))}\n\n"
+
+async def _stream(subscription):
+    try:
+        yield f"retry: {RECONNECT_MS}\n\n"
+        while True:
+            try:
+                event = await subscription.next(HEARTBEAT_SECONDS)
+            except EOFError:
+                return
+            # Comment lines keep proxies from closing an idle connection
+            yield ": heartbeat\n\n" if event is None else _format(event)
+    finally:
+        bus.unsubscribe(subscription)
+
+@router.get("/events")
+async def stream_events(category: Optional[str] = None, location: Optional[str] = None):
+    """Stream new listings and claims as server-sent events, optionally for one category and/or location.
+
+    Events are ``listing`` (a new available item), ``claim`` (an item was
+    claimed), ``bulk`` (a bulk upload added many items; reload the listings)
+    and ``resync`` (this client fell behind and events were dropped; reload
+    the listings).
+    """
+    try:
+        subscription = bus.subscribe(category, location)
+    except TooManySubscribers as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+
+    return StreamingResponse(
+        _stream(subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
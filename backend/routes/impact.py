@@ -1,31 +1,53 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
+from typing import List
+from database import run_db, DatabaseBusy
+from models import ImpactResponse
+from services.impact import fetch_impacts
 
 router = APIRouter()
 
+# Most partners accepted by one bulk impact request
+MAX_BULK_PARTNERS = 500
+
 class ImpactData(BaseModel):
     wasteSavedKg: float
     co2ReducedKg: float
 
+@router.get("/impact", response_model=List[ImpactResponse])
+async def get_impact_bulk(partner_ids: str):
+    """Get impact for many partners at once, e.g. ``?partner_ids=1,2,3``"""
+    try:
+        ids = [int(part) for part in partner_ids.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="partner_ids must be a comma-separated list of integers")
+    if len(ids) > MAX_BULK_PARTNERS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_PARTNERS} partner_ids per request")
+
+    try:
+        impacts = await run_db(fetch_impacts, ids)
+    except DatabaseBusy:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+    return [ImpactResponse(**impacts[partner_id]) for partner_id in dict.fromkeys(ids) if partner_id in impacts]
+
 @router.get("/impact/{partner_id}", response_model=ImpactData)
 async def get_impact(partner_id: int):
     """Get environmental impact data for a partner"""
-    # Mock impact data based on partner_id
-    if partner_id == 1:
-        # Community Aid - high impact
-        return ImpactData(
-            wasteSavedKg=125.5,
-            co2ReducedKg=25.1
-        )
-    elif partner_id == 2:
-        # Green Cycle - medium impact
-        return ImpactData(
-            wasteSavedKg=85.2,
-            co2ReducedKg=17.0
-        )
-    else:
-        # Default for other partners
-        return ImpactData(
-            wasteSavedKg=45.8,
-            co2ReducedKg=9.2
-        )
\ No newline at end of file
+    try:
+        impacts = await run_db(fetch_impacts, [partner_id])
+    except DatabaseBusy:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+    if partner_id not in impacts:
+        raise HTTPException(status_code=404, detail="Partner not found")
+
+    impact = impacts[partner_id]
+    return ImpactData(
+        wasteSavedKg=impact["waste_diverted_kg"],
+        co2ReducedKg=impact["co2_reduced_kg"]
+    )
\ No newline at end of file
@@ -1,149 +1,335 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List, Optional
-from database import get_db_connection
-from models import ItemCreate, ItemResponse, ClaimRequest, ClaimResponse
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import List, Literal, Optional, Union
+from database import run_db, transaction, DatabaseBusy
+from models import ItemCreate, ItemResponse, SearchResult, ClaimRequest, ClaimResponse, BatchClaimRequest, BatchClaimResult, BatchClaimResponse, BulkIngestResponse
+from event_bus import bus
+from http_cache import cached_json, table_versions
+from ingest import ingest
+from services.impact import impact_cache
+from services.leaderboard import leaderboard
+from services.search import SNIPPET_SQL, match_expression, highlight
+from pagination import MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, NDJSON_MEDIA_TYPE, encode_cursor, decode_cursor, stream_ndjson
+from serialization import RowEncoder
+import json
 import logging
 
 router = APIRouter()
 
+# Points awarded to a partner for each claimed item
+CLAIM_POINTS = 10
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-@router.post("/listings", response_model=ItemResponse)
-async def create_listing(item: ItemCreate):
-    """Create a new surplus item listing"""
-    conn = get_db_connection()
+def _insert_listing(conn, item: ItemCreate):
     cursor = conn.cursor()
-    
+
     try:
         cursor.execute("""
             INSERT INTO items (category, description, location, quantity, status)
             VALUES (?, ?, ?, ?, 'available')
         """, (item.category, item.description, item.location, item.quantity))
-        
+
         item_id = cursor.lastrowid
         conn.commit()
-        
-        # Mock notification
-        logger.info(f"New item available: {item.description} at {item.location}")
-        
-        return ItemResponse(
-            id=item_id,
-            category=item.category,
-            description=item.description,
-            location=item.location,
-            quantity=item.quantity,
-            status="available"
-        )
-    
-    except Exception as e:
+        return item_id
+    except Exception:
         conn.rollback()
+        raise
+
+@router.post("/listings", response_model=ItemResponse)
+async def create_listing(item: ItemCreate):
+    """Create a new surplus item listing"""
+    try:
+        item_id = await run_db(_insert_listing, item)
+    except DatabaseBusy:
+        raise
+    except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        conn.close()
 
-@router.get("/listings", response_model=List[ItemResponse])
-async def get_listings(category: Optional[str] = None, location: Optional[str] = None, status: Optional[str] = None):
-    """Get all surplus item listings with optional filters"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    query = "SELECT id, category, description, location, quantity, status FROM items WHERE 1=1"
+    table_versions.bump("items")
+
+    listing = ItemResponse(
+        id=item_id,
+        category=item.category,
+        description=item.description,
+        location=item.location,
+        quantity=item.quantity,
+        status="available"
+    )
+    bus.publish("listing", listing.model_dump(mode="json"), item.category, item.location)
+    logger.info(f"New item available: {item.description} at {item.location}")
+
+    return listing
+
+@router.post("/listings/bulk", response_model=BulkIngestResponse)
+async def create_listings_bulk(request: Request):
+    """Create many listings from a JSON array or NDJSON body, reporting per-row ids and errors"""
+    result = await ingest(
+        request, ItemCreate,
+        lambda item: (item.category, item.description, item.location, item.quantity)
+    )
+    logger.info(f"Bulk listing upload: {result.inserted} inserted, {result.failed} rejected")
+    return result
+
+def _filter_clause(category: Optional[str], location: Optional[str], status: Optional[str]):
+    clause = ""
     params = []
-    
+
     if category:
-        query += " AND category = ?"
+        clause += " AND i.category = ?"
         params.append(category)
-    
+
     if location:
-        query += " AND location = ?"
+        clause += " AND i.location = ?"
         params.append(location)
-    
+
     if status:
-        query += " AND status = ?"
+        clause += " AND i.status = ?"
         params.append(status)
-    
-    query += " ORDER BY id DESC"
-    
+
+    return clause, params
+
+def _fetch_listings(conn, category: Optional[str], location: Optional[str], status: Optional[str],
+                    after_id: Optional[int] = None, limit: Optional[int] = None):
+    cursor = conn.cursor()
+
+    filters, params = _filter_clause(category, location, status)
+    query = "SELECT i.id, i.category, i.description, i.location, i.quantity, i.status FROM items i WHERE 1=1" + filters
+
+    # Keyset pagination: continue below the last id already returned
+    if after_id is not None:
+        query += " AND i.id < ?"
+        params.append(after_id)
+
+    query += " ORDER BY i.id DESC"
+
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+
+    cursor.execute(query, params)
+    return cursor.fetchall()
+
+def _search_listings(conn, match: str, category: Optional[str], location: Optional[str], status: Optional[str],
+                     after: Optional[list] = None, limit: Optional[int] = None):
+    """Listings matching an FTS5 expression, best BM25 rank first, with the rank and a snippet"""
+    cursor = conn.cursor()
+
+    filters, params = _filter_clause(category, location, status)
+    query = f"""
+        SELECT i.id, i.category, i.description, i.location, i.quantity, i.status,
+               items_fts.rank, {SNIPPET_SQL}
+        FROM items_fts
+        JOIN items i ON i.id = items_fts.rowid
+        WHERE items_fts MATCH ?{filters}
+    """
+    params.insert(0, match)
+
+    # Keyset pagination on (rank, id): lower rank is a better match
+    if after is not None:
+        query += " AND (items_fts.rank > ? OR (items_fts.rank = ? AND i.id > ?))"
+        params.extend([after[0], after[0], after[1]])
+
+    query += " ORDER BY items_fts.rank, i.id"
+
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+
     cursor.execute(query, params)
-    items = cursor.fetchall()
-    conn.close()
-    
-    return [ItemResponse(
-        id=item[0],
-        category=item[1],
-        description=item[2],
-        location=item[3],
-        quantity=item[4],
-        status=item[5]
-    ) for item in items]
+    return cursor.fetchall()
+
+# Field order of ItemResponse and SearchResult. The listing queries do not
+# select created_at, which listings have always returned as null.
+LISTING_FIELDS = ("id", "category", "description", "location", "quantity", "status", "created_at")
+
+listing_encoder = RowEncoder(LISTING_FIELDS, lambda item: (*item[:6], None))
+search_encoder = RowEncoder(
+    (*LISTING_FIELDS, "score", "snippet"),
+    lambda item: (*item[:6], None, -item[6], highlight(item[7]))
+)
+
+@router.get("/listings", response_model=Union[List[ItemResponse], List[SearchResult]])
+async def get_listings(request: Request,
+                       category: Optional[str] = None, location: Optional[str] = None, status: Optional[str] = None,
+                       q: Optional[str] = None,
+                       limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+                       after: Optional[str] = None, stream: bool = False,
+                       format: Literal["rows", "columnar"] = "rows"):
+    """Get surplus item listings with optional filters.
+
+    Pass ``limit`` to page through results newest first; the cursor for the
+    next page is returned in the ``X-Next-Cursor`` header and goes back in as
+    ``after``. ``stream=true`` returns every matching row as NDJSON instead.
+    ``q`` searches descriptions and categories: results come best match
+    first, with a score and a highlighted snippet, and page the same way.
+    ``format=columnar`` returns one array per field instead of one object per row.
+    """
+    if stream and format == "columnar":
+        raise HTTPException(status_code=400, detail="format=columnar cannot be combined with stream=true")
+
+    # Both branches page on a list key: [id] for listings, [rank, id] for search
+    if q is not None and q.strip():
+        match = match_expression(q)
+
+        def fetch_page(conn, page_after, size):
+            if match is None:
+                return []
+            return _search_listings(conn, match, category, location, status, page_after, size)
+
+        encoder = search_encoder
+        cursor_of = lambda item: [item[6], item[0]]
+        after_key = decode_cursor(after, 2) if after else None
+    else:
+        def fetch_page(conn, page_after, size):
+            return _fetch_listings(conn, category, location, status, page_after[0] if page_after else None, size)
+
+        encoder = listing_encoder
+        cursor_of = lambda item: [item[0]]
+        after_key = decode_cursor(after, 1) if after else None
+
+    if stream:
+        return StreamingResponse(
+            stream_ndjson(fetch_page, encoder.encode_row, cursor_of,
+                          after=after_key, limit=limit),
+            media_type=NDJSON_MEDIA_TYPE
+        )
+
+    async def build(response: Response):
+        items = await run_db(fetch_page, after_key, limit)
+
+        if limit is not None and len(items) == limit:
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor(*cursor_of(items[-1]))
+
+        return encoder.encode(items, format)
+
+    return await cached_json(request, ("items",), build)
+
+def _claim_items(conn, partner_id: int, item_ids: List[int]):
+    """Claim items for a partner in one write transaction.
+
+    Availability is checked by the UPDATE itself (``WHERE status = 'available'``),
+    so concurrent claimers can never both win the same item. Returns the
+    per-item results and the ``(item_id, category, location)`` of each item
+    claimed, for the caller to publish on the event loop.
+    """
+    item_ids = list(dict.fromkeys(item_ids))
+    ids_json = json.dumps(item_ids)
+
+    with transaction(conn):
+        cursor = conn.cursor()
+
+        # Flip every still-available item in one statement
+        cursor.execute("""
+            UPDATE items SET status = 'claimed'
+            WHERE status = 'available' AND id IN (SELECT value FROM json_each(?))
+            RETURNING id, category, location
+        """, (ids_json,))
+        claimed = {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+
+        partner = None
+        if claimed:
+            # Add claim records
+            cursor.executemany("""
+                INSERT INTO claims (item_id, partner_id)
+                VALUES (?, ?)
+            """, [(item_id, partner_id) for item_id in item_ids if item_id in claimed])
+
+            # Add points to partner (10 points per claim)
+            cursor.execute("UPDATE partners SET points = points + ? WHERE id = ? RETURNING name, location, points",
+                           (CLAIM_POINTS * len(claimed), partner_id))
+            partner = cursor.fetchone()
+
+        existing = claimed
+        if len(claimed) < len(item_ids):
+            cursor.execute("SELECT id FROM items WHERE id IN (SELECT value FROM json_each(?))", (ids_json,))
+            existing = {row[0] for row in cursor.fetchall()}
+
+    # Update the in-memory sources before bumping, or a read in between could
+    # cache a stale leaderboard or impact under the new versions
+    if partner is not None:
+        leaderboard.award(partner_id, CLAIM_POINTS * len(claimed), *partner)
+        impact_cache.invalidate(partner_id)
+    if claimed:
+        table_versions.bump("items", "claims", "partners", "badges")
+
+    results = []
+    for item_id in item_ids:
+        if item_id in claimed:
+            results.append(BatchClaimResult(item_id=item_id, status="claimed", message="Item claimed successfully"))
+        elif item_id in existing:
+            results.append(BatchClaimResult(item_id=item_id, status="unavailable", message="Item is not available"))
+        else:
+            results.append(BatchClaimResult(item_id=item_id, status="not_found", message="Item not found"))
+    return results, [(item_id, category, location) for item_id, (category, location) in claimed.items()]
+
+def _publish_claims(partner_id: int, claimed):
+    for item_id, category, location in claimed:
+        bus.publish("claim", {"item_id": item_id, "partner_id": partner_id}, category, location)
 
 @router.post("/claim", response_model=ClaimResponse)
 async def claim_item(claim: ClaimRequest):
     """Claim an available item"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
     try:
-        # Check if item exists and is available
-        cursor.execute("SELECT id, status FROM items WHERE id = ?", (claim.item_id,))
-        item = cursor.fetchone()
-        
-        if not item:
-            raise HTTPException(status_code=404, detail="Item not found")
-        
-        if item[1] != "available":
-            raise HTTPException(status_code=400, detail="Item is not available")
-        
-        # Update item status
-        cursor.execute("UPDATE items SET status = 'claimed' WHERE id = ?", (claim.item_id,))
-        
-        # Add claim record
-        cursor.execute("""
-            INSERT INTO claims (item_id, partner_id)
-            VALUES (?, ?)
-        """, (claim.item_id, claim.partner_id))
-        
-        # Add points to partner (10 points per claim)
-        cursor.execute("UPDATE partners SET points = points + 10 WHERE id = ?", (claim.partner_id,))
-        
-        conn.commit()
-        
-        logger.info(f"Item {claim.item_id} claimed by partner {claim.partner_id}")
-        
-        return ClaimResponse(
-            item_id=claim.item_id,
-            partner_id=claim.partner_id,
-            status="claimed",
-            message="Item claimed successfully"
-        )
-    
-    except HTTPException:
-        conn.rollback()
+        [result], claimed = await run_db(_claim_items, claim.partner_id, [claim.item_id])
+    except DatabaseBusy:
         raise
     except Exception as e:
-        conn.rollback()
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        conn.close()
+
+    _publish_claims(claim.partner_id, claimed)
+
+    if result.status == "not_found":
+        raise HTTPException(status_code=404, detail=result.message)
+    if result.status == "unavailable":
+        raise HTTPException(status_code=400, detail=result.message)
+
+    logger.info(f"Item {claim.item_id} claimed by partner {claim.partner_id}")
+
+    return ClaimResponse(
+        item_id=claim.item_id,
+        partner_id=claim.partner_id,
+        status="claimed",
+        message="Item claimed successfully"
+    )
+
+@router.post("/claims/batch", response_model=BatchClaimResponse)
+async def claim_items_batch(request: BatchClaimRequest):
+    """Claim several items for a partner in one transaction, reporting per-item results"""
+    try:
+        results, claimed_items = await run_db(_claim_items, request.partner_id, request.item_ids)
+    except DatabaseBusy:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    _publish_claims(request.partner_id, claimed_items)
+
+    claimed = sum(1 for result in results if result.status == "claimed")
+    logger.info(f"{claimed} of {len(results)} items claimed by partner {request.partner_id}")
+
+    return BatchClaimResponse(
+        partner_id=request.partner_id,
+        claimed=claimed,
+        failed=len(results) - claimed,
+        points_awarded=CLAIM_POINTS * claimed,
+        results=results
+    )
+
+def _fetch_distinct(conn, column: str):
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT DISTINCT {column} FROM items ORDER BY {column}")
+    return [row[0] for row in cursor.fetchall()]
 
 @router.get("/categories")
-async def get_categories():
+async def get_categories(request: Request):
     """Get all available categories"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT DISTINCT category FROM items ORDER BY category")
-    categories = [row[0] for row in cursor.fetchall()]
-    conn.close()
-    return categories
+    return await cached_json(request, ("items",), lambda response: run_db(_fetch_distinct, "category"))
 
 @router.get("/locations")
-async def get_locations():
+async def get_locations(request: Request):
     """Get all available locations"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT DISTINCT location FROM items ORDER BY location")
-    locations = [row[0] for row in cursor.fetchall()]
-    conn.close()
-    return locations
\ No newline at end of file
+    return await cached_json(request, ("items",), lambda response: run_db(_fetch_distinct, "location"))
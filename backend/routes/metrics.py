@@ -0,0 +1,42 @@
+import asyncio
+from fastapi import APIRouter, Query
+from fastapi.responses import PlainTextResponse
+from typing import Optional
+from database import pool, db_executor
+from event_bus import bus
+from http_cache import response_cache
+from metrics import PROMETHEUS_CONTENT_TYPE, profiler, render
+
+router = APIRouter()
+
+# Runtime stats exported next to the request and SQL metrics, with the keys
+# that only ever grow (exported as counters; the rest are gauges)
+STATS_SOURCES = (
+    ("recircle_db_pool", pool.stats, {"created", "acquired", "reused", "waited", "timeouts", "wait_seconds"}),
+    ("recircle_db_executor", db_executor.stats,
+     {"submitted", "completed", "failed", "rejected", "wait_seconds", "run_seconds"}),
+    ("recircle_response_cache", response_cache.stats, {"hits", "misses"}),
+    ("recircle_events", bus.stats, {"published", "delivered", "dropped", "rejected"}),
+)
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Request, SQL and runtime metrics in Prometheus text format"""
+    return PlainTextResponse(render(STATS_SOURCES), media_type=PROMETHEUS_CONTENT_TYPE)
+
+@router.post("/metrics/profiler")
+async def set_profiler(enabled: bool, interval_ms: Optional[float] = Query(None, ge=1, le=1000), reset: bool = False):
+    """Start or stop the sampling profiler, optionally clearing the samples taken so far"""
+    if reset:
+        profiler.reset()
+    if enabled:
+        profiler.start(interval_ms / 1000 if interval_ms is not None else None)
+    else:
+        # stop() joins the sampler thread, which can take up to one interval
+        await asyncio.get_running_loop().run_in_executor(None, profiler.stop)
+    return profiler.stats()
+
+@router.get("/metrics/profile", response_class=PlainTextResponse)
+async def get_profile():
+    """Sampled stacks in collapsed format (``frame;frame;... count`` per line) for flame graph tools"""
+    return PlainTextResponse(profiler.folded())
@@ -1,31 +1,58 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
+from typing import List
+from database import run_db, DatabaseBusy
+from services.insights import fetch_insight, fetch_all_insights
 
 router = APIRouter()
 
+# Shown as the most claimed category before a partner's first claim
+NO_CLAIMS = "None"
+
 class PartnerInsight(BaseModel):
     mostClaimed: str
     impactScore: int
 
+class PartnerInsightSummary(PartnerInsight):
+    partnerId: int
+    partnerName: str
+    claims: int
+    quantity: int
+
+@router.get("/partner-insights", response_model=List[PartnerInsightSummary])
+async def get_all_partner_insights():
+    """Get insights for every partner"""
+    try:
+        rows = await run_db(fetch_all_insights)
+    except DatabaseBusy:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+    return [
+        PartnerInsightSummary(
+            partnerId=row[0],
+            partnerName=row[1],
+            mostClaimed=row[2] or NO_CLAIMS,
+            impactScore=row[3],
+            claims=row[4],
+            quantity=row[5]
+        )
+        for row in rows
+    ]
+
 @router.get("/partner-insights/{partner_id}", response_model=PartnerInsight)
 async def get_partner_insights(partner_id: int):
     """Get partner-specific insights and analytics"""
-    # Mock insights based on partner_id
-    if partner_id == 1:
-        # Community Aid
-        return PartnerInsight(
-            mostClaimed="Clothing",
-            impactScore=85
-        )
-    elif partner_id == 2:
-        # Green Cycle
-        return PartnerInsight(
-            mostClaimed="Electronics",
-            impactScore=75
-        )
-    else:
-        # Default for other partners
-        return PartnerInsight(
-            mostClaimed="Food",
-            impactScore=65
-        ) 
\ No newline at end of file
+    try:
+        insight = await run_db(fetch_insight, partner_id)
+    except DatabaseBusy:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+    if insight is None:
+        raise HTTPException(status_code=404, detail="Partner not found")
+
+    most_claimed, impact_score = insight
+    return PartnerInsight(mostClaimed=most_claimed or NO_CLAIMS, impactScore=impact_score)
\ No newline at end of file
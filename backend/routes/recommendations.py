@@ -0,0 +1,51 @@
+from fastapi import APIRouter, HTTPException, Query
+from typing import List
+from database import run_db, DatabaseBusy
+from models import Recommendation
+from services.matching import matcher
+import json
+
+router = APIRouter()
+
+def _recommend(conn, partner_id: int, k: int):
+    ranked = matcher.recommend(conn, partner_id, k)
+    if not ranked:
+        return ranked
+
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT id, category, description, location, quantity, status, created_at
+        FROM items
+        WHERE id IN (SELECT value FROM json_each(?)) AND status = 'available'
+    """, (json.dumps([item_id for item_id, _, _ in ranked]),))
+    items = {row[0]: row for row in cursor.fetchall()}
+
+    return [
+        Recommendation(
+            id=item_id,
+            category=items[item_id][1],
+            description=items[item_id][2],
+            location=items[item_id][3],
+            quantity=items[item_id][4],
+            status=items[item_id][5],
+            created_at=items[item_id][6],
+            score=score,
+            distance_km=distance_km
+        )
+        # Items claimed since the snapshot refreshed are dropped here
+        for item_id, score, distance_km in ranked if item_id in items
+    ]
+
+@router.get("/recommendations/{partner_id}", response_model=List[Recommendation])
+async def get_recommendations(partner_id: int, k: int = Query(10, ge=1, le=100)):
+    """Get the best matching available items for a partner"""
+    try:
+        recommendations = await run_db(_recommend, partner_id, k)
+    except DatabaseBusy:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+    if recommendations is None:
+        raise HTTPException(status_code=404, detail="Partner not found")
+    return recommendations
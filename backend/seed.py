@@ -0,0 +1,124 @@
+"""One-time sample data seeding.
+
+Seeding is versioned: the applied ``SEED_VERSION`` is stored in ``app_meta``
+and later boots skip it entirely. All rows go in with ``executemany`` inside
+a single transaction, and every statement is idempotent so re-seeding an
+older database never duplicates rows.
+"""
+import json
+import logging
+import os
+from database import pool, transaction
+
+logger = logging.getLogger(__name__)
+
+# Bump when the sample data changes and existing databases should be topped up
+SEED_VERSION = 1
+SEED_MARKER_KEY = "sample_data_version"
+
+SKIP_SEED = os.getenv("RECIRCLE_SKIP_SEED", "").lower() in ("1", "true", "yes")
+SAMPLE_DATA_PATH = os.path.join(os.path.dirname(__file__), "data", "sample_data.json")
+
+# Used when data/sample_data.json is missing
+DEFAULT_PARTNERS = [
+    {"id": 1, "name": "Community Aid", "location": "New York, NY", "points": 1250},
+    {"id": 2, "name": "Green Cycle", "location": "Los Angeles, CA", "points": 980},
+    {"id": 3, "name": "Eco Warriors", "location": "Chicago, IL", "points": 750},
+    {"id": 4, "name": "Sustainable Future", "location": "Houston, TX", "points": 620},
+    {"id": 5, "name": "Recycle Heroes", "location": "Phoenix, AZ", "points": 450}
+]
+
+DEFAULT_ITEMS = [
+    {"id": 1, "category": "Clothing", "description": "Men's shirts - Various sizes, good condition", "location": "New York, NY", "quantity": 50, "status": "available"},
+    {"id": 2, "category": "Electronics", "description": "Laptops - Dell and HP, working condition", "location": "Los Angeles, CA", "quantity": 10, "status": "available"},
+    {"id": 3, "category": "Food", "description": "Canned goods - Vegetables, fruits, and beans", "location": "Chicago, IL", "quantity": 100, "status": "available"},
+    {"id": 4, "category": "Furniture", "description": "Office chairs - Ergonomic, like new", "location": "Houston, TX", "quantity": 15, "status": "available"},
+    {"id": 5, "category": "Clothing", "description": "Women's dresses - Summer collection", "location": "Phoenix, AZ", "quantity": 25, "status": "available"},
+    {"id": 6, "category": "Electronics", "description": "Tablets - iPads and Android tablets", "location": "New York, NY", "quantity": 8, "status": "available"},
+    {"id": 7, "category": "Food", "description": "Rice and pasta - Bulk quantities", "location": "Los Angeles, CA", "quantity": 200, "status": "available"},
+    {"id": 8, "category": "Furniture", "description": "Desks - Wooden, various sizes", "location": "Chicago, IL", "quantity": 12, "status": "available"},
+    {"id": 9, "category": "Clothing", "description": "Children's clothes - All ages", "location": "Houston, TX", "quantity": 75, "status": "available"},
+    {"id": 10, "category": "Electronics", "description": "Smartphones - Various brands", "location": "Phoenix, AZ", "quantity": 5, "status": "available"},
+    {"id": 11, "category": "Food", "description": "Baby food and formula", "location": "New York, NY", "quantity": 150, "status": "available"},
+    {"id": 12, "category": "Furniture", "description": "Bookshelves - Metal and wood", "location": "Los Angeles, CA", "quantity": 20, "status": "available"},
+    {"id": 13, "category": "Clothing", "description": "Winter coats and jackets", "location": "Chicago, IL", "quantity": 40, "status": "available"},
+    {"id": 14, "category": "Electronics", "description": "Monitors - 24-inch and 27-inch", "location": "Houston, TX", "quantity": 6, "status": "available"},
+    {"id": 15, "category": "Food", "description": "Snack foods and beverages", "location": "Phoenix, AZ", "quantity": 300, "status": "available"},
+    {"id": 16, "category": "Clothing", "description": "Shoes - Athletic and casual", "location": "New York, NY", "quantity": 30, "status": "claimed"},
+    {"id": 17, "category": "Electronics", "description": "Printers - Laser and inkjet", "location": "Los Angeles, CA", "quantity": 4, "status": "claimed"},
+    {"id": 18, "category": "Food", "description": "Cereal and breakfast items", "location": "Chicago, IL", "quantity": 80, "status": "claimed"},
+    {"id": 19, "category": "Furniture", "description": "Sofas and couches", "location": "Houston, TX", "quantity": 3, "status": "claimed"},
+    {"id": 20, "category": "Clothing", "description": "Professional attire", "location": "Phoenix, AZ", "quantity": 35, "status": "claimed"}
+]
+
+SAMPLE_CLAIMS = [
+    (16, 1),
+    (17, 2),
+    (18, 1),
+    (19, 3),
+    (20, 2),
+]
+
+
+def read_sample_data(path=SAMPLE_DATA_PATH):
+    """Load sample partners and items from JSON, falling back to the defaults"""
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        logger.warning(f"Sample data file not found at {path}, using default sample data")
+        return {"ngos": DEFAULT_PARTNERS, "surplus_items": DEFAULT_ITEMS}
+
+
+def get_seed_version(conn) -> int:
+    row = conn.execute("SELECT value FROM app_meta WHERE key = ?", (SEED_MARKER_KEY,)).fetchone()
+    return int(row[0]) if row else 0
+
+
+def load_sample_data(conn, data):
+    """Insert sample partners, items and claims in one transaction"""
+    with transaction(conn):
+        cursor = conn.cursor()
+
+        # Insert NGOs/Partners
+        cursor.executemany("""
+            INSERT OR IGNORE INTO partners (id, name, location, points)
+            VALUES (?, ?, ?, ?)
+        """, [(ngo["id"], ngo["name"], ngo["location"], ngo["points"]) for ngo in data["ngos"]])
+
+        # Insert surplus items
+        cursor.executemany("""
+            INSERT OR IGNORE INTO items (id, category, description, location, quantity, status)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, [
+            (item["id"], item["category"], item["description"], item["location"], item["quantity"], item["status"])
+            for item in data["surplus_items"]
+        ])
+
+        # Badges are awarded by the badge triggers as partners and claims go in
+
+        # Insert sample claims (claims.item_id is unique)
+        cursor.executemany("""
+            INSERT OR IGNORE INTO claims (item_id, partner_id)
+            VALUES (?, ?)
+        """, SAMPLE_CLAIMS)
+
+        cursor.execute("""
+            INSERT INTO app_meta (key, value) VALUES (?, ?)
+            ON CONFLICT (key) DO UPDATE SET value = excluded.value
+        """, (SEED_MARKER_KEY, str(SEED_VERSION)))
+
+
+def seed_sample_data(force=False) -> bool:
+    """Seed the database once per SEED_VERSION; returns True if data was loaded"""
+    if SKIP_SEED and not force:
+        logger.info("Sample data seeding skipped (RECIRCLE_SKIP_SEED)")
+        return False
+
+    with pool.connection() as conn:
+        if not force and get_seed_version(conn) >= SEED_VERSION:
+            return False
+        load_sample_data(conn, read_sample_data())
+
+    logger.info(f"Sample data version {SEED_VERSION} loaded")
+    return True
@@ -0,0 +1,57 @@
+"""Fast JSON encoding for rows read from our own tables.
+
+List endpoints used to build a pydantic model per row, then walk the models
+again with ``jsonable_encoder`` before ``json.dumps``. Their rows come
+straight from the database with known column types, so that validation
+buys nothing for the cost. ``RowEncoder`` maps each row to a plain dict and
+encodes a whole page with a single ``json.dumps`` call. The output bytes
+match the ``JSONResponse`` output for the same payload, so ETags and clients
+see no change.
+
+``format=columnar`` returns one array per field instead of one object per
+row (``{"id": [3, 2], "category": ["Food", "Toys"], ...}``). Field names
+are no longer repeated on every row, so large pages are smaller and faster
+to parse into table components.
+"""
+import json
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+FORMATS = ("rows", "columnar")
+
+# The same settings starlette's JSONResponse renders with
+_encoder = json.JSONEncoder(ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":"))
+
+
+def dumps(payload) -> bytes:
+    return _encoder.encode(payload).encode("utf-8")
+
+
+class RowEncoder:
+    """Encodes database rows as JSON objects or parallel arrays under fixed field names.
+
+    ``values(row)`` returns the row's values in ``fields`` order; by default
+    the row is used as is. Rows are trusted: nothing is validated or coerced.
+    """
+
+    def __init__(self, fields: Sequence[str], values: Optional[Callable[[tuple], Tuple]] = None):
+        self.fields = tuple(fields)
+        self.values = values or tuple
+
+    def records(self, rows: Iterable) -> List[Dict]:
+        fields, values = self.fields, self.values
+        return [dict(zip(fields, values(row))) for row in rows]
+
+    def columns(self, rows: Iterable) -> Dict[str, list]:
+        # zip(*...) transposes the rows into one tuple per field
+        transposed = list(zip(*map(self.values, rows)))
+        if not transposed:
+            return {field: [] for field in self.fields}
+        return {field: list(column) for field, column in zip(self.fields, transposed)}
+
+    def encode(self, rows: Iterable, format: str = "rows") -> bytes:
+        """A page of rows as JSON bytes, ``format`` being one of ``FORMATS``"""
+        return dumps(self.columns(rows) if format == "columnar" else self.records(rows))
+
+    def encode_row(self, row) -> str:
+        """One row as a JSON object, e.g. an NDJSON line"""
+        return _encoder.encode(dict(zip(self.fields, self.values(row))))
@@ -0,0 +1,186 @@
+"""Rule-driven partner badges.
+
+``badge_rules`` holds one threshold per badge on a partner metric, loaded
+from ``data/badge_rules.json``:
+
+- ``points``: the partner's points
+- ``claims``: items claimed
+- ``donations``: donations made (items with the partner as ``donor_id``)
+- ``donated_items``: total quantity donated
+
+``partner_counters`` keeps the claim and donation metrics per partner. Triggers
+on ``claims``, donated ``items`` and ``partners`` bump the writing partner's
+counters and award every rule that partner now meets, so each write costs a
+primary-key update plus one pass over the (few) rules, however long the
+partner's history. Badges are never taken away once earned.
+
+After editing the rules, reload them and re-evaluate every partner:
+
+    python -m services.badges
+"""
+import json
+import os
+
+RULES_PATH = os.getenv(
+    "RECIRCLE_BADGE_RULES_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "badge_rules.json")
+)
+
+METRICS = ("points", "claims", "donations", "donated_items")
+
+CREATE_BADGE_TABLES = [
+    # Donations record the donating partner, if any
+    "ALTER TABLE items ADD COLUMN donor_id INTEGER",
+    f"""
+    CREATE TABLE IF NOT EXISTS badge_rules (
+        name TEXT PRIMARY KEY,
+        description TEXT NOT NULL,
+        metric TEXT NOT NULL CHECK (metric IN ({", ".join(f"'{metric}'" for metric in METRICS)})),
+        threshold INTEGER NOT NULL
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS partner_counters (
+        partner_id INTEGER PRIMARY KEY,
+        claims INTEGER NOT NULL DEFAULT 0,
+        donations INTEGER NOT NULL DEFAULT 0,
+        donated_items INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    # Earlier boots seeded the sample badges more than once; keep one row per
+    # partner and badge, preferring an earned one
+    """
+    DELETE FROM badges WHERE id NOT IN (
+        SELECT id FROM (
+            SELECT id, ROW_NUMBER() OVER (PARTITION BY partner_id, name ORDER BY earned DESC, id) AS position
+            FROM badges
+        ) WHERE position = 1
+    )
+    """,
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_badges_partner_name ON badges (partner_id, name)",
+]
+
+_METRIC_VALUE = """CASE r.metric
+            WHEN 'points' THEN p.points
+            WHEN 'claims' THEN COALESCE(c.claims, 0)
+            WHEN 'donations' THEN COALESCE(c.donations, 0)
+            WHEN 'donated_items' THEN COALESCE(c.donated_items, 0)
+        END"""
+
+
+def _award(partner_filter: str) -> str:
+    """Statement awarding every rule met by the partners matching ``partner_filter``"""
+    return f"""
+        INSERT INTO badges (partner_id, name, description, earned, earned_at)
+        SELECT p.id, r.name, r.description, 1, CURRENT_TIMESTAMP
+        FROM partners p
+        CROSS JOIN badge_rules r
+        LEFT JOIN partner_counters c ON c.partner_id = p.id
+        WHERE {partner_filter} AND {_METRIC_VALUE} >= r.threshold
+        ON CONFLICT (partner_id, name) DO UPDATE SET
+            description = excluded.description,
+            earned = 1,
+            earned_at = excluded.earned_at
+        WHERE NOT badges.earned"""
+
+
+def _bump(partner: str, **deltas: str) -> str:
+    columns = ", ".join(deltas)
+    values = ", ".join(deltas.values())
+    updates = ", ".join(f"{column} = {column} + excluded.{column}" for column in deltas)
+    return f"""
+        INSERT INTO partner_counters (partner_id, {columns}) VALUES ({partner}, {values})
+        ON CONFLICT (partner_id) DO UPDATE SET {updates}"""
+
+
+BADGE_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_claims_badges_insert
+    AFTER INSERT ON claims
+    BEGIN
+        {_bump("NEW.partner_id", claims="1")};
+        {_award("p.id = NEW.partner_id")};
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_items_badges_insert
+    AFTER INSERT ON items
+    WHEN NEW.donor_id IS NOT NULL
+    BEGIN
+        {_bump("NEW.donor_id", donations="1", donated_items="NEW.quantity")};
+        {_award("p.id = NEW.donor_id")};
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_partners_badges_points
+    AFTER UPDATE OF points ON partners
+    WHEN NEW.points > OLD.points
+    BEGIN
+        {_award("p.id = NEW.id")};
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_partners_badges_insert
+    AFTER INSERT ON partners
+    BEGIN
+        {_award("p.id = NEW.id")};
+    END
+    """,
+]
+
+
+def load_rules(conn, path: str = RULES_PATH) -> int:
+    """Replace the rule table with the bundled file; the caller owns the transaction"""
+    with open(path, "r") as f:
+        rules = json.load(f)["rules"]
+
+    for rule in rules:
+        if rule["metric"] not in METRICS:
+            raise ValueError(f"Badge {rule['name']!r} has unknown metric {rule['metric']!r}")
+
+    conn.execute("DELETE FROM badge_rules")
+    conn.executemany(
+        "INSERT INTO badge_rules (name, description, metric, threshold) VALUES (?, ?, ?, ?)",
+        [(rule["name"], rule["description"], rule["metric"], rule["threshold"]) for rule in rules]
+    )
+    return len(rules)
+
+
+def rebuild_counters(conn):
+    """Recompute ``partner_counters`` from ``claims`` and ``items``; the caller owns the transaction"""
+    conn.execute("DELETE FROM partner_counters")
+    conn.execute("""
+        INSERT INTO partner_counters (partner_id, claims, donations, donated_items)
+        SELECT partner_id, SUM(claims), SUM(donations), SUM(donated_items)
+        FROM (
+            SELECT partner_id, COUNT(*) AS claims, 0 AS donations, 0 AS donated_items
+            FROM claims GROUP BY partner_id
+            UNION ALL
+            SELECT donor_id, 0, COUNT(*), SUM(quantity)
+            FROM items WHERE donor_id IS NOT NULL GROUP BY donor_id
+        )
+        GROUP BY partner_id
+    """)
+
+
+def reevaluate(conn) -> int:
+    """Award every rule met by any partner and return the number of new badges; the caller owns the transaction"""
+    return conn.execute(_award("1")).rowcount
+
+
+def rebuild_badges(conn):
+    """Backfill the counters and award badges for the existing history"""
+    rebuild_counters(conn)
+    reevaluate(conn)
+
+
+if __name__ == "__main__":
+    from database import init_db, pool, transaction
+
+    init_db()
+    with pool.connection() as conn:
+        with transaction(conn):
+            rules = load_rules(conn)
+            rebuild_counters(conn)
+            awarded = reevaluate(conn)
+    print(f"badge_rules reloaded: {rules} rules, {awarded} badges awarded (restart the API to drop cached responses)")
@@ -0,0 +1,102 @@
+"""Keyword-based item categorization.
+
+The taxonomy (categories, weighted keywords and phrases) lives in
+``data/taxonomy.json`` and is compiled once into a hash index from
+normalized term to ``(category, weight)``. Categorizing a description is a
+tokenize pass plus one dict lookup per token and phrase, so whole words are
+matched ("can" no longer matches "scanner") and cost does not grow with the
+size of the taxonomy. Results for repeated descriptions come from an LRU
+cache.
+"""
+import json
+import os
+import re
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+TAXONOMY_PATH = os.getenv(
+    "RECIRCLE_TAXONOMY_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "taxonomy.json")
+)
+CACHE_SIZE = int(os.getenv("RECIRCLE_CATEGORIZE_CACHE_SIZE", "10000"))
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+
+
+def normalize(token: str) -> str:
+    """Reduce simple English plurals so "shirts" and "shirt" share a term"""
+    if len(token) <= 3:
+        return token
+    if token.endswith("ies"):
+        return token[:-3] + "y"
+    if token.endswith(("ches", "shes", "sses", "xes")):
+        return token[:-2]
+    if token.endswith("s") and not token.endswith(("ss", "us", "is")):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, split into words and normalize; hyphenated words also yield their parts"""
+    tokens = []
+    for word in _TOKEN_RE.findall(text.lower()):
+        tokens.append(normalize(word))
+        if "-" in word:
+            tokens.extend(normalize(part) for part in word.split("-"))
+    return tokens
+
+
+class Categorizer:
+    """Compiled term index over a category taxonomy"""
+
+    def __init__(self, taxonomy: dict, cache_size: int = CACHE_SIZE):
+        self.categories: List[str] = [entry["name"] for entry in taxonomy["categories"]]
+        self.default_category: str = taxonomy.get("default_category", self.categories[0])
+        self.index: Dict[str, List[Tuple[int, float]]] = {}
+        self.max_phrase = 1
+
+        for position, entry in enumerate(taxonomy["categories"]):
+            for keyword, weight in entry["keywords"].items():
+                words = [normalize(word) for word in _TOKEN_RE.findall(keyword.lower())]
+                self.max_phrase = max(self.max_phrase, len(words))
+                self.index.setdefault(" ".join(words), []).append((position, float(weight)))
+
+        self._cached = lru_cache(maxsize=cache_size)(self._categorize)
+
+    def scores(self, description: str) -> List[float]:
+        """Weighted score per category; each distinct term counts once"""
+        tokens = tokenize(description)
+        terms = set(tokens)
+        for size in range(2, self.max_phrase + 1):
+            terms.update(" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1))
+
+        totals = [0.0] * len(self.categories)
+        for term in terms:
+            for position, weight in self.index.get(term, ()):
+                totals[position] += weight
+        return totals
+
+    def _categorize(self, description: str) -> str:
+        totals = self.scores(description)
+        best = max(range(len(totals)), key=lambda position: totals[position])
+        return self.categories[best] if totals[best] > 0 else self.default_category
+
+    def categorize(self, description: str) -> str:
+        """Best matching category, or the default when nothing matches"""
+        # Case and whitespace never change the result, so fold them out of the cache key
+        return self._cached(" ".join(description.lower().split()))
+
+    def categorize_many(self, descriptions: List[str]) -> List[str]:
+        return [self.categorize(description) for description in descriptions]
+
+    def cache_stats(self) -> dict:
+        info = self._cached.cache_info()
+        return {"hits": info.hits, "misses": info.misses, "size": info.currsize, "max_size": info.maxsize}
+
+
+def load_categorizer(path: str = TAXONOMY_PATH) -> Categorizer:
+    with open(path, "r") as f:
+        return Categorizer(json.load(f))
+
+
+categorizer = load_categorizer()
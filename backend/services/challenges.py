@@ -0,0 +1,172 @@
+"""Partner challenges with time-windowed progress.
+
+``challenges`` holds the definitions from ``data/challenges.json``: a metric,
+a target and a period, either ``month`` (progress resets at the start of
+each UTC month) or ``all`` (all-time). ``partner_monthly_counters`` keeps
+claims, donations and donated quantity per partner and month; triggers on
+``claims`` and donated ``items`` add to the writing partner's bucket for the
+month of the write. All-time progress reads ``partner_counters`` (see
+``services.badges``) and the partner's points.
+
+Months roll over lazily: a new month's bucket is created by the partner's
+first write in it, and a month without a bucket reads as zero, so nothing
+ever sweeps over all partners. Progress for a partner is one key lookup per
+counter table.
+
+Reload the definitions after editing the file (this also rebuilds the
+monthly counters from ``claims`` and ``items``):
+
+    python -m services.challenges
+"""
+import json
+import os
+from datetime import datetime
+from typing import Dict, List, Optional
+
+CHALLENGES_PATH = os.getenv(
+    "RECIRCLE_CHALLENGES_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "challenges.json")
+)
+
+PERIODS = ("month", "all")
+MONTHLY_METRICS = ("claims", "donations", "donated_items")
+# Points are only known as a running total, so they have no monthly buckets
+ALL_TIME_METRICS = MONTHLY_METRICS + ("points",)
+
+# Bucket key of the month a timestamp falls in, e.g. '2025-07'
+MONTH_FORMAT = "%Y-%m"
+
+CREATE_CHALLENGE_TABLES = [
+    f"""
+    CREATE TABLE IF NOT EXISTS challenges (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE,
+        description TEXT NOT NULL,
+        metric TEXT NOT NULL CHECK (metric IN ({", ".join(f"'{metric}'" for metric in ALL_TIME_METRICS)})),
+        period TEXT NOT NULL CHECK (period IN ({", ".join(f"'{period}'" for period in PERIODS)})),
+        target INTEGER NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS partner_monthly_counters (
+        partner_id INTEGER NOT NULL,
+        month TEXT NOT NULL,
+        claims INTEGER NOT NULL DEFAULT 0,
+        donations INTEGER NOT NULL DEFAULT 0,
+        donated_items INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (partner_id, month)
+    ) WITHOUT ROWID
+    """,
+]
+
+CHALLENGE_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_claims_challenges_insert
+    AFTER INSERT ON claims
+    BEGIN
+        INSERT INTO partner_monthly_counters (partner_id, month, claims)
+        VALUES (NEW.partner_id, strftime('{MONTH_FORMAT}', COALESCE(NEW.timestamp, CURRENT_TIMESTAMP)), 1)
+        ON CONFLICT (partner_id, month) DO UPDATE SET claims = claims + 1;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_items_challenges_insert
+    AFTER INSERT ON items
+    WHEN NEW.donor_id IS NOT NULL
+    BEGIN
+        INSERT INTO partner_monthly_counters (partner_id, month, donations, donated_items)
+        VALUES (NEW.donor_id, strftime('{MONTH_FORMAT}', COALESCE(NEW.created_at, CURRENT_TIMESTAMP)), 1, NEW.quantity)
+        ON CONFLICT (partner_id, month) DO UPDATE SET
+            donations = donations + 1,
+            donated_items = donated_items + excluded.donated_items;
+    END
+    """,
+]
+
+
+def current_month(now: Optional[datetime] = None) -> str:
+    """Bucket key of the current UTC month"""
+    return (now or datetime.utcnow()).strftime(MONTH_FORMAT)
+
+
+def load_challenges(conn, path: str = CHALLENGES_PATH) -> int:
+    """Replace the challenge table with the bundled file; the caller owns the transaction"""
+    with open(path, "r") as f:
+        challenges = json.load(f)["challenges"]
+
+    for challenge in challenges:
+        metrics = MONTHLY_METRICS if challenge["period"] == "month" else ALL_TIME_METRICS
+        if challenge["period"] not in PERIODS or challenge["metric"] not in metrics:
+            raise ValueError(
+                f"Challenge {challenge['name']!r} has unsupported {challenge['period']!r} metric {challenge['metric']!r}"
+            )
+
+    conn.execute("DELETE FROM challenges")
+    conn.executemany(
+        "INSERT INTO challenges (id, name, description, metric, period, target) VALUES (?, ?, ?, ?, ?, ?)",
+        [(position, challenge["name"], challenge["description"], challenge["metric"], challenge["period"],
+          challenge["target"]) for position, challenge in enumerate(challenges, 1)]
+    )
+    return len(challenges)
+
+
+def rebuild_monthly_counters(conn):
+    """Recompute ``partner_monthly_counters`` from ``claims`` and ``items``; the caller owns the transaction"""
+    conn.execute("DELETE FROM partner_monthly_counters")
+    conn.execute(f"""
+        INSERT INTO partner_monthly_counters (partner_id, month, claims, donations, donated_items)
+        SELECT partner_id, month, SUM(claims), SUM(donations), SUM(donated_items)
+        FROM (
+            SELECT partner_id, strftime('{MONTH_FORMAT}', timestamp) AS month,
+                   COUNT(*) AS claims, 0 AS donations, 0 AS donated_items
+            FROM claims GROUP BY 1, 2
+            UNION ALL
+            SELECT donor_id, strftime('{MONTH_FORMAT}', created_at), 0, COUNT(*), SUM(quantity)
+            FROM items WHERE donor_id IS NOT NULL GROUP BY 1, 2
+        )
+        WHERE month IS NOT NULL
+        GROUP BY partner_id, month
+    """)
+
+
+def fetch_challenges(conn, partner_id: int, month: Optional[str] = None) -> List[Dict]:
+    """Every challenge with the partner's progress in the current period"""
+    rows = conn.execute("""
+        SELECT ch.name, ch.description, ch.target,
+               CASE WHEN ch.period = 'month' THEN
+                   CASE ch.metric
+                       WHEN 'claims' THEN m.claims
+                       WHEN 'donations' THEN m.donations
+                       WHEN 'donated_items' THEN m.donated_items
+                   END
+               ELSE
+                   CASE ch.metric
+                       WHEN 'points' THEN p.points
+                       WHEN 'claims' THEN c.claims
+                       WHEN 'donations' THEN c.donations
+                       WHEN 'donated_items' THEN c.donated_items
+                   END
+               END
+        FROM challenges ch
+        LEFT JOIN partner_monthly_counters m ON m.partner_id = ?1 AND m.month = ?2
+        LEFT JOIN partner_counters c ON c.partner_id = ?1
+        LEFT JOIN partners p ON p.id = ?1
+        ORDER BY ch.id
+    """, (partner_id, month or current_month())).fetchall()
+
+    return [
+        {"name": row[0], "target": row[2], "progress": row[3] or 0, "description": row[1]}
+        for row in rows
+    ]
+
+
+if __name__ == "__main__":
+    from database import init_db, pool, transaction
+
+    init_db()
+    with pool.connection() as conn:
+        with transaction(conn):
+            challenges = load_challenges(conn)
+            rebuild_monthly_counters(conn)
+            buckets = conn.execute("SELECT COUNT(*) FROM partner_monthly_counters").fetchone()[0]
+    print(f"challenges reloaded: {challenges} challenges, {buckets} partner-month counters rebuilt")
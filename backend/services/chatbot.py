@@ -0,0 +1,252 @@
+"""Chatbot intent matching.
+
+Intents come from ``data/intents.json``: weighted keywords and phrases plus
+either a canned response or the name of a live answer computed from data.
+Keywords are compiled once into a hash index from normalized term to
+``(intent, weight)`` (the categorizer's tokenizer), so matching a message is
+a tokenize pass plus one lookup per word and phrase.
+
+Live intents ("how many food items are available in Chicago") answer from
+a snapshot of available listings per category and location. The snapshot
+is one grouped query, kept for ``LIVE_TTL`` seconds and shared by every
+message in that window, so chat traffic never scans ``items`` per message.
+Category and location names in a message are matched against the names in
+the snapshot.
+
+Each intent counts its hits and answer latency. Check matching accuracy on
+a set of labelled messages (``data/intent_examples.json`` by default):
+
+    python -m services.chatbot [examples.json]
+"""
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from services.categorizer import categorizer, tokenize
+
+INTENTS_PATH = os.getenv(
+    "RECIRCLE_INTENTS_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "intents.json")
+)
+EXAMPLES_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "intent_examples.json")
+LIVE_TTL = float(os.getenv("RECIRCLE_CHATBOT_LIVE_TTL_SECONDS", "30"))
+
+FALLBACK_INTENT = "fallback"
+TOP_CATEGORIES = 3
+
+
+def _phrases(tokens: List[str], max_size: int) -> List[Tuple[int, int, str]]:
+    """Every ``(start, size, phrase)`` of up to ``max_size`` consecutive tokens"""
+    return [
+        (start, size, " ".join(tokens[start:start + size]))
+        for size in range(1, max_size + 1)
+        for start in range(len(tokens) - size + 1)
+    ]
+
+
+class Availability:
+    """Available listings and units per ``(category, location)``, with name lookup"""
+
+    def __init__(self, rows, categories: List[str] = ()):
+        self.counts: Dict[Tuple[str, str], Tuple[int, int]] = {}
+        self.names: Dict[str, Tuple[str, str]] = {}
+        self.max_phrase = 1
+        # Known categories are recognized even when none of their items are available
+        for category in categories:
+            self._add_name("category", category)
+        for category, location, listings, units in rows:
+            self.counts[(category, location)] = (listings, units or 0)
+            self._add_name("category", category)
+            # "New York, NY" is also found as "New York"
+            for name in {location, location.split(",")[0]}:
+                self._add_name("location", name, location)
+        self.loaded_at = time.monotonic()
+
+    def _add_name(self, kind: str, name: str, value: Optional[str] = None):
+        tokens = tokenize(name)
+        if tokens:
+            self.max_phrase = max(self.max_phrase, len(tokens))
+            self.names.setdefault(" ".join(tokens), (kind, value or name))
+
+    def entities(self, tokens: List[str]) -> Dict[str, str]:
+        """Category and location named in a message, longest match first"""
+        found: Dict[str, str] = {}
+        for _, _, phrase in sorted(_phrases(tokens, self.max_phrase), key=lambda match: -match[1]):
+            entity = self.names.get(phrase)
+            if entity is not None:
+                found.setdefault(*entity)
+        return found
+
+    def totals(self, category: Optional[str] = None, location: Optional[str] = None) -> Dict[str, List[int]]:
+        """``[listings, units]`` per category, optionally for one category and/or location"""
+        totals: Dict[str, List[int]] = {}
+        for (row_category, row_location), (listings, units) in self.counts.items():
+            if category not in (None, row_category) or location not in (None, row_location):
+                continue
+            total = totals.setdefault(row_category, [0, 0])
+            total[0] += listings
+            total[1] += units
+        return totals
+
+
+def fetch_availability(conn) -> Availability:
+    return Availability(conn.execute("""
+        SELECT category, location, COUNT(*), SUM(quantity)
+        FROM items
+        WHERE status = 'available'
+        GROUP BY category, location
+    """).fetchall(), categorizer.categories)
+
+
+def _where(entities: Dict[str, str]) -> str:
+    return f" in {entities['location']}" if "location" in entities else ""
+
+
+def answer_available_items(availability: Availability, entities: Dict[str, str]) -> str:
+    totals = availability.totals(entities.get("category"), entities.get("location"))
+    listings = sum(total[0] for total in totals.values())
+    units = sum(total[1] for total in totals.values())
+    what = f"{entities['category']} " if "category" in entities else ""
+    if not listings:
+        return f"There are no {what}items available{_where(entities)} right now."
+    if listings == 1:
+        return f"There is 1 {what}listing available{_where(entities)}, {units} units in total."
+    return f"There are {listings} {what}listings available{_where(entities)}, {units} units in total."
+
+
+def answer_top_categories(availability: Availability, entities: Dict[str, str]) -> str:
+    totals = availability.totals(location=entities.get("location"))
+    if not totals:
+        return f"There are no items available{_where(entities)} right now."
+    ranked = sorted(totals.items(), key=lambda entry: (-entry[1][0], entry[0]))[:TOP_CATEGORIES]
+    listed = ", ".join(f"{category} ({total[0]})" for category, total in ranked)
+    return f"Most available listings{_where(entities)}: {listed}."
+
+
+LIVE_ANSWERS: Dict[str, Callable[[Availability, Dict[str, str]], str]] = {
+    "available_items": answer_available_items,
+    "top_categories": answer_top_categories,
+}
+
+
+class Intent:
+    __slots__ = ("name", "response", "live")
+
+    def __init__(self, name: str, response: Optional[str] = None, live: Optional[str] = None):
+        self.name = name
+        self.response = response
+        self.live = live
+
+
+class IntentEngine:
+    """Compiled keyword index over the intent table, with per-intent counters"""
+
+    def __init__(self, config: dict, live_ttl: float = LIVE_TTL):
+        self.fallback = Intent(FALLBACK_INTENT, config["fallback"])
+        self.intents: List[Intent] = []
+        self.index: Dict[str, List[Tuple[int, float]]] = {}
+        self.max_phrase = 1
+        self.live_ttl = live_ttl
+
+        for position, entry in enumerate(config["intents"]):
+            live = entry.get("live")
+            if live is not None and live not in LIVE_ANSWERS:
+                raise ValueError(f"Intent {entry['name']!r} has unknown live answer {live!r}")
+            self.intents.append(Intent(entry["name"], entry.get("response"), live))
+            for keyword, weight in entry["keywords"].items():
+                words = tokenize(keyword)
+                self.max_phrase = max(self.max_phrase, len(words))
+                self.index.setdefault(" ".join(words), []).append((position, float(weight)))
+
+        self._availability: Optional[Availability] = None
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {
+            intent.name: {"hits": 0, "seconds": 0.0, "max_seconds": 0.0}
+            for intent in [*self.intents, self.fallback]
+        }
+        self._stats_lock = threading.Lock()
+
+    def match(self, message: str) -> Tuple[Intent, List[str]]:
+        """Highest scoring intent for a message (earliest on ties) and the message tokens"""
+        tokens = tokenize(message)
+        totals = [0.0] * len(self.intents)
+        for term in {phrase for _, _, phrase in _phrases(tokens, self.max_phrase)}:
+            for position, weight in self.index.get(term, ()):
+                totals[position] += weight
+        if not totals or max(totals) <= 0:
+            return self.fallback, tokens
+        return self.intents[totals.index(max(totals))], tokens
+
+    def cached_availability(self) -> Optional[Availability]:
+        """The availability snapshot if it is younger than the TTL"""
+        availability = self._availability
+        if availability is not None and time.monotonic() - availability.loaded_at < self.live_ttl:
+            return availability
+        return None
+
+    def refresh_availability(self, conn) -> Availability:
+        """Reload the snapshot unless another thread just did"""
+        with self._lock:
+            availability = self.cached_availability()
+            if availability is None:
+                availability = self._availability = fetch_availability(conn)
+            return availability
+
+    def answer(self, intent: Intent, tokens: List[str], availability: Optional[Availability] = None) -> str:
+        if intent.live is None:
+            return intent.response
+        return LIVE_ANSWERS[intent.live](availability, availability.entities(tokens))
+
+    def record(self, intent: Intent, seconds: float):
+        with self._stats_lock:
+            stats = self._stats[intent.name]
+            stats["hits"] += 1
+            stats["seconds"] += seconds
+            stats["max_seconds"] = max(stats["max_seconds"], seconds)
+
+    def stats(self) -> Dict[str, dict]:
+        with self._stats_lock:
+            return {
+                name: {
+                    "hits": int(stats["hits"]),
+                    "avg_ms": round(stats["seconds"] * 1000 / stats["hits"], 3) if stats["hits"] else 0.0,
+                    "max_ms": round(stats["max_seconds"] * 1000, 3),
+                }
+                for name, stats in self._stats.items()
+            }
+
+    def evaluate(self, examples: List[dict]) -> dict:
+        """Match labelled ``{"message", "intent"}`` examples; an intent of None expects the fallback"""
+        results = []
+        for example in examples:
+            expected = example.get("intent") or FALLBACK_INTENT
+            predicted = self.match(example["message"])[0].name
+            results.append({"message": example["message"], "expected": expected,
+                            "predicted": predicted, "correct": predicted == expected})
+        correct = sum(1 for result in results if result["correct"])
+        return {
+            "total": len(results),
+            "correct": correct,
+            "accuracy": round(correct / len(results), 4) if results else 0.0,
+            "failures": [result for result in results if not result["correct"]],
+        }
+
+
+def load_engine(path: str = INTENTS_PATH) -> IntentEngine:
+    with open(path, "r") as f:
+        return IntentEngine(json.load(f))
+
+
+engine = load_engine()
+
+
+if __name__ == "__main__":
+    import sys
+
+    with open(sys.argv[1] if len(sys.argv) > 1 else EXAMPLES_PATH, "r") as f:
+        report = engine.evaluate(json.load(f))
+    for failure in report["failures"]:
+        print(f"MISS  {failure['message']!r}: expected {failure['expected']}, got {failure['predicted']}")
+    print(f"{report['correct']}/{report['total']} correct ({report['accuracy']:.1%})")
+    sys.exit(1 if report["failures"] else 0)
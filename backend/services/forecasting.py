@@ -0,0 +1,173 @@
+"""Per-partner, per-category demand forecasts.
+
+``retrain`` reads the last ``HISTORY_DAYS`` of claims in one query, builds a
+``series x days`` matrix of claimed quantities (one row per partner and
+category, plus one per category for the platform average), and fits two
+models over every row at once:
+
+- simple exponential smoothing: a flat daily level
+- seasonal naive: the average of each weekday over the last four weeks
+
+Each model forecasts the last ``HOLDOUT_DAYS`` from the days before them,
+the one with the lower error is kept per series, and its next
+``HORIZON_DAYS`` total is written to the ``forecasts`` table. The job runs on
+a schedule; ``/api/forecast/{partner_id}`` reads one primary-key range and
+keeps the result in memory until the next retrain.
+
+    python -m services.forecasting
+"""
+import os
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from cache import LRUCache
+from services.trends import window_start
+
+HISTORY_DAYS = 84
+HOLDOUT_DAYS = 14
+HORIZON_DAYS = 30
+SEASON_DAYS = 7
+SEASON_WEEKS = 4
+SMOOTHING_ALPHA = 0.3
+
+# Forecasts stored under this id are per-partner averages across the platform,
+# served to partners without a claim history
+PLATFORM_PARTNER_ID = 0
+
+MODELS = ("exponential_smoothing", "seasonal_naive")
+
+RETRAIN_INTERVAL = float(os.getenv("RECIRCLE_FORECAST_RETRAIN_SECONDS", "86400"))
+CACHE_SIZE = int(os.getenv("RECIRCLE_FORECAST_CACHE_SIZE", "10000"))
+
+CREATE_FORECAST_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS forecasts (
+        partner_id INTEGER NOT NULL,
+        category TEXT NOT NULL,
+        quantity INTEGER NOT NULL,
+        model TEXT NOT NULL,
+        generated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (partner_id, category)
+    ) WITHOUT ROWID
+    """,
+    # Training reads claims by time window
+    "CREATE INDEX IF NOT EXISTS idx_claims_timestamp ON claims (timestamp, item_id, partner_id)",
+]
+
+
+def _read_history(conn, start: str) -> List[Tuple[int, str, int, int]]:
+    """``(partner_id, category, day index, quantity)`` for claims since ``start``"""
+    # Without INDEXED BY the planner scans all of idx_claims_partner; the
+    # timestamp index reads only the window's claims, and CROSS JOIN keeps
+    # claims outermost so items are looked up per claim
+    return conn.execute("""
+        SELECT c.partner_id, i.category,
+               CAST(julianday(date(c.timestamp)) - julianday(?) AS INTEGER) AS day,
+               SUM(i.quantity)
+        FROM claims c INDEXED BY idx_claims_timestamp
+        CROSS JOIN items i ON i.id = c.item_id
+        WHERE c.timestamp >= ?
+        GROUP BY 1, 2, 3
+    """, (start, start)).fetchall()
+
+
+def smoothed_level(series: np.ndarray, alpha: float = SMOOTHING_ALPHA) -> np.ndarray:
+    """Exponential smoothing level per row after the last column"""
+    level = series[:, :SEASON_DAYS].mean(axis=1)
+    for day in range(series.shape[1]):
+        level = alpha * series[:, day] + (1 - alpha) * level
+    return level
+
+
+def weekday_profile(series: np.ndarray) -> np.ndarray:
+    """Average of the last ``SEASON_WEEKS`` weeks; column ``j`` forecasts day ``j`` of every coming week"""
+    recent = series[:, -SEASON_DAYS * SEASON_WEEKS:]
+    return recent.reshape(len(series), SEASON_WEEKS, SEASON_DAYS).mean(axis=1)
+
+
+def _forecast_days(series: np.ndarray, days: int) -> np.ndarray:
+    """Daily forecasts for the next ``days`` days, shaped ``(model, series, day)`` in ``MODELS`` order"""
+    level = smoothed_level(series)
+    profile = weekday_profile(series)
+    return np.stack([
+        np.repeat(level[:, None], days, axis=1),
+        profile[:, np.arange(days) % SEASON_DAYS],
+    ])
+
+
+def fit(series: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Pick a model per row on the holdout window and return (horizon totals, model index)"""
+    train, holdout = series[:, :-HOLDOUT_DAYS], series[:, -HOLDOUT_DAYS:]
+    errors = np.abs(_forecast_days(train, HOLDOUT_DAYS) - holdout).mean(axis=2)
+    chosen = errors.argmin(axis=0)
+
+    totals = _forecast_days(series, HORIZON_DAYS).sum(axis=2)
+    return totals[chosen, np.arange(len(series))], chosen
+
+
+def retrain(conn) -> dict:
+    """Refit every forecast from the claim history and replace the forecasts table"""
+    # Imported here because database -> migrations -> this module at startup
+    from database import transaction
+
+    started = time.perf_counter()
+    history = _read_history(conn, window_start(HISTORY_DAYS))
+
+    keys: Dict[Tuple[int, str], int] = {}
+    rows, days, quantities = [], [], []
+    categories = set()
+    for partner_id, category, day, quantity in history:
+        if not 0 <= day < HISTORY_DAYS:
+            continue
+        rows.append(keys.setdefault((partner_id, category), len(keys)))
+        days.append(day)
+        quantities.append(quantity or 0)
+        categories.add(category)
+
+    # Platform rows: every partner's claims per category, averaged per active partner
+    partners = len({partner_id for partner_id, _ in keys})
+    platform = {category: len(keys) + index for index, category in enumerate(sorted(categories))}
+    series = np.zeros((len(keys) + len(platform), HISTORY_DAYS))
+    if rows:
+        np.add.at(series, (np.array(rows), np.array(days)), quantities)
+        np.add.at(series, [platform[category] for _, category in keys], series[:len(keys)])
+        series[len(keys):] /= partners
+
+    totals, chosen = fit(series) if len(series) else (np.zeros(0), np.zeros(0, dtype=int))
+    labels = [*keys, *((PLATFORM_PARTNER_ID, category) for category in platform)]
+
+    with transaction(conn):
+        conn.execute("DELETE FROM forecasts")
+        conn.executemany(
+            "INSERT INTO forecasts (partner_id, category, quantity, model) VALUES (?, ?, ?, ?)",
+            [(partner_id, category, int(round(max(total, 0.0))), MODELS[model])
+             for (partner_id, category), total, model in zip(labels, totals, chosen)]
+        )
+
+    forecast_cache.clear()
+    return {"partners": partners, "series": len(labels), "seconds": round(time.perf_counter() - started, 3)}
+
+
+def fetch_forecast(conn, partner_id: int) -> List[Tuple[str, int]]:
+    """Stored forecast for a partner, falling back to the platform average"""
+    for key in (partner_id, PLATFORM_PARTNER_ID):
+        rows = conn.execute(
+            "SELECT category, quantity FROM forecasts WHERE partner_id = ? ORDER BY quantity DESC, category",
+            (key,)
+        ).fetchall()
+        if rows:
+            return [(row[0], row[1]) for row in rows]
+    return []
+
+
+forecast_cache = LRUCache(CACHE_SIZE)
+
+
+if __name__ == "__main__":
+    from database import init_db, pool
+
+    init_db()
+    with pool.connection() as conn:
+        print(retrain(conn))
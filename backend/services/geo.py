@@ -0,0 +1,243 @@
+"""Offline geocoding, grid cells and map clustering.
+
+Free-text ``location`` strings are resolved against a bundled gazetteer
+(``data/gazetteer.json``) that is loaded into the ``gazetteer`` table, so a
+trigger can store ``lat``, ``lng`` and ``geocell`` on every item and partner
+as it is written. Lookups try the whole string ("Chicago, IL") and then the
+part before the first comma ("Brooklyn, New York" -> "brooklyn").
+
+``geocell`` is a Z-order (Morton) code of a ``2^GRID_LEVEL`` x ``2^GRID_LEVEL``
+lat/lng grid, so dropping its low bits gives the enclosing coarser cell.
+``geo_cells`` keeps per-cell donation totals, which is what the map endpoints
+cluster: grouping by ``geocell >> shift`` for the requested zoom returns a
+few hundred clusters however many donations there are.
+
+Re-geocode every row and rebuild ``geo_cells`` after editing the gazetteer:
+
+    python -m services.geo
+"""
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
+GAZETTEER_PATH = os.getenv(
+    "RECIRCLE_GAZETTEER_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "gazetteer.json")
+)
+
+# Finest grid: 2^16 columns of ~0.0055 degrees longitude
+GRID_LEVEL = 16
+
+# Bounding box as (west, south, east, north)
+WORLD = (-180.0, -90.0, 180.0, 90.0)
+
+CREATE_GEO_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS gazetteer (
+        name TEXT PRIMARY KEY,
+        lat REAL NOT NULL,
+        lng REAL NOT NULL,
+        cell INTEGER NOT NULL
+    ) WITHOUT ROWID
+    """,
+    "ALTER TABLE items ADD COLUMN lat REAL",
+    "ALTER TABLE items ADD COLUMN lng REAL",
+    "ALTER TABLE items ADD COLUMN geocell INTEGER",
+    "ALTER TABLE partners ADD COLUMN lat REAL",
+    "ALTER TABLE partners ADD COLUMN lng REAL",
+    "ALTER TABLE partners ADD COLUMN geocell INTEGER",
+    "CREATE INDEX IF NOT EXISTS idx_items_geocell ON items (geocell)",
+    "CREATE INDEX IF NOT EXISTS idx_partners_geo ON partners (lat, lng, geocell, name, location)",
+    """
+    CREATE TABLE IF NOT EXISTS geo_cells (
+        cell INTEGER PRIMARY KEY,
+        lat REAL NOT NULL,
+        lng REAL NOT NULL,
+        location TEXT NOT NULL,
+        donations INTEGER NOT NULL DEFAULT 0,
+        quantity INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_geo_cells_lat_lng ON geo_cells (lat, lng)",
+]
+
+# Best gazetteer match for a location column of the triggering row
+_GEOCODE = """(
+    SELECT lat, lng, cell FROM gazetteer
+    WHERE name IN (lower(trim({row}.location)),
+                   lower(trim(substr({row}.location, 1, instr({row}.location, ',') - 1))))
+    ORDER BY length(name) DESC
+    LIMIT 1
+)"""
+
+GEO_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_items_geocode
+    AFTER INSERT ON items
+    WHEN NEW.lat IS NULL
+    BEGIN
+        UPDATE items SET (lat, lng, geocell) = {_GEOCODE.format(row="NEW")} WHERE id = NEW.id;
+        INSERT INTO geo_cells (cell, lat, lng, location, donations, quantity)
+        SELECT geocell, lat, lng, location, 1, quantity FROM items
+        WHERE id = NEW.id AND geocell IS NOT NULL
+        ON CONFLICT (cell) DO UPDATE SET
+            donations = donations + 1,
+            quantity = quantity + excluded.quantity;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_partners_geocode
+    AFTER INSERT ON partners
+    WHEN NEW.lat IS NULL
+    BEGIN
+        UPDATE partners SET (lat, lng, geocell) = {_GEOCODE.format(row="NEW")} WHERE id = NEW.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_partners_geocode_update
+    AFTER UPDATE OF location ON partners
+    BEGIN
+        UPDATE partners SET (lat, lng, geocell) = {_GEOCODE.format(row="NEW")} WHERE id = NEW.id;
+    END
+    """,
+]
+
+
+def cell_of(lat: float, lng: float, level: int = GRID_LEVEL) -> int:
+    """Morton code of the grid cell containing a point"""
+    size = 1 << level
+    x = min(int((lng + 180.0) / 360.0 * size), size - 1)
+    y = min(int((lat + 90.0) / 180.0 * size), size - 1)
+    cell = 0
+    for bit in range(level):
+        cell |= ((x >> bit) & 1) << (2 * bit) | ((y >> bit) & 1) << (2 * bit + 1)
+    return cell
+
+
+def cluster_shift(zoom: Optional[int]) -> int:
+    """Bits to drop from ``geocell`` so clusters are about a quarter of a map tile wide"""
+    if zoom is None:
+        return 0
+    level = max(0, min(GRID_LEVEL, zoom + 2))
+    return 2 * (GRID_LEVEL - level)
+
+
+def parse_bbox(bbox: Optional[str]) -> Tuple[float, float, float, float]:
+    """Parse ``west,south,east,north``; raises ValueError when malformed"""
+    if not bbox:
+        return WORLD
+    west, south, east, north = (float(part) for part in bbox.split(","))
+    if not (-180 <= west <= east <= 180 and -90 <= south <= north <= 90):
+        raise ValueError("bbox must be west,south,east,north with west <= east and south <= north")
+    return west, south, east, north
+
+
+def read_gazetteer(path: str = GAZETTEER_PATH) -> Dict[str, Tuple[float, float]]:
+    """Lookup keys (name, "name, state" and aliases, lowercased) to coordinates"""
+    with open(path, "r") as f:
+        places = json.load(f)["places"]
+
+    entries: Dict[str, Tuple[float, float]] = {}
+    for place in places:
+        point = (place["lat"], place["lng"])
+        keys = [place["name"], *place.get("aliases", [])]
+        if place.get("state"):
+            keys.append(f"{place['name']}, {place['state']}")
+        for key in keys:
+            # The first (largest) place wins a shared name such as "Portland"
+            entries.setdefault(key.strip().lower(), point)
+    return entries
+
+
+def load_gazetteer(conn, path: str = GAZETTEER_PATH) -> int:
+    """Replace the gazetteer table with the bundled file; the caller owns the transaction"""
+    entries = read_gazetteer(path)
+    conn.execute("DELETE FROM gazetteer")
+    conn.executemany(
+        "INSERT INTO gazetteer (name, lat, lng, cell) VALUES (?, ?, ?, ?)",
+        [(name, lat, lng, cell_of(lat, lng)) for name, (lat, lng) in entries.items()]
+    )
+    return len(entries)
+
+
+def rebuild_geo(conn):
+    """Re-geocode every item and partner and rebuild ``geo_cells``; the caller owns the transaction"""
+    for table in ("items", "partners"):
+        conn.execute(f"UPDATE {table} SET (lat, lng, geocell) = {_GEOCODE.format(row=table)}")
+
+    conn.execute("DELETE FROM geo_cells")
+    conn.execute("""
+        INSERT INTO geo_cells (cell, lat, lng, location, donations, quantity)
+        SELECT geocell, MIN(lat), MIN(lng), MIN(location), COUNT(*), SUM(quantity)
+        FROM items
+        WHERE geocell IS NOT NULL
+        GROUP BY geocell
+    """)
+
+
+def _cluster_label(count: int, places: int, location: str, noun: str) -> Tuple[str, str]:
+    return (
+        f"{count} {noun}{'' if count == 1 else 's'}",
+        location if places == 1 else f"{places} locations",
+    )
+
+
+def fetch_donation_clusters(conn, bbox: Tuple[float, float, float, float], zoom: Optional[int]) -> List[dict]:
+    """Donation clusters inside a bounding box, largest first"""
+    west, south, east, north = bbox
+    rows = conn.execute("""
+        SELECT cell >> ? AS cluster,
+               SUM(donations), SUM(quantity), COUNT(*), MIN(location),
+               SUM(lat * donations) / SUM(donations), SUM(lng * donations) / SUM(donations)
+        FROM geo_cells
+        WHERE lat BETWEEN ? AND ? AND lng BETWEEN ? AND ? AND donations > 0
+        GROUP BY cluster
+        ORDER BY 2 DESC
+    """, (cluster_shift(zoom), south, north, west, east)).fetchall()
+
+    clusters = []
+    for _, donations, quantity, places, location, lat, lng in rows:
+        name, label = _cluster_label(donations, places, location, "donation")
+        clusters.append({"lat": round(lat, 6), "lng": round(lng, 6), "name": name, "location": label,
+                         "count": donations, "quantity": quantity})
+    return clusters
+
+
+def fetch_partner_clusters(conn, bbox: Tuple[float, float, float, float], zoom: Optional[int]) -> List[dict]:
+    """Partner clusters inside a bounding box; single partners keep their name"""
+    west, south, east, north = bbox
+    rows = conn.execute("""
+        SELECT geocell >> ? AS cluster,
+               COUNT(*), COUNT(DISTINCT location), MIN(name), MIN(location), AVG(lat), AVG(lng)
+        FROM partners
+        WHERE lat BETWEEN ? AND ? AND lng BETWEEN ? AND ?
+        GROUP BY cluster
+    """, (cluster_shift(zoom), south, north, west, east)).fetchall()
+
+    clusters = []
+    for _, partners, places, name, location, lat, lng in rows:
+        if partners > 1:
+            name, location = _cluster_label(partners, places, location, "partner")
+        clusters.append({"lat": round(lat, 6), "lng": round(lng, 6), "name": name, "location": location,
+                         "count": partners})
+    return clusters
+
+
+def regeocode(conn) -> dict:
+    """Reload the gazetteer and re-geocode everything in one transaction"""
+    # Imported here because database -> migrations -> this module at startup
+    from database import transaction
+
+    with transaction(conn):
+        places = load_gazetteer(conn)
+        rebuild_geo(conn)
+        missing = conn.execute("SELECT COUNT(*) FROM items WHERE geocell IS NULL").fetchone()[0]
+    return {"gazetteer_entries": places, "items_without_coordinates": missing}
+
+
+if __name__ == "__main__":
+    from database import init_db, pool
+
+    init_db()
+    with pool.connection() as conn:
+        print(regeocode(conn))
@@ -0,0 +1,111 @@
+"""Environmental impact of partners' claims.
+
+Impact is derived from ``impact_factors``: per category, the weight of one
+unit, the CO2 avoided per kg and the people helped per unit, with a ``*``
+row for categories that have no entry. One grouped query computes the
+totals for any number of partners, and results are cached per partner until
+that partner claims again.
+
+Reload the factor table after editing ``data/impact_factors.json``:
+
+    python -m services.impact
+"""
+import json
+import os
+from typing import Dict, List
+from cache import LRUCache
+
+FACTORS_PATH = os.getenv(
+    "RECIRCLE_IMPACT_FACTORS_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "impact_factors.json")
+)
+CACHE_SIZE = int(os.getenv("RECIRCLE_IMPACT_CACHE_SIZE", "10000"))
+
+DEFAULT_CATEGORY = "*"
+
+CREATE_IMPACT_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS impact_factors (
+        category TEXT PRIMARY KEY,
+        weight_kg REAL NOT NULL,
+        co2_kg_per_kg REAL NOT NULL,
+        people_per_unit REAL NOT NULL
+    ) WITHOUT ROWID
+    """,
+]
+
+
+def load_factors(conn, path: str = FACTORS_PATH) -> int:
+    """Replace the factor table with the bundled file; the caller owns the transaction"""
+    with open(path, "r") as f:
+        factors = json.load(f)
+
+    rows = [(DEFAULT_CATEGORY, factors["default"])] + list(factors["categories"].items())
+    conn.execute("DELETE FROM impact_factors")
+    conn.executemany(
+        "INSERT INTO impact_factors (category, weight_kg, co2_kg_per_kg, people_per_unit) VALUES (?, ?, ?, ?)",
+        [(category, row["weight_kg"], row["co2_kg_per_kg"], row["people_per_unit"]) for category, row in rows]
+    )
+    return len(rows)
+
+
+def _compute(conn, partner_ids: List[int]) -> Dict[int, dict]:
+    rows = conn.execute(f"""
+        SELECT p.id, p.name, p.points,
+               COUNT(c.id),
+               SUM(i.quantity * COALESCE(f.weight_kg, d.weight_kg)),
+               SUM(i.quantity * COALESCE(f.weight_kg, d.weight_kg) * COALESCE(f.co2_kg_per_kg, d.co2_kg_per_kg)),
+               SUM(i.quantity * COALESCE(f.people_per_unit, d.people_per_unit))
+        FROM partners p
+        LEFT JOIN claims c ON c.partner_id = p.id
+        LEFT JOIN items i ON i.id = c.item_id
+        LEFT JOIN impact_factors f ON f.category = i.category
+        LEFT JOIN impact_factors d ON d.category = '{DEFAULT_CATEGORY}'
+        WHERE p.id IN (SELECT value FROM json_each(?))
+        GROUP BY p.id
+    """, (json.dumps(partner_ids),)).fetchall()
+
+    return {
+        row[0]: {
+            "partner_id": row[0],
+            "partner_name": row[1],
+            "points": row[2],
+            "items_claimed": row[3],
+            "waste_diverted_kg": round(row[4] or 0.0, 1),
+            "co2_reduced_kg": round(row[5] or 0.0, 1),
+            "people_helped": int(row[6] or 0),
+        }
+        for row in rows
+    }
+
+
+def fetch_impacts(conn, partner_ids: List[int]) -> Dict[int, dict]:
+    """Impact per partner id; unknown partners are left out"""
+    impacts = {}
+    missing = []
+    for partner_id in dict.fromkeys(partner_ids):
+        cached = impact_cache.get(partner_id)
+        if cached is None:
+            missing.append(partner_id)
+        else:
+            impacts[partner_id] = cached
+
+    if missing:
+        generation = impact_cache.generation
+        computed = _compute(conn, missing)
+        for partner_id, impact in computed.items():
+            impact_cache.put(partner_id, impact, generation)
+        impacts.update(computed)
+    return impacts
+
+
+impact_cache = LRUCache(CACHE_SIZE)
+
+
+if __name__ == "__main__":
+    from database import init_db, pool, transaction
+
+    init_db()
+    with pool.connection() as conn:
+        with transaction(conn):
+            print(f"impact_factors reloaded: {load_factors(conn)} rows (restart the API to drop cached impact)")
@@ -0,0 +1,136 @@
+"""Stored partner insights.
+
+``partner_category_claims`` counts each partner's claims and claimed
+quantity per category, and ``partner_insights`` holds the derived row the API
+serves: most claimed category and an impact score. A trigger on ``claims``
+updates the claiming partner's category row and then recomputes that
+partner's insight from its handful of category rows, so insights stay
+current without touching any other partner.
+
+``rebuild_insights`` recomputes every partner in one grouped pass over
+``claims`` joined to ``items``; it backfills the tables and repairs drift:
+
+    python -m services.insights
+"""
+
+# Weighted kg (see impact_factors) at which a partner's impact score reaches 50
+IMPACT_SCORE_HALF_KG = 100.0
+
+CREATE_INSIGHT_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS partner_category_claims (
+        partner_id INTEGER NOT NULL,
+        category TEXT NOT NULL,
+        claims INTEGER NOT NULL DEFAULT 0,
+        quantity INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (partner_id, category)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS partner_insights (
+        partner_id INTEGER PRIMARY KEY,
+        most_claimed TEXT,
+        claims INTEGER NOT NULL DEFAULT 0,
+        quantity INTEGER NOT NULL DEFAULT 0,
+        impact_score INTEGER NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+]
+
+# Saturating 0-100 score from the weighted kg of a set of partner_category_claims rows
+_IMPACT_SCORE = f"""CAST(ROUND(100.0 * {{kg}} / ({{kg}} + {IMPACT_SCORE_HALF_KG})) AS INTEGER)"""
+_WEIGHTED_KG = """SUM({rows}.quantity * COALESCE(
+    (SELECT weight_kg FROM impact_factors WHERE category = {rows}.category),
+    (SELECT weight_kg FROM impact_factors WHERE category = '*')
+))"""
+
+INSIGHT_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_claims_insights_insert
+    AFTER INSERT ON claims
+    BEGIN
+        INSERT INTO partner_category_claims (partner_id, category, claims, quantity)
+        SELECT NEW.partner_id, category, 1, quantity FROM items WHERE id = NEW.item_id
+        ON CONFLICT (partner_id, category) DO UPDATE SET
+            claims = claims + 1,
+            quantity = quantity + excluded.quantity;
+
+        INSERT OR REPLACE INTO partner_insights (partner_id, most_claimed, claims, quantity, impact_score, updated_at)
+        SELECT NEW.partner_id,
+               (SELECT category FROM partner_category_claims
+                WHERE partner_id = NEW.partner_id
+                ORDER BY claims DESC, quantity DESC, category
+                LIMIT 1),
+               SUM(pcc.claims), SUM(pcc.quantity),
+               {_IMPACT_SCORE.format(kg=_WEIGHTED_KG.format(rows="pcc"))},
+               CURRENT_TIMESTAMP
+        FROM partner_category_claims pcc
+        WHERE pcc.partner_id = NEW.partner_id
+        -- Claims of unknown items add no category row
+        HAVING COUNT(*) > 0;
+    END
+    """,
+]
+
+
+def rebuild_insights(conn):
+    """Recompute every partner's insights from ``claims`` and ``items``; the caller owns the transaction"""
+    conn.execute("DELETE FROM partner_category_claims")
+    conn.execute("""
+        INSERT INTO partner_category_claims (partner_id, category, claims, quantity)
+        SELECT c.partner_id, i.category, COUNT(*), SUM(i.quantity)
+        FROM claims c
+        JOIN items i ON i.id = c.item_id
+        GROUP BY c.partner_id, i.category
+    """)
+
+    conn.execute("DELETE FROM partner_insights")
+    conn.execute(f"""
+        INSERT INTO partner_insights (partner_id, most_claimed, claims, quantity, impact_score)
+        SELECT partner_id,
+               MAX(CASE WHEN position = 1 THEN category END),
+               SUM(claims), SUM(quantity),
+               {_IMPACT_SCORE.format(kg=_WEIGHTED_KG.format(rows="ranked"))}
+        FROM (
+            SELECT partner_id, category, claims, quantity,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY partner_id ORDER BY claims DESC, quantity DESC, category
+                   ) AS position
+            FROM partner_category_claims
+        ) AS ranked
+        GROUP BY partner_id
+    """)
+
+
+def fetch_insight(conn, partner_id: int):
+    """``(most_claimed, impact_score)`` for a partner, ``(None, 0)`` without claims, or None if unknown"""
+    row = conn.execute("""
+        SELECT p.id, pi.most_claimed, COALESCE(pi.impact_score, 0)
+        FROM partners p
+        LEFT JOIN partner_insights pi ON pi.partner_id = p.id
+        WHERE p.id = ?
+    """, (partner_id,)).fetchone()
+    return None if row is None else (row[1], row[2])
+
+
+def fetch_all_insights(conn):
+    """Insights for every partner, by partner id"""
+    return conn.execute("""
+        SELECT p.id, p.name, pi.most_claimed, COALESCE(pi.impact_score, 0),
+               COALESCE(pi.claims, 0), COALESCE(pi.quantity, 0)
+        FROM partners p
+        LEFT JOIN partner_insights pi ON pi.partner_id = p.id
+        ORDER BY p.id
+    """).fetchall()
+
+
+if __name__ == "__main__":
+    from database import init_db, pool, transaction
+
+    init_db()
+    with pool.connection() as conn:
+        with transaction(conn):
+            rebuild_insights(conn)
+            rows = conn.execute("SELECT COUNT(*) FROM partner_insights").fetchone()[0]
+    print(f"partner_insights rebuilt: {rows} partners")
@@ -0,0 +1,243 @@
+"""Materialized admin KPIs.
+
+``kpi_totals`` is a single row of running totals and ``kpi_daily`` the same
+counters per day, so all-time KPIs are one primary-key read and a time window
+sums at most one row per day. ``partner_claim_daily`` records which partners
+claimed on which day for active-partner counts over a window. Triggers on
+``items`` and ``claims`` update all three inside the writing transaction.
+
+Claimed weight (migration 12) comes from the per-category ``impact_factors``,
+the same weights ``/api/impact`` uses, so the platform total matches the sum
+over partners. It has its own trigger and rebuild step because it was added
+after the other counters.
+
+``reconcile`` recomputes everything from ``items`` and ``claims`` and reports
+any drift; it runs periodically and from the command line:
+
+    python -m services.kpis
+"""
+import os
+from typing import Optional
+from services.impact import DEFAULT_CATEGORY
+from services.trends import window_start
+
+# Seconds between reconciliation runs; 0 disables the job
+RECONCILE_INTERVAL = float(os.getenv("RECIRCLE_KPI_RECONCILE_SECONDS", "3600"))
+
+COUNTERS = ("donations", "donated_quantity", "claims", "claimed_quantity", "timed_claims", "claim_seconds")
+# Counters added by later migrations, maintained and rebuilt separately
+CLAIMED_WEIGHT = "claimed_weight_kg"
+ALL_COUNTERS = (*COUNTERS, CLAIMED_WEIGHT)
+
+_COUNTER_COLUMNS = """
+        donations INTEGER NOT NULL DEFAULT 0,
+        donated_quantity INTEGER NOT NULL DEFAULT 0,
+        claims INTEGER NOT NULL DEFAULT 0,
+        claimed_quantity INTEGER NOT NULL DEFAULT 0,
+        timed_claims INTEGER NOT NULL DEFAULT 0,
+        claim_seconds REAL NOT NULL DEFAULT 0"""
+
+CREATE_KPI_TABLES = [
+    f"""
+    CREATE TABLE IF NOT EXISTS kpi_totals (
+        id INTEGER PRIMARY KEY CHECK (id = 1),{_COUNTER_COLUMNS},
+        active_partners INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    "INSERT OR IGNORE INTO kpi_totals (id) VALUES (1)",
+    f"""
+    CREATE TABLE IF NOT EXISTS kpi_daily (
+        day TEXT PRIMARY KEY,{_COUNTER_COLUMNS}
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS partner_claim_daily (
+        day TEXT NOT NULL,
+        partner_id INTEGER NOT NULL,
+        claims INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, partner_id)
+    ) WITHOUT ROWID
+    """,
+]
+
+# Claimed item, looked up by primary key from inside the claims trigger
+_ITEM = "(SELECT {column} FROM items WHERE id = NEW.item_id)"
+_CLAIM_SECONDS = f"(julianday(NEW.timestamp) - julianday({_ITEM.format(column='created_at')})) * 86400"
+
+KPI_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_items_kpi_insert
+    AFTER INSERT ON items
+    BEGIN
+        UPDATE kpi_totals
+        SET donations = donations + 1, donated_quantity = donated_quantity + NEW.quantity
+        WHERE id = 1;
+        INSERT INTO kpi_daily (day, donations, donated_quantity)
+        VALUES (COALESCE(date(NEW.created_at), date('now')), 1, NEW.quantity)
+        ON CONFLICT (day) DO UPDATE SET
+            donations = donations + 1,
+            donated_quantity = donated_quantity + excluded.donated_quantity;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_claims_kpi_insert
+    AFTER INSERT ON claims
+    BEGIN
+        UPDATE kpi_totals
+        SET claims = claims + 1,
+            claimed_quantity = claimed_quantity + COALESCE({_ITEM.format(column='quantity')}, 0),
+            timed_claims = timed_claims + ({_CLAIM_SECONDS} IS NOT NULL),
+            claim_seconds = claim_seconds + COALESCE({_CLAIM_SECONDS}, 0),
+            active_partners = active_partners + NOT EXISTS (
+                SELECT 1 FROM claims WHERE partner_id = NEW.partner_id AND id <> NEW.id
+            )
+        WHERE id = 1;
+        INSERT INTO kpi_daily (day, claims, claimed_quantity, timed_claims, claim_seconds)
+        VALUES (
+            COALESCE(date(NEW.timestamp), date('now')), 1,
+            COALESCE({_ITEM.format(column='quantity')}, 0),
+            {_CLAIM_SECONDS} IS NOT NULL,
+            COALESCE({_CLAIM_SECONDS}, 0)
+        )
+        ON CONFLICT (day) DO UPDATE SET
+            claims = claims + 1,
+            claimed_quantity = claimed_quantity + excluded.claimed_quantity,
+            timed_claims = timed_claims + excluded.timed_claims,
+            claim_seconds = claim_seconds + excluded.claim_seconds;
+        INSERT INTO partner_claim_daily (day, partner_id, claims)
+        VALUES (COALESCE(date(NEW.timestamp), date('now')), NEW.partner_id, 1)
+        ON CONFLICT (day, partner_id) DO UPDATE SET claims = claims + 1;
+    END
+    """,
+]
+
+# Kilograms of one claimed item: its quantity times its category's weight, or the default weight
+_CLAIMED_WEIGHT = f"""
+    SELECT i.quantity * COALESCE(f.weight_kg, d.weight_kg)
+    FROM items i
+    LEFT JOIN impact_factors f ON f.category = i.category
+    LEFT JOIN impact_factors d ON d.category = '{DEFAULT_CATEGORY}'
+    WHERE i.id = {{item_id}}"""
+
+CLAIMED_WEIGHT_COLUMNS = [
+    f"ALTER TABLE kpi_totals ADD COLUMN {CLAIMED_WEIGHT} REAL NOT NULL DEFAULT 0",
+    f"ALTER TABLE kpi_daily ADD COLUMN {CLAIMED_WEIGHT} REAL NOT NULL DEFAULT 0",
+]
+
+CLAIMED_WEIGHT_TRIGGER = f"""
+    CREATE TRIGGER IF NOT EXISTS trg_claims_kpi_weight
+    AFTER INSERT ON claims
+    BEGIN
+        UPDATE kpi_totals
+        SET claimed_weight_kg = claimed_weight_kg + COALESCE(({_CLAIMED_WEIGHT.format(item_id='NEW.item_id')}), 0)
+        WHERE id = 1;
+        INSERT INTO kpi_daily (day, claimed_weight_kg)
+        VALUES (COALESCE(date(NEW.timestamp), date('now')),
+                COALESCE(({_CLAIMED_WEIGHT.format(item_id='NEW.item_id')}), 0))
+        ON CONFLICT (day) DO UPDATE SET claimed_weight_kg = claimed_weight_kg + excluded.claimed_weight_kg;
+    END
+"""
+
+_REBUILD_DAILY = """
+    INSERT INTO kpi_daily (day, donations, donated_quantity, claims, claimed_quantity, timed_claims, claim_seconds)
+    SELECT day, SUM(donations), SUM(donated_quantity), SUM(claims), SUM(claimed_quantity),
+           SUM(timed_claims), SUM(claim_seconds)
+    FROM (
+        SELECT COALESCE(date(created_at), date('now')) AS day, COUNT(*) AS donations,
+               SUM(quantity) AS donated_quantity, 0 AS claims, 0 AS claimed_quantity,
+               0 AS timed_claims, 0 AS claim_seconds
+        FROM items
+        GROUP BY 1
+        UNION ALL
+        SELECT COALESCE(date(c.timestamp), date('now')), 0, 0, COUNT(*), COALESCE(SUM(i.quantity), 0),
+               COUNT(julianday(c.timestamp) - julianday(i.created_at)),
+               COALESCE(SUM(julianday(c.timestamp) - julianday(i.created_at)), 0) * 86400
+        FROM claims c
+        LEFT JOIN items i ON i.id = c.item_id
+        GROUP BY 1
+    )
+    GROUP BY day
+"""
+
+
+def _read_totals(conn) -> dict:
+    row = conn.execute(f"SELECT {', '.join(ALL_COUNTERS)}, active_partners FROM kpi_totals WHERE id = 1").fetchone()
+    return dict(zip((*ALL_COUNTERS, "active_partners"), row)) if row else {}
+
+
+def rebuild_kpis(conn):
+    """Recompute every KPI table from ``items`` and ``claims``; the caller owns the transaction"""
+    conn.execute("DELETE FROM kpi_daily")
+    conn.execute(_REBUILD_DAILY)
+
+    conn.execute("DELETE FROM partner_claim_daily")
+    conn.execute("""
+        INSERT INTO partner_claim_daily (day, partner_id, claims)
+        SELECT COALESCE(date(timestamp), date('now')), partner_id, COUNT(*)
+        FROM claims
+        GROUP BY 1, 2
+    """)
+
+    sums = ", ".join(f"COALESCE(SUM({column}), 0)" for column in COUNTERS)
+    conn.execute(f"""
+        INSERT OR REPLACE INTO kpi_totals (id, {', '.join(COUNTERS)}, active_partners)
+        SELECT 1, {sums}, (SELECT COUNT(DISTINCT partner_id) FROM claims)
+        FROM kpi_daily
+    """)
+
+
+def rebuild_claimed_weight(conn):
+    """Recompute the claimed weight counters from ``claims``; run after ``rebuild_kpis``"""
+    conn.execute(f"UPDATE kpi_daily SET {CLAIMED_WEIGHT} = 0")
+    conn.execute(f"""
+        INSERT INTO kpi_daily (day, {CLAIMED_WEIGHT})
+        SELECT COALESCE(date(c.timestamp), date('now')), COALESCE(SUM(({_CLAIMED_WEIGHT.format(item_id='c.item_id')})), 0)
+        FROM claims c
+        WHERE true
+        GROUP BY 1
+        ON CONFLICT (day) DO UPDATE SET {CLAIMED_WEIGHT} = excluded.{CLAIMED_WEIGHT}
+    """)
+    conn.execute(f"UPDATE kpi_totals SET {CLAIMED_WEIGHT} = (SELECT COALESCE(SUM({CLAIMED_WEIGHT}), 0) FROM kpi_daily)")
+
+
+def reconcile(conn) -> dict:
+    """Rebuild the KPI tables and report which running totals had drifted"""
+    # Imported here because database -> migrations -> this module at startup
+    from database import transaction
+
+    with transaction(conn):
+        before = _read_totals(conn)
+        rebuild_kpis(conn)
+        rebuild_claimed_weight(conn)
+        after = _read_totals(conn)
+
+    drift = {
+        name: {"stored": before.get(name), "actual": value}
+        for name, value in after.items()
+        if before.get(name) is None or abs(before[name] - value) > 1e-3
+    }
+    return {"drift": drift}
+
+
+def fetch_kpis(conn, days: Optional[int] = None) -> dict:
+    """KPI counters for all time, or for the last ``days`` days"""
+    if days is None:
+        return _read_totals(conn)
+
+    start = window_start(days)
+    sums = ", ".join(f"COALESCE(SUM({column}), 0)" for column in ALL_COUNTERS)
+    row = conn.execute(f"SELECT {sums} FROM kpi_daily WHERE day >= ?", (start,)).fetchone()
+    totals = dict(zip(ALL_COUNTERS, row)) if row else dict.fromkeys(ALL_COUNTERS, 0)
+    active = conn.execute(
+        "SELECT COUNT(DISTINCT partner_id) FROM partner_claim_daily WHERE day >= ?", (start,)
+    ).fetchone()
+    totals["active_partners"] = active[0] if active else 0
+    return totals
+
+
+if __name__ == "__main__":
+    from database import init_db, pool
+
+    init_db()
+    with pool.connection() as conn:
+        print(reconcile(conn))
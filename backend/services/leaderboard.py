@@ -0,0 +1,95 @@
+"""In-memory partner leaderboard.
+
+Partners are kept in a list sorted by ``(-points, id)`` next to a dict of
+their details, so top-k pages are a slice and the rank of a partner is one
+bisect. Claims award points through ``award`` after their transaction
+commits; the change is applied as a delta, so concurrent claims for the same
+partner can land in any order. The database stays the source of truth:
+``check`` compares the two and reloads when they disagree, which also covers
+points changed by another process.
+"""
+import threading
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Tuple
+
+
+class Leaderboard:
+    """Partners ordered by points, highest first, ties by id"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._order: List[Tuple[int, int]] = []
+        self._partners: Dict[int, dict] = {}
+        self.loaded = False
+
+    @staticmethod
+    def _key(partner: dict) -> Tuple[int, int]:
+        return (-partner["points"], partner["id"])
+
+    def _read(self, conn) -> Dict[int, dict]:
+        rows = conn.execute("SELECT id, name, location, points FROM partners").fetchall()
+        return {row[0]: {"id": row[0], "name": row[1], "location": row[2], "points": row[3]} for row in rows}
+
+    def load(self, conn):
+        """Replace the leaderboard with the partners currently in the database"""
+        partners = self._read(conn)
+        order = sorted(self._key(partner) for partner in partners.values())
+        with self._lock:
+            self._partners = partners
+            self._order = order
+            self.loaded = True
+
+    def ensure_loaded(self, conn):
+        if not self.loaded:
+            self.load(conn)
+
+    def award(self, partner_id: int, delta: int, name: str, location: str, points: int):
+        """Add ``delta`` points to a partner; ``points`` is the committed total for unknown partners"""
+        with self._lock:
+            partner = self._partners.get(partner_id)
+            if partner is None:
+                partner = {"id": partner_id, "name": name, "location": location, "points": points}
+                self._partners[partner_id] = partner
+            else:
+                del self._order[bisect_left(self._order, self._key(partner))]
+                partner["points"] += delta
+            insort(self._order, self._key(partner))
+
+    def page(self, limit: Optional[int] = None, offset: int = 0) -> List[dict]:
+        """Partners ranked ``offset + 1`` to ``offset + limit``"""
+        with self._lock:
+            end = None if limit is None else offset + limit
+            return [dict(self._partners[partner_id]) for _, partner_id in self._order[offset:end]]
+
+    def rank(self, partner_id: int) -> Optional[dict]:
+        """1-based competition rank (tied partners share a rank), or None for unknown partners"""
+        with self._lock:
+            partner = self._partners.get(partner_id)
+            if partner is None:
+                return None
+            ahead = bisect_left(self._order, (-partner["points"], float("-inf")))
+            return {**partner, "rank": ahead + 1, "total": len(self._order)}
+
+    def __len__(self):
+        return len(self._order)
+
+    def check(self, conn, repair: bool = False) -> dict:
+        """Compare with the partners table, reloading on any difference if ``repair``"""
+        expected = self._read(conn)
+        with self._lock:
+            actual = {partner_id: dict(partner) for partner_id, partner in self._partners.items()}
+
+        mismatches = []
+        for partner_id in sorted(expected.keys() | actual.keys()):
+            db_points = expected.get(partner_id, {}).get("points")
+            memory_points = actual.get(partner_id, {}).get("points")
+            if expected.get(partner_id) != actual.get(partner_id):
+                mismatches.append({"id": partner_id, "database": db_points, "leaderboard": memory_points})
+
+        repaired = bool(mismatches) and repair
+        if repaired:
+            self.load(conn)
+        return {"partners": len(expected), "mismatches": mismatches, "repaired": repaired}
+
+
+leaderboard = Leaderboard()
@@ -0,0 +1,255 @@
+"""Item-to-partner matching.
+
+Available items are held in a columnar NumPy snapshot (id, place, category,
+quantity score, created time) and every partner request scores all of them
+with a handful of array operations:
+
+- distance: computed once per distinct place (items are geocoded to
+  gazetteer places, so there are few) and gathered per item
+- category affinity: the partner's claim share per category, smoothed
+- quantity: ``log1p(quantity)``, capped
+- age: older listings rank higher, so surplus is moved before it spoils
+
+The snapshot refreshes incrementally before each request: items with an id
+above the last one loaded are appended and claims above the last claim id
+seen mark their items as gone. Both are primary-key range reads, and the
+arrays are compacted once a quarter of the rows are dead.
+"""
+import math
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Relative weight of each signal in the final score
+WEIGHTS = {"distance": 0.4, "affinity": 0.3, "quantity": 0.1, "age": 0.2}
+
+# Distance at which the distance score halves, in km
+DISTANCE_SCALE_KM = float(os.getenv("RECIRCLE_MATCH_DISTANCE_KM", "100"))
+# Age at which an item gets the full age score, in days
+AGE_HORIZON_DAYS = 14
+# Quantity at which an item gets the full quantity score
+QUANTITY_CAP = 1000
+# Score given to items or partners without coordinates
+UNKNOWN_DISTANCE_SCORE = 0.3
+
+LOAD_BATCH = 50000
+EARTH_RADIUS_KM = 6371.0
+
+_ITEM_COLUMNS = "id, lat, lng, category, quantity, CAST(strftime('%s', created_at) AS REAL)"
+
+
+class _Columns:
+    """Growable typed arrays sharing one row count"""
+
+    DTYPES = {"id": np.int64, "place": np.int32, "category": np.int32,
+              "quantity": np.float32, "created": np.float64, "alive": np.bool_}
+
+    def __init__(self, capacity: int = 1024):
+        self.size = 0
+        self.arrays = {name: np.zeros(capacity, dtype) for name, dtype in self.DTYPES.items()}
+
+    def __getitem__(self, name) -> np.ndarray:
+        return self.arrays[name][:self.size]
+
+    def extend(self, **columns):
+        count = len(columns["id"])
+        needed = self.size + count
+        capacity = len(self.arrays["id"])
+        if needed > capacity:
+            capacity = max(needed, capacity * 2)
+            for name, array in self.arrays.items():
+                grown = np.zeros(capacity, array.dtype)
+                grown[:self.size] = array[:self.size]
+                self.arrays[name] = grown
+        for name, values in columns.items():
+            self.arrays[name][self.size:needed] = values
+        self.size = needed
+
+    def compact(self):
+        keep = self["alive"].copy()
+        count = int(keep.sum())
+        for name, array in self.arrays.items():
+            array[:count] = array[:self.size][keep]
+        self.size = count
+
+
+class Matcher:
+    """Columnar snapshot of available items with vectorized scoring"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.loaded = False
+        self._reset()
+
+    def _reset(self):
+        self.columns = _Columns()
+        self.dead = 0
+        self.last_item_id = 0
+        self.last_claim_id = 0
+        # Distinct coordinates; the last slot stands for "unknown"
+        self.places: Dict[Tuple[float, float], int] = {}
+        self.place_lat: List[float] = []
+        self.place_lng: List[float] = []
+        self.categories: Dict[str, int] = {}
+
+    def _place(self, lat, lng) -> int:
+        if lat is None or lng is None:
+            return -1
+        key = (lat, lng)
+        index = self.places.get(key)
+        if index is None:
+            index = self.places[key] = len(self.place_lat)
+            self.place_lat.append(lat)
+            self.place_lng.append(lng)
+        return index
+
+    def _category(self, name: str) -> int:
+        return self.categories.setdefault(name, len(self.categories))
+
+    def _append(self, rows):
+        if not rows:
+            return
+        self.columns.extend(
+            id=[row[0] for row in rows],
+            place=[self._place(row[1], row[2]) for row in rows],
+            category=[self._category(row[3]) for row in rows],
+            quantity=np.log1p(np.minimum([row[4] for row in rows], QUANTITY_CAP)) / math.log1p(QUANTITY_CAP),
+            created=[row[5] if row[5] is not None else time.time() for row in rows],
+            alive=True,
+        )
+        self.last_item_id = max(self.last_item_id, rows[-1][0])
+
+    def _remove(self, item_ids):
+        if not item_ids or not self.columns.size:
+            return
+        ids = self.columns["id"]
+        wanted = np.asarray(item_ids, dtype=np.int64)
+        # Ids are appended in increasing order, so the snapshot is sorted by id
+        positions = np.minimum(np.searchsorted(ids, wanted), len(ids) - 1)
+        positions = positions[ids[positions] == wanted]
+        alive = self.columns["alive"]
+        self.dead += int(alive[positions].sum())
+        alive[positions] = False
+        if self.dead * 4 > self.columns.size:
+            self.columns.compact()
+            self.dead = 0
+
+    def load(self, conn):
+        """Rebuild the snapshot from every available item"""
+        with self._lock:
+            self._reset()
+            self.last_claim_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM claims").fetchone()[0]
+            cursor = conn.execute(f"SELECT {_ITEM_COLUMNS} FROM items WHERE status = 'available' ORDER BY id")
+            while True:
+                rows = cursor.fetchmany(LOAD_BATCH)
+                if not rows:
+                    break
+                self._append(rows)
+            self.loaded = True
+
+    def refresh(self, conn):
+        """Apply listings and claims written since the last refresh"""
+        if not self.loaded:
+            self.load(conn)
+            return
+        with self._lock:
+            new_items = conn.execute(
+                f"SELECT {_ITEM_COLUMNS} FROM items WHERE id > ? AND status = 'available' ORDER BY id",
+                (self.last_item_id,)
+            ).fetchall()
+            self._append(new_items)
+
+            claims = conn.execute(
+                "SELECT id, item_id FROM claims WHERE id > ? ORDER BY id", (self.last_claim_id,)
+            ).fetchall()
+            if claims:
+                self.last_claim_id = claims[-1][0]
+                self._remove([row[1] for row in claims])
+
+    def _partner_profile(self, conn, partner_id: int):
+        partner = conn.execute("SELECT lat, lng FROM partners WHERE id = ?", (partner_id,)).fetchone()
+        if partner is None:
+            return None
+        history = conn.execute("""
+            SELECT i.category, COUNT(*)
+            FROM claims c
+            JOIN items i ON i.id = c.item_id
+            WHERE c.partner_id = ?
+            GROUP BY i.category
+        """, (partner_id,)).fetchall()
+        return partner[0], partner[1], dict(history)
+
+    def _distances(self, lat, lng) -> Tuple[np.ndarray, np.ndarray]:
+        """Distance score and km per place, with the unknown slot last"""
+        if lat is None or lng is None or not self.place_lat:
+            count = len(self.place_lat) + 1
+            return np.full(count, UNKNOWN_DISTANCE_SCORE, dtype=np.float32), np.full(count, np.nan)
+        place_lat = np.radians(np.asarray(self.place_lat))
+        place_lng = np.radians(np.asarray(self.place_lng))
+        lat, lng = math.radians(lat), math.radians(lng)
+        # Haversine distance from the partner to every place
+        a = (np.sin((place_lat - lat) / 2) ** 2
+             + math.cos(lat) * np.cos(place_lat) * np.sin((place_lng - lng) / 2) ** 2)
+        km = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+        scores = 1.0 / (1.0 + km / DISTANCE_SCALE_KM)
+        return np.append(scores, UNKNOWN_DISTANCE_SCORE).astype(np.float32), np.append(km, np.nan)
+
+    def _affinity_scores(self, history: Dict[str, int]) -> np.ndarray:
+        """Laplace-smoothed claim share per category, scaled so the favourite scores 1"""
+        counts = np.ones(max(len(self.categories), 1), dtype=np.float32)
+        for name, count in history.items():
+            if name in self.categories:
+                counts[self.categories[name]] += count
+        return counts / counts.max()
+
+    def recommend(self, conn, partner_id: int, k: int) -> Optional[List[Tuple[int, float, Optional[float]]]]:
+        """Top ``k`` ``(item_id, score, distance_km)`` for a partner, or None for unknown partners"""
+        profile = self._partner_profile(conn, partner_id)
+        if profile is None:
+            return None
+        lat, lng, history = profile
+
+        self.refresh(conn)
+        with self._lock:
+            columns = self.columns
+            if not columns.size:
+                return []
+
+            distance, km = self._distances(lat, lng)
+            affinity = self._affinity_scores(history)
+            place = columns["place"]
+            age = np.clip((time.time() - columns["created"]) / (AGE_HORIZON_DAYS * 86400), 0.0, 1.0)
+
+            scores = (WEIGHTS["distance"] * distance[place]
+                      + WEIGHTS["affinity"] * affinity[columns["category"]]
+                      + WEIGHTS["quantity"] * columns["quantity"]
+                      + WEIGHTS["age"] * age.astype(np.float32))
+            scores[~columns["alive"]] = -np.inf
+
+            k = min(k, columns.size - self.dead)
+            if k <= 0:
+                return []
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top], kind="stable")]
+
+            return [
+                (int(item_id), round(float(score), 4), None if math.isnan(d) else round(float(d), 1))
+                for item_id, score, d in zip(columns["id"][top], scores[top], km[place[top]])
+            ]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "items": self.columns.size - self.dead,
+                "dead": self.dead,
+                "places": len(self.place_lat),
+                "categories": len(self.categories),
+                "last_item_id": self.last_item_id,
+                "last_claim_id": self.last_claim_id,
+            }
+
+
+matcher = Matcher()
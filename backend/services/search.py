@@ -0,0 +1,100 @@
+"""Full-text search over item descriptions and categories.
+
+``items_fts`` is an FTS5 index with ``items`` as its external content table,
+so it stores only the index and reads matched rows back from ``items``.
+Triggers keep it in step with inserts, deletes and edits. Words are stemmed
+(``jackets`` finds ``jacket``) and every query word matches as a prefix,
+served by the two- and three-letter prefix indexes.
+
+Rebuild the index from ``items``, e.g. after restoring a backup:
+
+    python -m services.search
+"""
+import html
+import re
+from typing import Optional
+
+# Snippet highlight markers; descriptions are escaped and the markers become <mark>
+_HIGHLIGHT_START = "\x02"
+_HIGHLIGHT_END = "\x03"
+SNIPPET_TOKENS = 12
+
+_WORD = re.compile(r"\w+")
+
+CREATE_SEARCH_TABLES = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5(
+        description, category,
+        content = 'items', content_rowid = 'id',
+        tokenize = 'porter unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """,
+]
+
+SEARCH_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_items_fts_insert
+    AFTER INSERT ON items
+    BEGIN
+        INSERT INTO items_fts (rowid, description, category)
+        VALUES (NEW.id, NEW.description, NEW.category);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_items_fts_delete
+    AFTER DELETE ON items
+    BEGIN
+        INSERT INTO items_fts (items_fts, rowid, description, category)
+        VALUES ('delete', OLD.id, OLD.description, OLD.category);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_items_fts_update
+    AFTER UPDATE OF description, category ON items
+    BEGIN
+        INSERT INTO items_fts (items_fts, rowid, description, category)
+        VALUES ('delete', OLD.id, OLD.description, OLD.category);
+        INSERT INTO items_fts (rowid, description, category)
+        VALUES (NEW.id, NEW.description, NEW.category);
+    END
+    """,
+]
+
+# Excerpt of the matched description with highlight markers around matched words
+SNIPPET_SQL = f"snippet(items_fts, 0, char({ord(_HIGHLIGHT_START)}), char({ord(_HIGHLIGHT_END)}), '…', {SNIPPET_TOKENS})"
+
+
+def rebuild_search(conn):
+    """Rebuild the full-text index from ``items``; the caller owns the transaction"""
+    conn.execute("INSERT INTO items_fts (items_fts) VALUES ('rebuild')")
+
+
+def match_expression(q: str) -> Optional[str]:
+    """FTS5 query matching every word of ``q`` as a prefix, or None if ``q`` has no words.
+
+    Words are quoted, so FTS5 operators and column filters typed by users are
+    searched for as plain text.
+    """
+    words = _WORD.findall(q)
+    if not words:
+        return None
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def highlight(snippet: str) -> str:
+    """HTML-escape a snippet and wrap its matched words in ``<mark>``"""
+    return (html.escape(snippet)
+            .replace(_HIGHLIGHT_START, "<mark>")
+            .replace(_HIGHLIGHT_END, "</mark>"))
+
+
+if __name__ == "__main__":
+    from database import init_db, pool, transaction
+
+    init_db()
+    with pool.connection() as conn:
+        with transaction(conn):
+            rebuild_search(conn)
+            rows = conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+    print(f"items_fts rebuilt: {rows} items")
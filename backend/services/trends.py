@@ -0,0 +1,117 @@
+"""Daily per-category donation rollup.
+
+``donation_daily`` holds one row per ``(day, category)`` with the number of
+items listed that day and their total quantity. Triggers on ``items`` keep it
+current on every insert, so trend queries read at most ``days x categories``
+rows no matter how large ``items`` grows. ``rebuild_donation_daily`` recomputes
+the whole table from ``items.created_at`` and is the backfill job:
+
+    python -m services.trends
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+# Day an item counts towards; rows without a timestamp count as today
+ITEM_DAY = "COALESCE(date({row}.created_at), date('now'))"
+
+CREATE_DONATION_DAILY = """
+    CREATE TABLE IF NOT EXISTS donation_daily (
+        day TEXT NOT NULL,
+        category TEXT NOT NULL,
+        donations INTEGER NOT NULL DEFAULT 0,
+        quantity INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, category)
+    ) WITHOUT ROWID
+"""
+
+# Kept as single statements so the migration runner can execute them one by one
+DONATION_DAILY_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_items_donation_daily_insert
+    AFTER INSERT ON items
+    BEGIN
+        INSERT INTO donation_daily (day, category, donations, quantity)
+        VALUES ({ITEM_DAY.format(row="NEW")}, NEW.category, 1, NEW.quantity)
+        ON CONFLICT (day, category) DO UPDATE SET
+            donations = donations + 1,
+            quantity = quantity + excluded.quantity;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_items_donation_daily_delete
+    AFTER DELETE ON items
+    BEGIN
+        UPDATE donation_daily
+        SET donations = donations - 1, quantity = quantity - OLD.quantity
+        WHERE day = {ITEM_DAY.format(row="OLD")} AND category = OLD.category;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_items_donation_daily_update
+    AFTER UPDATE OF category, quantity, created_at ON items
+    BEGIN
+        UPDATE donation_daily
+        SET donations = donations - 1, quantity = quantity - OLD.quantity
+        WHERE day = {ITEM_DAY.format(row="OLD")} AND category = OLD.category;
+        INSERT INTO donation_daily (day, category, donations, quantity)
+        VALUES ({ITEM_DAY.format(row="NEW")}, NEW.category, 1, NEW.quantity)
+        ON CONFLICT (day, category) DO UPDATE SET
+            donations = donations + 1,
+            quantity = quantity + excluded.quantity;
+    END
+    """,
+]
+
+
+def rebuild_donation_daily(conn) -> int:
+    """Recompute the rollup from ``items``; the caller owns the transaction"""
+    conn.execute("DELETE FROM donation_daily")
+    conn.execute(f"""
+        INSERT INTO donation_daily (day, category, donations, quantity)
+        SELECT {ITEM_DAY.format(row="items")}, category, COUNT(*), COALESCE(SUM(quantity), 0)
+        FROM items
+        GROUP BY 1, 2
+    """)
+    return conn.execute("SELECT COUNT(*) FROM donation_daily").fetchone()[0]
+
+
+def window_start(days: int, today=None) -> str:
+    """First day (inclusive) of a window of ``days`` days ending today, in UTC"""
+    today = today or datetime.utcnow().date()
+    return (today - timedelta(days=days - 1)).isoformat()
+
+
+def fetch_daily_counts(conn, days: int, category: Optional[str] = None) -> List[Dict]:
+    """Per-day donation counts by category for the last ``days`` days, oldest first.
+
+    Days without donations are included with no categories, so the result
+    always has exactly ``days`` entries.
+    """
+    today = datetime.utcnow().date()
+    start = window_start(days, today)
+
+    query = "SELECT day, category, donations FROM donation_daily WHERE day >= ?"
+    params = [start]
+    if category:
+        query += " AND category = ?"
+        params.append(category)
+
+    by_day: Dict[str, Dict[str, int]] = {}
+    for day, row_category, donations in conn.execute(query, params).fetchall():
+        if donations > 0:
+            by_day.setdefault(day, {})[row_category] = donations
+
+    return [
+        {"date": day, "categories": by_day.get(day, {})}
+        for day in (window_start(days - offset, today) for offset in range(days))
+    ]
+
+
+if __name__ == "__main__":
+    from database import init_db, pool, transaction
+
+    init_db()
+    with pool.connection() as conn:
+        with transaction(conn):
+            rows = rebuild_donation_daily(conn)
+    print(f"donation_daily rebuilt: {rows} day/category rows")